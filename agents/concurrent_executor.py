@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import math
+import threading
+import time
+
+import pandas as pd
+
+from config import Settings
+from agents.executor import Executor
+from db.cancellation import CancelToken, QueryCancelled
+
+
+class QueryDeadlineExceeded(TimeoutError):
+    """A query did not finish (or start) before its deadline."""
+
+
+@dataclass
+class QueryJob:
+    """One query to run through ConcurrentExecutor (same arguments as Executor.run)."""
+
+    sql: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    sampling: Optional[Dict[str, Any]] = None
+    spec: Optional[Dict[str, Any]] = None
+    stream: Optional[bool] = None
+    columns: Optional[List[str]] = None
+    deadline_seconds: Optional[float] = None
+    label: Optional[str] = None
+    # Cache warm-up: re-run against the database and catalog the snapshot as warmed.
+    warm: bool = False
+    # The user-facing question, for the per-question cache metrics.
+    question: Optional[str] = None
+    # Called on the worker thread with the first fetched chunk (progressive preview).
+    on_first_chunk: Optional[Callable[[pd.DataFrame], None]] = None
+
+
+@dataclass
+class _RunState:
+    pending: Deque[Tuple[QueryJob, Future, Optional[float]]] = field(default_factory=deque)
+    in_flight: Dict[Future, CancelToken] = field(default_factory=dict)
+
+
+# Process-wide: one worker pool (global concurrency limit) and the per-run bookkeeping,
+# so any caller (pipeline, UI, warmers) can cancel a run by id.
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_RUNS: Dict[str, _RunState] = {}
+_RUNS_LOCK = threading.Lock()
+
+
+def _shared_pool(max_workers: int) -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="query")
+        return _POOL
+
+
+def cancel_run(run_id: Optional[str], reason: str = "cancelled") -> int:
+    """
+    Cancel every outstanding query of a run: queued jobs never start, running ones are
+    interrupted at their next fetch chunk (their futures raise QueryCancelled).
+    Returns how many queries were cancelled.
+    """
+    if not run_id:
+        return 0
+    with _RUNS_LOCK:
+        state = _RUNS.get(run_id)
+        if state is None:
+            return 0
+        n = 0
+        while state.pending:
+            _job, fut, _deadline = state.pending.popleft()
+            if fut.cancel():
+                n += 1
+        tokens = list(state.in_flight.values())
+    for token in tokens:
+        token.cancel(reason)
+        n += 1
+    return n
+
+
+def active_runs() -> Dict[str, Dict[str, int]]:
+    with _RUNS_LOCK:
+        return {rid: {"pending": len(s.pending), "in_flight": len(s.in_flight)} for rid, s in _RUNS.items()}
+
+
+class ConcurrentExecutor:
+    """
+    Runs many Executor jobs concurrently and hands back futures of (df, exec_meta).
+
+    - Global limit: MAX_CONCURRENT_QUERIES worker threads shared by the whole process.
+    - Per-run limit: at most MAX_CONCURRENT_QUERIES_PER_RUN of a run's jobs in flight;
+      the rest wait in the run's queue (without occupying a worker).
+    - Deadlines: job.deadline_seconds counted from submission; a job
+      that cannot start in time fails, a running one is cancelled when it expires.
+    - cancel_run(run_id) cancels all outstanding jobs of a run.
+    """
+
+    def __init__(self, settings: Settings, executor: Optional[Executor] = None):
+        self.settings = settings
+        self.executor = executor or Executor(settings=settings)
+        self.per_run_limit = max(1, int(getattr(settings, "MAX_CONCURRENT_QUERIES_PER_RUN", 2)))
+        self.pool = _shared_pool(int(getattr(settings, "MAX_CONCURRENT_QUERIES", 8)))
+
+    def submit(self, run_id: str, job: QueryJob) -> Future:
+        fut: Future = Future()
+        deadline = time.monotonic() + float(job.deadline_seconds) if job.deadline_seconds else None
+        with _RUNS_LOCK:
+            state = _RUNS.setdefault(run_id, _RunState())
+            state.pending.append((job, fut, deadline))
+            self._dispatch(run_id, state)
+        return fut
+
+    def submit_many(self, run_id: str, jobs: List[QueryJob]) -> List[Future]:
+        return [self.submit(run_id, j) for j in jobs]
+
+    def run_all(self, run_id: str, jobs: List[QueryJob]) -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Submit jobs and wait for all of them. If one fails, the rest of the run is
+        cancelled and the first error is raised; an interrupted caller (e.g. Streamlit
+        stopping the script) cancels the run too.
+        """
+        futures = self.submit_many(run_id, jobs)
+        try:
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [f for f in done if not f.cancelled() and f.exception() is not None]
+            if failed:
+                cancel_run(run_id, reason="run failed")
+                raise failed[0].exception()
+            return [f.result() for f in futures]
+        except BaseException:
+            cancel_run(run_id, reason="run failed")
+            raise
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    def _dispatch(self, run_id: str, state: _RunState) -> None:
+        # Caller holds _RUNS_LOCK.
+        while state.pending and len(state.in_flight) < self.per_run_limit:
+            job, fut, deadline = state.pending.popleft()
+            if fut.cancelled():
+                continue
+            token = CancelToken()
+            state.in_flight[fut] = token
+            self.pool.submit(self._work, run_id, job, fut, deadline, token)
+        if not state.pending and not state.in_flight:
+            _RUNS.pop(run_id, None)
+
+    def _work(self, run_id: str, job: QueryJob, fut: Future, deadline: Optional[float], token: CancelToken) -> None:
+        timer: Optional[threading.Timer] = None
+        try:
+            if not fut.set_running_or_notify_cancel():
+                return
+            try:
+                timeout = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise QueryDeadlineExceeded("Query missed its deadline before it could start.")
+                    timer = threading.Timer(remaining, token.cancel, args=("deadline",))
+                    timer.daemon = True
+                    timer.start()
+                    timeout = max(1, math.ceil(remaining))
+                df, meta = self.executor.run(
+                    sql=job.sql,
+                    params=job.params,
+                    sampling=job.sampling,
+                    spec=job.spec,
+                    stream=job.stream,
+                    columns=job.columns,
+                    cancel=token,
+                    timeout_seconds=timeout,
+                    on_first_chunk=job.on_first_chunk,
+                    warm=job.warm,
+                    question=job.question,
+                )
+                if job.label:
+                    meta["label"] = job.label
+                fut.set_result((df, meta))
+            except QueryCancelled as e:
+                if token.reason == "deadline":
+                    fut.set_exception(QueryDeadlineExceeded(f"Query exceeded its deadline: {e}"))
+                else:
+                    fut.set_exception(e)
+            except BaseException as e:
+                fut.set_exception(e)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with _RUNS_LOCK:
+                state = _RUNS.get(run_id)
+                if state is not None:
+                    state.in_flight.pop(fut, None)
+                    self._dispatch(run_id, state)
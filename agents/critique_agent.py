@@ -37,6 +37,15 @@ class CritiqueAgent:
                     force_hitl = True
                     confidence = min(confidence, 0.5)
 
+        if step == "E_sql_generation":
+            # Index-aware cost annotation from SQLAgent (utils/access_paths.py)
+            cost = payload.get("cost") if isinstance(payload, dict) else None
+            if isinstance(cost, dict):
+                issues.extend(cost.get("warnings") or [])
+                if cost.get("cost_class") == "high":
+                    issues.append(f"Expected cost HIGH (~{int(cost.get('est_rows_read') or 0):,} rows read).")
+                    confidence = min(confidence, 0.5)
+
         if step == "F_sql_safety":
             if isinstance(payload, dict) and not payload.get("ok", False):
                 issues.append("Safety validation failed.")
@@ -6,6 +6,10 @@ import uuid
 
 import pandas as pd
 
+from utils.json_sanitize import json_sanitize
+from utils.result_slicing import detail_slice, slice_grouping_set
+from utils.result_typing import is_category_like
+
 
 class DashboardAgent:
     """
@@ -15,18 +19,26 @@ class DashboardAgent:
       - Multi-chart grid auto layout
       - Uses plan["visuals"] if present; otherwise auto-detects charts from df
       - Includes a data table preview (first N rows)
+      - GROUPING SETS results: each plan visual gets the rows of its own grain
+        (pre-aggregated by the database); preview/auto charts use the finest grain
     """
 
+    # Rows embedded in the HTML: the table preview, and the data of each grain-sliced chart.
+    PREVIEW_ROWS = 200
+
     def __init__(self, settings):
         self.settings = settings
 
     def build_dashboard(self, *, df: pd.DataFrame, plan: Dict[str, Any], insights: Dict[str, Any]) -> Dict[str, Any]:
+        full = df
+        df = detail_slice(df, plan)
         if df is None or df.empty:
             html = self._empty_dashboard("No data returned from query.")
             return {"html": html, "meta": {"status": "empty", "reason": "no rows"}}
 
         dashboard_id = f"dash_{uuid.uuid4().hex[:8]}"
         charts = self._build_chart_specs(df=df, plan=plan, insights=insights)
+        self._attach_grain_data(charts, full=full, plan=plan)
 
         # KPI cards
         kpis = insights.get("kpis", [])
@@ -34,7 +46,7 @@ class DashboardAgent:
             kpis = []
 
         # Data preview
-        preview_n = min(200, len(df))
+        preview_n = min(self.PREVIEW_ROWS, len(df))
         preview_rows = df.head(preview_n).to_dict(orient="records")
         columns = list(df.columns)
 
@@ -50,7 +62,10 @@ class DashboardAgent:
 
         meta = {
             "dashboard_type": "plotly_html",
-            "charts": [{"title": c.get("title"), "type": c.get("type"), "x": c.get("x"), "y": c.get("y")} for c in charts],
+            "charts": [
+                {"title": c.get("title"), "type": c.get("type"), "x": c.get("x"), "y": c.get("y"), "grain": c.get("grain")}
+                for c in charts
+            ],
             "kpis": kpis[:12],
             "rows": int(len(df)),
             "cols": len(df.columns),
@@ -77,6 +92,22 @@ class DashboardAgent:
         # Otherwise auto-detect charts
         return self._auto_charts(df)
 
+    def _attach_grain_data(self, charts: List[Dict[str, Any]], *, full: pd.DataFrame, plan: Dict[str, Any]) -> None:
+        # Charts whose x (and color) match a grouping set read that slice directly.
+        for c in charts:
+            x = c.get("x")
+            if not isinstance(x, str):
+                continue
+            grain = [x] + ([c["color"]] if isinstance(c.get("color"), str) and c["color"] != x else [])
+            part = slice_grouping_set(full, plan, grain)
+            if part is None or part.empty:
+                continue
+            c["grain"] = grain
+            # Capped like the preview: a chart at the finest grain would otherwise embed every row.
+            c["data"] = part.head(self.PREVIEW_ROWS).to_dict(orient="records")
+            if len(part) > self.PREVIEW_ROWS:
+                c["truncated_rows"] = int(len(part))
+
     def _normalize_visual(self, v: Dict[str, Any], df: pd.DataFrame) -> Optional[Dict[str, Any]]:
         vtype = (v.get("type") or "line").lower().strip()
         title = v.get("title") or "Chart"
@@ -95,17 +126,21 @@ class DashboardAgent:
         if vtype not in {"line", "bar", "scatter", "area", "hist"}:
             vtype = "line"
 
-        return {
+        spec = {
             "id": f"chart_{uuid.uuid4().hex[:8]}",
             "type": vtype,
             "title": str(title),
             "x": x,
             "y": y,
         }
+        color = v.get("color")
+        if isinstance(color, str) and color in df.columns:
+            spec["color"] = color
+        return spec
 
     def _auto_charts(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-        cat_cols = [c for c in df.columns if df[c].dtype == "object" or pd.api.types.is_string_dtype(df[c])]
+        cat_cols = [c for c in df.columns if is_category_like(df[c])]
         date_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
 
         charts: List[Dict[str, Any]] = []
@@ -309,9 +344,9 @@ th {{
   </div>
 
 <script>
-const DATA = {json.dumps(preview_rows)};
+const ROWS = {json.dumps(preview_rows, default=json_sanitize)};
 const FULL_COLUMNS = {json.dumps(columns)};
-const CHARTS = {json.dumps(charts)};
+const CHARTS = {json.dumps(charts, default=json_sanitize)};
 
 function isNumber(x) {{
   return typeof x === 'number' && !isNaN(x);
@@ -340,6 +375,7 @@ function makeChart(spec) {{
   const type = spec.type || 'line';
   const x = spec.x;
   const y = spec.y;
+  const DATA = spec.data || ROWS;
 
   if (type === 'hist') {{
     const vals = DATA.map(r => Number(r[x])).filter(v => !isNaN(v));
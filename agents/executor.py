@@ -2,16 +2,33 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import time
-import hashlib
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from config import Settings
-from db import run_sql_query
-from cache.snapshot_cache import SnapshotCache  # your existing cache module
-from cache.duckdb_store import DuckDBStore
+from db import run_sql_query, stream_sql_query
+from db.arrow_fetch import timed_batches
+from db.cancellation import CancelToken, QueryCancelled, QueryTimeoutError
+from cache.single_flight import QUERY_FLIGHTS, FileSingleFlight
+from cache.eviction import start_background_eviction
+from cache.freshness import start_background_freshness
+from cache.incremental import INCREMENTAL_SINCE_PARAM, base_key_for, merged_batches, supports_incremental, watermark
+from cache.service import CacheService, cache_key_for, referenced_tables
+from cache.warmer import start_background_warmer
+from observability.timing import PhaseTimer
+from utils.result_slicing import GROUPING_ID_COLUMN
+from utils.sampling import SAMPLE_ROWS_COLUMN, estimate_sampling_error
+
+
+def _tap_first(batches: Iterator[pa.RecordBatch], hook: Callable[[pa.RecordBatch], None]) -> Iterator[pa.RecordBatch]:
+    for i, batch in enumerate(batches):
+        if i == 0:
+            hook(batch)
+        yield batch
 
 
 @dataclass
@@ -19,37 +36,237 @@ class Executor:
     settings: Settings
 
     def __post_init__(self) -> None:
-        self.cache = SnapshotCache(Path(self.settings.CACHE_DIR))
-        self.duckdb = DuckDBStore(Path(self.settings.DUCKDB_PATH))
-
-    def _cache_key(self, sql: str, params: Dict[str, Any]) -> str:
-        payload = (sql + "|" + repr(sorted((params or {}).items()))).encode("utf-8")
-        return hashlib.sha256(payload).hexdigest()
+        self.cache = CacheService(self.settings)
+        start_background_eviction(self.settings)
+        start_background_freshness(self.settings)
+        start_background_warmer(self.settings)
 
-    def run(self, *, sql: str, params: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def run(
+        self,
+        *,
+        sql: str,
+        params: Dict[str, Any],
+        sampling: Optional[Dict[str, Any]] = None,
+        spec: Optional[Dict[str, Any]] = None,
+        stream: Optional[bool] = None,
+        columns: Optional[List[str]] = None,
+        cancel: Optional[CancelToken] = None,
+        timeout_seconds: Optional[int] = None,
+        on_first_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+        warm: bool = False,
+        question: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         """
         Executes SQL safely (SELECT-only assumed already validated).
         Uses Parquet snapshot caching.
         Registers snapshots into DuckDB catalog for offline querying.
+
+        sampling: SQLAgent's sampling decision for approximate queries; when given,
+        exec_meta["approximate"] carries the sampling rate and estimated error.
+
+        spec: SQLAgent's structured query description. It is stored with the snapshot, and on
+        a cache miss it is used to derive the result locally from a cached superset
+        (mode="derived", exec_meta["lineage"] names the source snapshot), or from the table's
+        local mirror when it is fresher than MIRROR_FRESHNESS_SLA_SECONDS (mode="mirror").
+
+        Time-series specs (spec["time"], INCREMENTAL_REFRESH) whose snapshot was invalidated by a
+        source change and kept aside (cache.freshness) are topped up instead of re-run: only rows
+        from the snapshot's latest time value on are fetched and appended (mode="incremental",
+        exec_meta["incremental"]); the returned frame is the merged result.
+
+        stream: write fetched batches straight into the Parquet snapshot (row group per batch)
+        instead of building the DataFrame first; default STREAM_RESULTS_TO_PARQUET. The
+        snapshot may hold up to STREAM_MAX_ROWS rows; the returned frame is read back with
+        only `columns` (plus internal __ columns) and at most MAX_RETURNED_ROWS rows.
+
+        cancel / timeout_seconds: set by ConcurrentExecutor for per-run cancellation and
+        per-query deadlines (timeout defaults to QUERY_TIMEOUT_SECONDS). A query that runs
+        past its timeout is cancelled at the driver and raises QueryTimeoutError, whose
+        .meta is the exec_meta of the failed attempt (timed_out=True).
+
+        Identical concurrent cache misses are coalesced (SINGLE_FLIGHT_MODE): one caller runs
+        the query, the others wait and reuse its result (exec_meta["coalesced"]=True).
+
+        on_first_chunk: called (on the executing thread) with the first fetched chunk as a
+        DataFrame as soon as it arrives, for a progressive preview; exec_meta["first_chunk_seconds"]
+        is the time to that first result. Not called for cache hits or coalesced callers.
+
+        Cache hits report exec_meta["cache_tier"]: "memory" when the snapshot was served from the
+        process-wide Arrow tier (CACHE_MEMORY_BYTES) without reading the file, else "disk".
+        Memory-tier frames share that tier's Arrow buffers and their columns are read-only;
+        callers that modify values in place must take a df.copy() first.
+
+        exec_meta["profile"] breaks the time down by phase (pool_checkout, execute, first_row,
+        fetch, dataframe, parquet_write, catalog_register, cache_read, derive; perf_counter
+        seconds) with bytes_transferred, the Arrow allocation peak and the process RSS peak.
+
+        warm: cache warm-up (cache.warmer). The snapshot is rewritten from the database even when
+        one exists, without derivation, mirrors or single-flight, and is catalogued as warmed.
+
+        question: the user-facing question behind the query; cache metrics (CacheService.metrics)
+        are broken down by it. Snapshots keep the DB seconds and bytes of their execution, so a
+        later hit is credited with the DB time it saved.
         """
         start = time.time()
-        cache_key = self._cache_key(sql, params or {})
+        cache_key = cache_key_for(sql, params or {})
+        if stream is None:
+            stream = bool(getattr(self.settings, "STREAM_RESULTS_TO_PARQUET", False))
+        read_cols = list(columns) + [GROUPING_ID_COLUMN, SAMPLE_ROWS_COLUMN] if (stream and columns) else None
+        read_rows = int(self.settings.MAX_RETURNED_ROWS) if stream else None
+
+        def lookup() -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+            return self._from_cache(
+                cache_key, start=start, sampling=sampling, read_cols=read_cols, read_rows=read_rows, question=question,
+                timer=PhaseTimer(),
+            )
+
+        if warm:
+            return self._fill(
+                sql=sql, params=params, cache_key=cache_key, start=start, sampling=sampling, spec=spec,
+                stream=bool(stream), read_cols=read_cols, read_rows=read_rows, cancel=cancel, timeout_seconds=timeout_seconds,
+                warm=True, question=question, timer=PhaseTimer(),
+            )
+
+        hit = lookup()
+        if hit is not None:
+            return hit
 
-        # Try cache first
-        cached = self.cache.get(cache_key)
+        def fill() -> Tuple[pd.DataFrame, Dict[str, Any]]:
+            # Whoever led the flight before us may have just written the snapshot.
+            return lookup() or self._fill(
+                sql=sql, params=params, cache_key=cache_key, start=start, sampling=sampling, spec=spec,
+                stream=bool(stream), read_cols=read_cols, read_rows=read_rows, cancel=cancel, timeout_seconds=timeout_seconds,
+                on_first_chunk=on_first_chunk, question=question, timer=PhaseTimer(),
+            )
+
+        mode = str(getattr(self.settings, "SINGLE_FLIGHT_MODE", "process")).lower()
+        if mode == "off":
+            return fill()
+
+        projection = (read_cols, read_rows)
+        leader: Callable[[], Tuple[pd.DataFrame, Dict[str, Any], Any]]
+        if mode == "file":
+            lock = FileSingleFlight(
+                Path(self.settings.CACHE_DIR) / "locks",
+                stale_seconds=int(self.settings.QUERY_TIMEOUT_SECONDS) + 60,
+            )
+
+            def leader() -> Tuple[pd.DataFrame, Dict[str, Any], Any]:
+                (df, meta), _shared = lock.do(cache_key, fill, lookup, cancel=cancel)
+                return df, meta, projection
+
+        else:
+
+            def leader() -> Tuple[pd.DataFrame, Dict[str, Any], Any]:
+                return (*fill(), projection)
+
+        for attempt in range(3):
+            try:
+                (df, meta, leader_projection), shared = QUERY_FLIGHTS.do(cache_key, leader, cancel=cancel)
+            except QueryCancelled:
+                # The leader belonged to another (cancelled) run, not ours: try again ourselves.
+                if (cancel is not None and cancel.cancelled) or attempt == 2:
+                    raise
+                continue
+            if not shared:
+                return df, meta
+            if leader_projection != projection:
+                # The leader read its own columns/rows; ours come from the snapshot it wrote.
+                own = lookup()
+                if own is not None:
+                    df = own[0]
+            # Followers get their own frame object and a marker in exec_meta.
+            return df.copy(deep=False), {**meta, "rows": int(len(df)), "coalesced": True, "seconds": round(time.time() - start, 4)}
+        raise RuntimeError("unreachable")
+
+    def _from_cache(
+        self,
+        cache_key: str,
+        *,
+        start: float,
+        sampling: Optional[Dict[str, Any]],
+        read_cols: Optional[List[str]],
+        read_rows: Optional[int],
+        timer: PhaseTimer,
+        question: Optional[str] = None,
+    ) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        cached = self.cache.read(cache_key, columns=read_cols, max_rows=read_rows, question=question, timer=timer)
         if cached is not None:
-            df = cached
-            parquet_path = self.cache.path_for_key(cache_key)
-            if parquet_path:
-                self.duckdb.register_parquet(cache_key, parquet_path)
+            df, tier = cached
             meta = {
                 "cache_key": cache_key,
                 "cache_hit": True,
                 "rows": int(len(df)),
                 "seconds": round(time.time() - start, 4),
                 "mode": "cache",
+                "cache_tier": tier,
+                "profile": timer.report(bytes_transferred=0),
             }
+            if sampling:
+                meta["approximate"] = estimate_sampling_error(df, sampling)
             return df, meta
+        return None
+
+    def _fill(
+        self,
+        *,
+        sql: str,
+        params: Dict[str, Any],
+        cache_key: str,
+        start: float,
+        sampling: Optional[Dict[str, Any]],
+        spec: Optional[Dict[str, Any]],
+        stream: bool,
+        read_cols: Optional[List[str]],
+        read_rows: Optional[int],
+        cancel: Optional[CancelToken],
+        timeout_seconds: Optional[int],
+        on_first_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+        warm: bool = False,
+        question: Optional[str] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Cache miss: derive from a containing snapshot, else execute against the DB."""
+        timer = timer or PhaseTimer()
+        # Derive from a containing snapshot (filter + rollup in DuckDB) before going to the DB
+        if spec and not warm:
+            with timer.phase("derive"):
+                derived = self._derive(spec)
+            if derived is not None:
+                df, lineage = derived
+                self.cache.put(cache_key, df, sql=sql, params=params, spec=spec, lineage=lineage, fetch_seconds=time.time() - start, timer=timer)
+                self.cache.catalog.record_metrics({"local_fills": 1}, tables=spec.get("tables"), question=question)
+                meta = {
+                    "cache_key": cache_key,
+                    "cache_hit": False,
+                    "rows": int(len(df)),
+                    "seconds": round(time.time() - start, 4),
+                    "mode": "derived",
+                    "lineage": {k: v for k, v in lineage.items() if k != "duckdb_sql"},
+                    "profile": timer.report(bytes_transferred=0),
+                }
+                return df, meta
+
+            # Single-table queries on a fresh local mirror (cache.mirror) skip the source DB.
+            sla = int(getattr(self.settings, "MIRROR_FRESHNESS_SLA_SECONDS", 0) or 0)
+            mirrored = None
+            if sla > 0:
+                with timer.phase("mirror"):
+                    mirrored = self._from_mirror(spec, sla)
+            if mirrored is not None:
+                df, lineage = mirrored
+                self.cache.put(cache_key, df, sql=sql, params=params, spec=spec, lineage=lineage, fetch_seconds=time.time() - start, timer=timer)
+                self.cache.catalog.record_metrics({"local_fills": 1}, tables=spec.get("tables"), question=question)
+                meta = {
+                    "cache_key": cache_key,
+                    "cache_hit": False,
+                    "rows": int(len(df)),
+                    "seconds": round(time.time() - start, 4),
+                    "mode": "mirror",
+                    "lineage": {k: v for k, v in lineage.items() if k != "duckdb_sql"},
+                    "profile": timer.report(bytes_transferred=0),
+                }
+                return df, meta
 
         # Offline-only mode: do not hit DB
         if bool(getattr(self.settings, "OFFLINE_ONLY", False)):
@@ -58,25 +275,274 @@ class Executor:
                 "Run once online (or create snapshots) to populate cache."
             )
 
-        # Execute against DB
-        df = run_sql_query(
+        if timeout_seconds is None:
+            timeout_seconds = int(self.settings.QUERY_TIMEOUT_SECONDS)
+        first: Dict[str, Any] = {}
+        hook = self._first_chunk_hook(on_first_chunk, start, first)
+
+        try:
+            if not stream and supports_incremental(spec) and bool(getattr(self.settings, "INCREMENTAL_REFRESH", True)):
+                topped_up = self._run_incremental(
+                    sql=sql, params=params, cache_key=cache_key, start=start, spec=spec or {},
+                    cancel=cancel, timeout_seconds=int(timeout_seconds), hook=hook, first=first, warm=warm, question=question,
+                    timer=timer,
+                )
+                if topped_up is not None:
+                    return topped_up
+
+            if stream:
+                return self._run_streaming(
+                    sql=sql, params=params, cache_key=cache_key, start=start,
+                    sampling=sampling, spec=spec, read_cols=read_cols, read_rows=int(read_rows or 0),
+                    cancel=cancel, timeout_seconds=int(timeout_seconds), hook=hook, first=first, warm=warm, question=question,
+                    timer=timer,
+                )
+
+            # Execute against DB
+            df = run_sql_query(
+                sql=sql,
+                params=params or {},
+                timeout_seconds=int(timeout_seconds),
+                max_rows=int(self.settings.MAX_RETURNED_ROWS),
+                settings=self.settings,
+                cancel=cancel,
+                on_first_batch=hook,
+                timer=timer,
+            )
+        except QueryTimeoutError as e:
+            # Caller logs e.meta (exec_meta shape) so timeouts show up in traces and query logs.
+            e.meta.update(
+                {
+                    "cache_key": cache_key,
+                    "cache_hit": False,
+                    "rows": 0,
+                    "seconds": round(time.time() - start, 4),
+                    "mode": "db",
+                    "error": str(e),
+                    "profile": timer.report(),
+                }
+            )
+            raise
+        fetch = df.attrs.pop("fetch", {})
+
+        # Cache to parquet. A result cut by the byte cap is not a complete answer; keep it out of containment.
+        complete = fetch.get("truncated_by") != "bytes"
+        self.cache.put(
+            cache_key, df, sql=sql, params=params, spec=spec if complete else None, fetch_seconds=time.time() - start,
+            warmed=warm, db_seconds=timer.db_seconds(), db_bytes=int(fetch.get("bytes") or 0), timer=timer,
+        )
+        self._count_db_fill(sql, spec, warm=warm, question=question, seconds=timer.db_seconds())
+
+        meta = {
+            "cache_key": cache_key,
+            "cache_hit": False,
+            "rows": int(len(df)),
+            "seconds": round(time.time() - start, 4),
+            "mode": "db",
+            "timeout_seconds": int(timeout_seconds),
+            "fetch": fetch,
+            "profile": timer.report(bytes_transferred=int(fetch.get("bytes") or 0)),
+            **first,
+        }
+        if sampling:
+            meta["approximate"] = estimate_sampling_error(df, sampling)
+        return df, meta
+
+    @staticmethod
+    def _first_chunk_hook(
+        on_first_chunk: Optional[Callable[[pd.DataFrame], None]], start: float, first: Dict[str, Any]
+    ) -> Optional[Callable[[pa.RecordBatch], None]]:
+        if on_first_chunk is None:
+            return None
+
+        def hook(batch: pa.RecordBatch) -> None:
+            first["first_chunk_seconds"] = round(time.time() - start, 4)
+            first["first_chunk_rows"] = int(batch.num_rows)
+            try:
+                on_first_chunk(pa.Table.from_batches([batch]).to_pandas())
+            except Exception:
+                # A preview must never fail the query itself.
+                pass
+
+        return hook
+
+    def _run_streaming(
+        self,
+        *,
+        sql: str,
+        params: Dict[str, Any],
+        cache_key: str,
+        start: float,
+        sampling: Optional[Dict[str, Any]],
+        spec: Optional[Dict[str, Any]],
+        read_cols: Optional[List[str]],
+        read_rows: int,
+        cancel: Optional[CancelToken],
+        timeout_seconds: int,
+        hook: Optional[Callable[[pa.RecordBatch], None]] = None,
+        first: Optional[Dict[str, Any]] = None,
+        warm: bool = False,
+        question: Optional[str] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        timer = timer or PhaseTimer()
+        fetch: Dict[str, Any] = {}
+        batches = stream_sql_query(
             sql=sql,
             params=params or {},
-            timeout_seconds=int(self.settings.QUERY_TIMEOUT_SECONDS),
-            max_rows=int(self.settings.MAX_RETURNED_ROWS),
+            timeout_seconds=timeout_seconds,
+            max_rows=int(getattr(self.settings, "STREAM_MAX_ROWS", self.settings.MAX_RETURNED_ROWS)),
+            meta=fetch,
+            settings=self.settings,
+            cancel=cancel,
+            timer=timer,
         )
+        batches = timed_batches(batches, timer)
+        if hook is not None:
+            batches = _tap_first(batches, hook)
+        # Fetching and writing interleave: whatever put_batches spends outside the fetch phases is the write.
+        t0, pulled = time.perf_counter(), timer.total()
+        parquet_path, snapshot_rows = self.cache.put_batches(cache_key, batches)
+        timer.add("parquet_write", time.perf_counter() - t0 - (timer.total() - pulled))
+        if parquet_path is None:
+            # Empty result: still snapshot it (with its column names) so it is cached.
+            parquet_path = self.cache.put(
+                cache_key, pd.DataFrame(columns=fetch.get("columns") or []),
+                sql=sql, params=params, spec=spec, fetch_seconds=time.time() - start, warmed=warm,
+                db_seconds=timer.db_seconds(), db_bytes=int(fetch.get("bytes") or 0), timer=timer,
+            )
+        else:
+            self.cache.register(
+                cache_key, parquet_path, sql=sql, params=params, spec=spec, rows=snapshot_rows,
+                fetch_seconds=time.time() - start, warmed=warm, db_seconds=timer.db_seconds(),
+                db_bytes=int(fetch.get("bytes") or 0), timer=timer,
+            )
+        self._count_db_fill(sql, spec, warm=warm, question=question, seconds=timer.db_seconds())
 
-        # Cache to parquet
-        self.cache.put(cache_key, df)
-        parquet_path = self.cache.path_for_key(cache_key)
-        if parquet_path:
-            self.duckdb.register_parquet(cache_key, parquet_path)
-
+        read = self.cache.read(cache_key, columns=read_cols, max_rows=read_rows, record_hit=False, timer=timer)
+        if read is None:
+            raise RuntimeError(f"Streamed snapshot {parquet_path} could not be read back.")
+        df = read[0]
         meta = {
             "cache_key": cache_key,
             "cache_hit": False,
             "rows": int(len(df)),
             "seconds": round(time.time() - start, 4),
             "mode": "db",
+            "streamed": True,
+            "timeout_seconds": int(timeout_seconds),
+            "snapshot_rows": int(snapshot_rows),
+            "fetch": fetch,
+            "profile": timer.report(bytes_transferred=int(fetch.get("bytes") or 0)),
+            **(first or {}),
+        }
+        if sampling:
+            meta["approximate"] = estimate_sampling_error(df, sampling)
+        return df, meta
+
+    def _run_incremental(
+        self,
+        *,
+        sql: str,
+        params: Dict[str, Any],
+        cache_key: str,
+        start: float,
+        spec: Dict[str, Any],
+        cancel: Optional[CancelToken],
+        timeout_seconds: int,
+        hook: Optional[Callable[[pa.RecordBatch], None]],
+        first: Dict[str, Any],
+        warm: bool,
+        question: Optional[str],
+        timer: PhaseTimer,
+    ) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Top up an invalidated time-series snapshot (kept by CacheService.retire) instead of
+        re-running its whole history: fetch the rows from the snapshot's latest time value on
+        (spec["time"]["incremental_sql"], bound parameter INCREMENTAL_SINCE_PARAM), then write
+        the base's older row groups plus the new rows as the snapshot. None when there is no
+        usable base, or either part may have been cut by the row limit; the caller then runs
+        the full query.
+        """
+        base_key = base_key_for(cache_key)
+        base = self.cache.path_for_key(base_key)
+        column = spec["time"]["alias"]
+        top = int(spec.get("top") or 0)
+        try:
+            since = watermark(base, column) if base.exists() else None
+            base_rows = pq.ParquetFile(base).metadata.num_rows if since is not None else 0
+        except Exception:
+            return None
+        if since is None or (top and base_rows >= top):
+            return None
+
+        df = run_sql_query(
+            sql=spec["time"]["incremental_sql"],
+            params={**(params or {}), INCREMENTAL_SINCE_PARAM: since},
+            timeout_seconds=timeout_seconds,
+            max_rows=int(self.settings.MAX_RETURNED_ROWS),
+            settings=self.settings,
+            cancel=cancel,
+            on_first_batch=hook,
+            timer=timer,
+        )
+        fetch = df.attrs.pop("fetch", {})
+        if fetch.get("truncated_by") or (top and len(df) >= top):
+            return None
+
+        t0 = time.perf_counter()
+        try:
+            path, rows = self.cache.put_batches(
+                cache_key, merged_batches(base, column, since, pa.Table.from_pandas(df, preserve_index=False))
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError):
+            # New rows that do not fit the base's schema: rebuild from scratch.
+            return None
+        timer.add("parquet_write", time.perf_counter() - t0)
+        if path is None:
+            return None
+        self.cache.register(
+            cache_key, path, sql=sql, params=params, spec=spec, rows=rows, fetch_seconds=time.time() - start,
+            warmed=warm, db_seconds=timer.db_seconds(), db_bytes=int(fetch.get("bytes") or 0), timer=timer,
+        )
+        self.cache.delete(base_key)
+        self._count_db_fill(sql, spec, warm=warm, question=question, seconds=timer.db_seconds())
+
+        read = self.cache.read(cache_key, max_rows=int(self.settings.MAX_RETURNED_ROWS), record_hit=False, timer=timer)
+        if read is None:
+            raise RuntimeError(f"Merged snapshot {path} could not be read back.")
+        merged = read[0]
+        meta = {
+            "cache_key": cache_key,
+            "cache_hit": False,
+            "rows": int(len(merged)),
+            "seconds": round(time.time() - start, 4),
+            "mode": "incremental",
+            "incremental": {"since": str(since), "base_rows_kept": int(rows - len(df)), "new_rows": int(len(df))},
+            "timeout_seconds": int(timeout_seconds),
+            "fetch": fetch,
+            "profile": timer.report(bytes_transferred=int(fetch.get("bytes") or 0)),
+            **first,
         }
-        return df, meta
\ No newline at end of file
+        return merged, meta
+
+    def _count_db_fill(
+        self, sql: str, spec: Optional[Dict[str, Any]], *, warm: bool, question: Optional[str], seconds: float
+    ) -> None:
+        tables = list(spec.get("tables") or []) if spec else referenced_tables(sql)
+        counter = "warm_fills" if warm else "misses"
+        self.cache.catalog.record_metrics({counter: 1, "db_seconds_spent": seconds}, tables=tables, question=question)
+
+    def _derive(self, spec: Dict[str, Any]) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        # Best-effort: any failure (type mismatch in a filter, unreadable snapshot) falls back to the DB.
+        try:
+            return self.cache.derive_from_snapshots(spec)
+        except Exception:
+            return None
+
+    def _from_mirror(self, spec: Dict[str, Any], sla_seconds: int) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        # Same best-effort rule as _derive: a mirror that cannot answer sends the query to the DB.
+        try:
+            return self.cache.derive_from_mirror(spec, sla_seconds)
+        except Exception:
+            return None
\ No newline at end of file
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import math
 
 import pandas as pd
 
+from utils.result_slicing import detail_slice, total_row
+from utils.result_typing import is_category_like
+
 
 class InsightAgent:
     """
@@ -19,9 +22,24 @@ class InsightAgent:
         "correlations": [{"a": str, "b": str, "corr": float}],
         "warnings": [str]
       }
+
+    GROUPING SETS results (see SQLAgent) are sliced by grain: KPI cards read the grand-total
+    row, everything else works on the finest grain. No client-side re-aggregation.
+
+    Approximate (sampled) results are labeled: KPI values get a "≈" prefix and the error
+    bound from exec_meta["approximate"] in their context.
     """
 
-    def generate(self, *, df: pd.DataFrame, plan: Dict[str, Any]) -> Dict[str, Any]:
+    def generate(
+        self,
+        *,
+        df: pd.DataFrame,
+        plan: Dict[str, Any],
+        exec_meta: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        approx = (exec_meta or {}).get("approximate") or None
+        total = total_row(df, plan) if df is not None else None
+        df = detail_slice(df, plan)
         if df is None or df.empty:
             return {
                 "kpis": [{"title": "No Data", "value": "0 rows", "context": "Query returned no records"}],
@@ -33,7 +51,7 @@ class InsightAgent:
             }
 
         numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-        cat_cols = [c for c in df.columns if pd.api.types.is_string_dtype(df[c]) or df[c].dtype == "object"]
+        cat_cols = [c for c in df.columns if is_category_like(df[c])]
         date_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
 
         warnings: List[str] = []
@@ -41,14 +59,18 @@ class InsightAgent:
             warnings.append("large_dataframe_memory_risk")
 
         # KPI cards
-        kpis = self._kpis_from_plan(df=df, plan=plan, numeric_cols=numeric_cols)
+        kpis = self._kpis_from_plan(df=df, plan=plan, numeric_cols=numeric_cols, total=total)
         if not kpis:
             kpis = [{"title": "Rows", "value": f"{len(df):,}", "context": "Returned rows"}]
             kpis.append({"title": "Columns", "value": f"{len(df.columns):,}", "context": "Returned columns"})
             if numeric_cols:
                 col = numeric_cols[0]
-                kpis.append({"title": f"Sum({col})", "value": self._fmt(df[col].sum()), "context": "Total"})
-                kpis.append({"title": f"Avg({col})", "value": self._fmt(df[col].mean()), "context": "Mean"})
+                v = df[col].astype("float64")  # compacted frames may hold float32/int8 columns
+                kpis.append({"title": f"Sum({col})", "value": self._fmt(v.sum()), "context": "Total"})
+                kpis.append({"title": f"Avg({col})", "value": self._fmt(v.mean()), "context": "Mean"})
+        if approx:
+            kpis = self._label_approximate(kpis, approx)
+            warnings.append("approximate_result")
 
         # Distributions (top categories)
         distributions: List[Dict[str, Any]] = []
@@ -110,6 +132,8 @@ class InsightAgent:
             summary += " Trend signals detected."
         if correlations:
             summary += f" Strongest numeric relationship: {correlations[0]['a']} vs {correlations[0]['b']} (corr={correlations[0]['corr']:.2f})."
+        if approx and approx.get("sampling_rate_pct"):
+            summary += f" Approximate: computed from a {approx['sampling_rate_pct']}% sample of {approx.get('table')}."
 
         return {
             "kpis": kpis,
@@ -120,7 +144,14 @@ class InsightAgent:
             "warnings": warnings,
         }
 
-    def _kpis_from_plan(self, *, df: pd.DataFrame, plan: Dict[str, Any], numeric_cols: List[str]) -> List[Dict[str, Any]]:
+    def _kpis_from_plan(
+        self,
+        *,
+        df: pd.DataFrame,
+        plan: Dict[str, Any],
+        numeric_cols: List[str],
+        total: Optional[pd.Series] = None,
+    ) -> List[Dict[str, Any]]:
         out: List[Dict[str, Any]] = []
 
         # Always include row count card
@@ -141,16 +172,22 @@ class InsightAgent:
             if not isinstance(name, str) or not name.strip():
                 continue
 
+            # Grand total computed by the database (GROUPING SETS `()` row)
+            if total is not None and name in total.index and pd.notna(total[name]):
+                out.append({"title": name, "value": self._fmt(total[name]), "context": "From query (total)"})
+                continue
+
             # Metric exists already as a numeric column (e.g., aggregated SQL output)
             if name in df.columns and pd.api.types.is_numeric_dtype(df[name]):
-                v = df[name].dropna()
+                # float64 accumulation: compacted frames may hold float32/int8 columns.
+                v = df[name].dropna().astype("float64")
                 if not v.empty:
                     out.append({"title": name, "value": self._fmt(float(v.iloc[0]) if len(v) == 1 else float(v.sum())), "context": "From query"})
                 continue
 
             # Else compute from raw field if possible
             if isinstance(field, str) and field in df.columns and pd.api.types.is_numeric_dtype(df[field]):
-                s = df[field].dropna()
+                s = df[field].dropna().astype("float64")
                 if s.empty:
                     continue
 
@@ -177,6 +214,25 @@ class InsightAgent:
 
         return out
 
+    def _label_approximate(self, kpis: List[Dict[str, Any]], approx: Dict[str, Any]) -> List[Dict[str, Any]]:
+        err = approx.get("relative_error_95")
+        bound = f" (±{err * 100:.1f}% at 95%)" if isinstance(err, (int, float)) else ""
+        kinds = approx.get("metrics") or {}
+        out: List[Dict[str, Any]] = []
+        for k in kpis:
+            kind = kinds.get(k.get("title"))
+            if k.get("title") in ("Rows", "Columns") or (kind is None and not approx.get("sampling_rate_pct")):
+                out.append(k)
+                continue
+            if kind == "approx_distinct":
+                note = f"approximate (APPROX_COUNT_DISTINCT, ±{approx.get('approx_distinct_relative_error', 0.02) * 100:.0f}%)"
+            elif kind == "unscaled":
+                note = "approximate (sample estimate, not scaled)"
+            else:
+                note = f"approximate{bound}"
+            out.append({**k, "value": f"≈{k.get('value')}", "context": f"{k.get('context', '')} · {note}".strip(" ·"), "approximate": True})
+        return out
+
     def _fmt(self, x: Any) -> str:
         try:
             v = float(x)
@@ -94,6 +94,7 @@ class PlannerAgent:
             "metrics (list of {name, expr, depends_on}), dimensions (list), filters (list),\n"
             "time_field (string|null), time_granularity (string|null), visuals (list of {type,title,x,y,color,agg}),\n"
             "expected_columns (list), query_cost_risk (low|medium|high), notes.\n"
+            "Prefer filters on partition/indexed columns and joins on foreign keys (see index_hints, pk_fk_hints).\n"
         )
         user = {
             "question": user_question,
@@ -4,8 +4,8 @@ from typing import Any, Dict, List
 import pandas as pd
 
 from config import Settings
-from db.engine import build_engine
-from db.introspect import fetch_tables, fetch_columns, fetch_row_count, sample_table, pk_fk_hints
+from db.engine import get_engine
+from db.introspect import fetch_tables, fetch_columns, fetch_row_count, sample_table, pk_fk_hints, index_hints
 from knowledge_graph.store import KnowledgeGraphStore
 from knowledge_graph.schema_registry import SchemaRegistry
 
@@ -21,7 +21,8 @@ class SchemaAgent:
         self.settings = settings
         self.kg = kg
         self.registry = registry
-        self.engine = build_engine(settings)
+        # Shared process-wide pool (db.engine.get_engine); no new engine per pipeline run.
+        self.engine = get_engine(settings)
 
     def refresh(self, sample_rows: int = 50, top_tables: int | None = None) -> Dict[str, Any]:
         tables = fetch_tables(self.engine)
@@ -39,6 +40,7 @@ class SchemaAgent:
             cols = fetch_columns(self.engine, schema=schema_name, table=table_name)
             row_count = fetch_row_count(self.engine, schema=schema_name, table=table_name)
             hints = pk_fk_hints(self.engine, schema=schema_name, table=table_name)
+            physical = index_hints(self.engine, schema=schema_name, table=table_name)
 
             col_names = [c["column_name"] for c in cols]
             df_sample = pd.DataFrame()
@@ -52,6 +54,7 @@ class SchemaAgent:
                 "row_count": row_count,
                 "columns": cols,
                 "pk_fk_hints": hints,
+                "index_hints": physical,
                 "sample": df_sample.head(sample_rows).to_dict(orient="records"),
             }
 
@@ -61,6 +64,7 @@ class SchemaAgent:
                 "row_count": row_count,
                 "columns": [{"name": c["column_name"], "type": c["data_type"], "nullable": bool(c["is_nullable"])} for c in cols],
                 "pk_fk_hints": hints,
+                "index_hints": physical,
             }
 
         self.kg.save_schema(schema)
@@ -4,13 +4,20 @@ from typing import Any, Dict, List, Optional
 import re
 
 from config import Settings
+from db.dialects import SQLDialect, get_dialect
 from knowledge_graph.schema_registry import SchemaRegistry
+from cache.incremental import INCREMENTAL_SINCE_PARAM
+from utils.result_slicing import GROUPING_ID_COLUMN
+from utils.sampling import SAMPLE_ROWS_COLUMN
+from utils.access_paths import choose_join_keys, estimate_cost, predicate_rank
 
 
 class SQLAgent:
     """
-    Generates SELECT-only SQL Server queries with explicit columns.
+    Generates SELECT-only queries with explicit columns.
     Uses SchemaRegistry to ensure no hallucinated columns/tables.
+    Engine specifics (quoting, row limits, date buckets, sampling) come from the
+    SQLDialect resolved from settings.DB_DIALECT (SQL Server, DuckDB, SQLite).
 
     Key behavior:
     - Always explicit column list (no SELECT *).
@@ -18,12 +25,23 @@ class SQLAgent:
     - Respects Large Query Mode:
         - large_mode=True => TOP(MAX_RETURNED_ROWS)
         - else => TOP(DEFAULT_EXPLORATORY_TOP)
+    - Approximate exploratory mode (large_mode=False, approximate=True):
+        - big primary table => TABLESAMPLE SYSTEM (p PERCENT), SUM/COUNT scaled by 100/p
+        - count_distinct => APPROX_COUNT_DISTINCT (no sampling, HLL over full table)
     - If plan indicates aggregation, we generate GROUP BY.
+    - Index-aware: with index/partition/columnstore hints from the registry, WHERE predicates
+      are ordered partition/index-backed first, missing join keys are filled from a declared
+      FK pair (planned keys are kept; an unindexed one is flagged), and the bundle carries an expected-cost annotation with warnings for scans of
+      large tables.
+    - If the plan needs several grains (total KPIs, per-visual breakdowns, full detail),
+      we emit ONE GROUP BY GROUPING SETS query tagged with GROUPING_ID so downstream
+      stages slice by grain instead of re-aggregating in pandas.
     """
 
-    def __init__(self, settings: Settings, registry: SchemaRegistry):
+    def __init__(self, settings: Settings, registry: SchemaRegistry, dialect: Optional[SQLDialect] = None):
         self.settings = settings
         self.registry = registry
+        self.dialect = dialect or get_dialect(settings)
 
     def generate_sql(
         self,
@@ -31,6 +49,7 @@ class SQLAgent:
         allowed_tables: List[str],
         *,
         large_mode: Optional[bool] = None,
+        approximate: Optional[bool] = None,
     ) -> Dict[str, Any]:
         reg = self.registry.load()
 
@@ -48,10 +67,25 @@ class SQLAgent:
         primary = tables[0]
         joins = plan.get("joins", []) if isinstance(plan.get("joins", []), list) else []
 
+        if large_mode is None:
+            large_mode = bool(plan.get("large_mode", False))
+        if approximate is None:
+            approximate = bool(plan.get("approximate", False))
+
+        metrics = plan.get("metrics", []) if isinstance(plan.get("metrics", []), list) else []
+        sampling = self._sampling_for(reg, primary, metrics) if (approximate and not large_mode) else None
+        scale = float(sampling["scale"]) if sampling and sampling.get("rate_pct") else None
+
         # FROM + JOIN clauses
         from_clause = f"FROM {self._fmt_table(primary)} AS t0"
+        if scale:
+            from_clause += f" {self.dialect.tablesample(sampling['rate_pct'])}"
         alias_map: Dict[str, str] = {primary: "t0"}
         join_clauses: List[str] = []
+        join_keys: List[str] = []
+        join_infos: List[Dict[str, Any]] = []
+        access_notes: List[str] = []
+        join_warnings: List[str] = []
         alias_i = 1
 
         for j in joins:
@@ -63,6 +97,13 @@ class SQLAgent:
             rk = j.get("right_key")
             jt = (j.get("join_type") or "LEFT").upper()
 
+            if isinstance(lt, str) and isinstance(rt, str):
+                lk, rk, note, warning = choose_join_keys(reg.get("tables", {}), lt, rt, lk, rk)
+                if note:
+                    access_notes.append(note)
+                if warning:
+                    join_warnings.append(warning)
+
             if not all(isinstance(x, str) for x in [lt, rt, lk, rk]):
                 continue
 
@@ -83,11 +124,12 @@ class SQLAgent:
 
             join_clauses.append(
                 f"{jt} JOIN {self._fmt_table(rt)} AS {alias_map[rt]} "
-                f"ON {alias_map[lt]}.[{lk}] = {alias_map[rt]}.[{rk}]"
+                f"ON {self._col(alias_map[lt], lk)} = {self._col(alias_map[rt], rk)}"
             )
+            join_keys.append(f"{jt}:{lt}.{lk}={rt}.{rk}")
+            join_infos.append({"left_table": lt, "right_table": rt, "left_key": lk, "right_key": rk})
 
         # Determine aggregation mode
-        metrics = plan.get("metrics", []) if isinstance(plan.get("metrics", []), list) else []
         is_agg = bool(plan.get("aggregation") or plan.get("group_by") or any(self._is_metric_agg(m) for m in metrics))
 
         dims = [d for d in plan.get("dimensions", []) if isinstance(d, str)]
@@ -96,22 +138,36 @@ class SQLAgent:
         # SELECT columns (dimensions/time)
         dim_select_cols: List[str] = []
         group_by_cols: List[str] = []
+        buckets: Dict[str, Dict[str, str]] = {}
 
         for d in dims:
             col_ref = self._resolve_column(d, tables, alias_map)
-            if col_ref:
+            if col_ref and col_ref not in dim_select_cols:
                 dim_select_cols.append(col_ref)
                 group_by_cols.append(col_ref.split(" AS ")[0].strip())
 
+        time_col: Optional[str] = None
+        time_alias: Optional[str] = None
         if time_field:
             tf = self._resolve_column(time_field, tables, alias_map)
+            time_col = tf.split(" AS ")[0].strip() if tf else None
+            granularity = plan.get("time_granularity")
+            if tf and is_agg and isinstance(granularity, str):
+                # Bucket the time field (day/week/month/quarter/year) in the engine's own syntax.
+                bucket = self.dialect.date_bucket(tf.split(" AS ")[0].strip(), granularity)
+                if bucket:
+                    source = self._source_of(tf.split(" AS ")[0].strip(), alias_map)
+                    tf = f"{bucket} AS {self._q(self._alias_name(tf))}"
+                    buckets[self._alias_name(tf)] = {"bucket": granularity.lower().strip(), "source": source}
             if tf and tf not in dim_select_cols:
                 dim_select_cols.append(tf)
                 group_by_cols.append(tf.split(" AS ")[0].strip())
+            time_alias = self._alias_name(tf) if tf else None
 
         # Metric SELECT columns
         metric_select_cols: List[str] = []
         metric_expected_names: List[str] = []
+        metric_specs: List[Dict[str, Any]] = []
 
         for m in metrics:
             if not isinstance(m, dict):
@@ -143,25 +199,39 @@ class SQLAgent:
                 continue
             base_left = base_col.split(" AS ")[0].strip()
 
-            sql_agg = self._agg_sql(agg, base_left)
             alias = self._safe_alias(m_name)
-            metric_select_cols.append(f"{sql_agg} AS [{alias}]")
+            if sampling is not None:
+                sql_agg = self._approx_agg_sql(agg, base_left, scale)
+                if agg == "count_distinct":
+                    kind = "approx_distinct" if self.dialect.supports_approx_count_distinct else "exact"
+                else:
+                    kind = "scaled" if scale and agg in {"sum", "count"} else "unscaled"
+                sampling["metrics"][alias] = kind
+            else:
+                sql_agg = self._agg_sql(agg, base_left)
+            metric_select_cols.append(f"{sql_agg} AS {self._q(alias)}")
             metric_expected_names.append(alias)
+            metric_specs.append({"alias": alias, "agg": agg, "source": self._source_of(base_left, alias_map)})
 
         # Fallback if nothing selected
         if not dim_select_cols and not metric_select_cols:
             # pick first N columns from primary
             cols = self.registry.table_columns(primary)
             cols = cols[: min(12, len(cols))]
-            dim_select_cols = [f"{alias_map[primary]}.[{c}] AS [{c}]" for c in cols]
+            dim_select_cols = [f"{self._col(alias_map[primary], c)} AS {self._q(c)}" for c in cols]
             # no GROUP BY; this becomes raw select
 
         # Deduplicate
         select_cols = self._dedupe_by_alias(dim_select_cols + metric_select_cols)
+        if scale and is_agg:
+            # Per-row sample size feeds the error estimate (see utils.sampling).
+            select_cols.append(f"COUNT(1) AS {self._q(SAMPLE_ROWS_COLUMN)}")
 
         # WHERE filters (parameterized)
         params: Dict[str, Any] = {}
-        where_parts: List[str] = []
+        where_parts: List[Any] = []
+        filter_specs: List[Dict[str, Any]] = []
+        filter_infos: List[Dict[str, Any]] = []
 
         filters = plan.get("filters", []) if isinstance(plan.get("filters", []), list) else []
         for idx, f in enumerate(filters):
@@ -178,6 +248,9 @@ class SQLAgent:
 
             p = f"p{idx}"
             op_l = op.lower()
+            source = self._source_of(left, alias_map) or ""
+            f_table, _, f_col = source.rpartition(".")
+            rank = predicate_rank(reg.get("tables", {}).get(f_table) or {}, f_col, op_l, value)
 
             if op_l == "in":
                 if not isinstance(value, list) or not value:
@@ -187,50 +260,131 @@ class SQLAgent:
                     pj = f"{p}_{j}"
                     params[pj] = vv
                     placeholders.append(f":{pj}")
-                where_parts.append(f"{left} IN ({', '.join(placeholders)})")
+                where_parts.append((rank, f"{left} IN ({', '.join(placeholders)})"))
+                filter_specs.append({"source": self._source_of(left, alias_map), "op": "in", "value": list(value)})
+                filter_infos.append({"table": f_table, "column": f_col, "op": "in", "value": value})
             else:
                 safe_ops = {"=", "!=", "<>", ">", ">=", "<", "<=", "like"}
                 if op_l not in safe_ops:
                     op = "="
                 params[p] = value
-                where_parts.append(f"{left} {op} :{p}")
+                where_parts.append((rank, f"{left} {op} :{p}"))
+                filter_specs.append({"source": self._source_of(left, alias_map), "op": op.lower(), "value": value})
+                filter_infos.append({"table": f_table, "column": f_col, "op": op.lower(), "value": value})
 
+        # Partition/index-backed, sargable predicates first (stable for equal ranks).
+        where_parts = [sql_part for _rank, sql_part in sorted(where_parts, key=lambda x: x[0])]
         where_clause = f"WHERE {' AND '.join(where_parts)}" if where_parts else ""
 
         # GROUP BY if aggregation
         group_by_clause = ""
+        order_by_clause = ""
+        grouping_sets: List[Dict[str, Any]] = []
         if is_agg:
             # Only group by dimension/time fields
             gb = [c for c in group_by_cols if c]
-            if gb:
+            gb_aliases = [self._alias_name(c) for c in dim_select_cols]
+            grains = self._plan_grains(plan, gb_aliases, has_metrics=bool(metric_expected_names))
+            use_sets = bool(getattr(self.settings, "ENABLE_GROUPING_SETS", True)) and self.dialect.supports_grouping_sets
+            if gb and len(grains) > 1 and use_sets:
+                # One scan for every grain; GROUPING_ID tells downstream which set a row belongs to.
+                sets_sql = []
+                for grain in grains:
+                    cols = [gb[gb_aliases.index(a)] for a in grain]
+                    sets_sql.append("(" + ", ".join(cols) + ")")
+                    grouping_sets.append(
+                        {
+                            "id": self._grouping_id(grain, gb_aliases),
+                            "columns": list(grain),
+                        }
+                    )
+                select_cols.append(f"{self.dialect.grouping_id(gb)} AS {self._q(GROUPING_ID_COLUMN)}")
+                group_by_clause = "GROUP BY GROUPING SETS (" + ", ".join(sets_sql) + ")"
+                # Coarse grains first so a TOP cutoff trims detail rows, never totals.
+                order_by_clause = f"ORDER BY {self._q(GROUPING_ID_COLUMN)} DESC"
+            elif gb:
                 group_by_clause = "GROUP BY " + ", ".join(gb)
 
         # TOP selection (Large Query Mode)
-        if large_mode is None:
-            large_mode = bool(plan.get("large_mode", False))
-
         top = int(self.settings.MAX_RETURNED_ROWS if large_mode else self.settings.DEFAULT_EXPLORATORY_TOP)
 
         # In agg mode, TOP still helps if dimension cardinality is huge; keep it.
-        select_prefix = f"SELECT TOP ({top}) "
+        select_prefix = f"SELECT {self.dialect.limit_prefix(top)}"
 
         select_list = ",\n  ".join(select_cols)
 
-        sql = "\n".join(
-            [
-                f"{select_prefix}\n  {select_list}",
-                from_clause,
-                *join_clauses,
-                where_clause,
-                group_by_clause,
-            ]
-        ).strip()
+        def assemble(where: str) -> str:
+            return "\n".join(
+                [
+                    f"{select_prefix}\n  {select_list}",
+                    from_clause,
+                    *join_clauses,
+                    where,
+                    group_by_clause,
+                    order_by_clause,
+                    self.dialect.limit_suffix(top),
+                ]
+            ).strip()
+
+        sql = assemble(where_clause)
 
         # expected columns for downstream validation
         expected = [self._alias_name(c) for c in select_cols]
         plan["expected_columns"] = expected
-
-        return {"sql": sql, "params": params, "expected_columns": expected, "is_aggregated": is_agg, "top": top}
+        plan["grouping_sets"] = grouping_sets
+        plan["sampling"] = sampling
+
+        # Structured description of the query; the snapshot catalog uses it to answer
+        # later queries from a cached superset (cache/containment.py).
+        spec = {
+            "tables": sorted(alias_map.keys()),
+            "joins": sorted(join_keys),
+            "aggregated": bool(group_by_clause or metric_specs),
+            "dimensions": [self._column_spec(c, alias_map, buckets) for c in dim_select_cols],
+            "metrics": metric_specs,
+            "filters": filter_specs,
+            "case_insensitive_ops": sorted(self.dialect.case_insensitive_ops),
+            "grouping_sets": grouping_sets,
+            "sampled": bool(sampling and sampling.get("approximate")),
+            "top": top,
+        }
+        cost = estimate_cost(
+            reg.get("tables", {}),
+            primary,
+            filter_infos,
+            join_infos,
+            warn_min_rows=int(getattr(self.settings, "INDEX_WARN_MIN_ROWS", 1000000)),
+        )
+        cost["notes"] = access_notes
+        cost["warnings"] = join_warnings + cost["warnings"]
+
+        if time_col and time_alias and not grouping_sets and sampling is None:
+            # Incremental refresh (Executor): re-fetch only rows at or after the snapshot's
+            # latest time value, i.e. the latest (possibly partial) bucket onwards.
+            since = f"{time_col} >= :{INCREMENTAL_SINCE_PARAM}"
+            spec["time"] = {
+                "alias": time_alias,
+                "source": self._source_of(time_col, alias_map),
+                "bucket": buckets.get(time_alias, {}).get("bucket"),
+                "incremental_sql": assemble(f"WHERE {' AND '.join(where_parts + [since])}"),
+            }
+
+        if not spec["aggregated"]:
+            # Raw select: every output column is a plain source column.
+            spec["columns"] = spec["dimensions"] + [self._column_spec(c, alias_map, buckets) for c in metric_select_cols]
+            spec["dimensions"] = []
+
+        return {
+            "sql": sql,
+            "params": params,
+            "expected_columns": expected,
+            "is_aggregated": is_agg,
+            "top": top,
+            "grouping_sets": grouping_sets,
+            "sampling": sampling,
+            "spec": spec,
+            "cost": cost,
+        }
 
     # -----------------------------
     # Helpers
@@ -238,7 +392,31 @@ class SQLAgent:
 
     def _fmt_table(self, table_key: str) -> str:
         schema, table = table_key.split(".", 1)
-        return f"[{schema}].[{table}]"
+        return self.dialect.table_ref(schema, table)
+
+    def _column_spec(self, col_expr: str, alias_map: Dict[str, str], buckets: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+        alias = self._alias_name(col_expr)
+        if alias in buckets:
+            return {"alias": alias, "source": buckets[alias]["source"], "bucket": buckets[alias]["bucket"]}
+        return {"alias": alias, "source": self._source_of(col_expr.split(" AS ")[0].strip(), alias_map), "bucket": None}
+
+    def _source_of(self, col_left: str, alias_map: Dict[str, str]) -> Optional[str]:
+        """Map "t0.<quoted col>" back to "schema.table.col" (None for computed expressions)."""
+        m = re.match(r"^(t\d+)\.(.+)$", (col_left or "").strip())
+        if not m:
+            return None
+        table_by_alias = {a: t for t, a in alias_map.items()}
+        table = table_by_alias.get(m.group(1))
+        ident = m.group(2)
+        if len(ident) >= 2 and ident[0] in '["' and ident[-1] in ']"':
+            ident = ident[1:-1].replace('""', '"').replace("]]", "]")
+        return f"{table}.{ident}" if table else None
+
+    def _q(self, name: str) -> str:
+        return self.dialect.quote_ident(name)
+
+    def _col(self, table_alias: str, col: str) -> str:
+        return f"{table_alias}.{self._q(col)}"
 
     def _resolve_column(self, hint: str, tables: List[str], alias_map: Dict[str, str]) -> Optional[str]:
         """
@@ -257,7 +435,7 @@ class SQLAgent:
             cpart = parts[2]
             if tpart in alias_map and self.registry.has_column(tpart, cpart):
                 a = alias_map[tpart]
-                return f"{a}.[{cpart}] AS [{cpart}]"
+                return f"{self._col(a, cpart)} AS {self._q(cpart)}"
             return None
 
         # If hint is schema.table (invalid for column)
@@ -271,13 +449,91 @@ class SQLAgent:
             for c in self.registry.table_columns(t):
                 if c.lower() == hint.lower():
                     a = alias_map.get(t, "t0")
-                    return f"{a}.[{c}] AS [{c}]"
+                    return f"{self._col(a, c)} AS {self._q(c)}"
         return None
 
+    def _sampling_for(self, reg: Dict[str, Any], primary: str, metrics: List[Any]) -> Dict[str, Any]:
+        """
+        Sampling decision for approximate mode. Only the primary (fact) table is sampled, and only
+        when it is big enough for TABLESAMPLE to pay off. COUNT DISTINCT cannot be scaled from a
+        sample, so those plans skip sampling and rely on APPROX_COUNT_DISTINCT instead.
+        """
+        row_count = int(reg.get("tables", {}).get(primary, {}).get("row_count", 0) or 0)
+        target = max(int(self.settings.APPROX_SAMPLE_TARGET_ROWS), 1)
+        has_distinct = any(self._is_metric_agg(m) and (m.get("agg") or "").lower().strip() == "count_distinct" for m in metrics)
+
+        rate_pct: Optional[float] = None
+        reason = "sampled"
+        if not self.dialect.supports_tablesample:
+            reason = "dialect_has_no_tablesample"
+        elif has_distinct:
+            reason = "count_distinct_requires_full_scan"
+        elif row_count < int(self.settings.APPROX_MIN_TABLE_ROWS) or row_count <= target:
+            reason = "table_below_sampling_threshold"
+        else:
+            rate_pct = max(round(100.0 * target / row_count, 4), 0.0001)
+
+        return {
+            "approximate": bool(rate_pct) or (has_distinct and self.dialect.supports_approx_count_distinct),
+            "table": primary,
+            "table_rows": row_count,
+            "rate_pct": rate_pct,
+            "scale": round(100.0 / rate_pct, 6) if rate_pct else 1.0,
+            "method": f"TABLESAMPLE ({self.dialect.name})" if rate_pct else None,
+            "reason": reason,
+            "metrics": {},
+        }
+
+    def _approx_agg_sql(self, agg: str, col_left: str, scale: Optional[float]) -> str:
+        agg = (agg or "").lower().strip()
+        if agg == "count_distinct":
+            return self.dialect.approx_count_distinct(col_left)
+        base = self._agg_sql(agg, col_left)
+        if scale and agg in {"sum", "count"}:
+            return f"{base} * {scale}"
+        return base
+
+    def _plan_grains(self, plan: Dict[str, Any], gb_aliases: List[str], *, has_metrics: bool) -> List[List[str]]:
+        """
+        Grains (lists of grouped aliases) the downstream stages will read:
+        - full detail (all dimensions/time) always
+        - per-visual breakdowns (x, optionally color) when they are coarser than detail
+        - grand total () when there are aggregated metrics (KPI cards)
+        Ordered finest → coarsest, deduplicated.
+        """
+        grains: List[List[str]] = [list(gb_aliases)]
+
+        visuals = plan.get("visuals", []) if isinstance(plan.get("visuals", []), list) else []
+        for v in visuals:
+            if not isinstance(v, dict):
+                continue
+            grain = [c for c in [v.get("x"), v.get("color")] if isinstance(c, str) and c in gb_aliases]
+            if grain:
+                grains.append([a for a in gb_aliases if a in grain])
+
+        if has_metrics:
+            grains.append([])
+
+        out: List[List[str]] = []
+        for g in sorted(grains, key=len, reverse=True):
+            if g not in out:
+                out.append(g)
+        return out
+
+    def _grouping_id(self, grain: List[str], gb_aliases: List[str]) -> int:
+        # Mirrors SQL GROUPING_ID(c0..cn-1): bit (n-1-i) is set when ci is rolled up.
+        gid = 0
+        n = len(gb_aliases)
+        for i, a in enumerate(gb_aliases):
+            if a not in grain:
+                gid |= 1 << (n - 1 - i)
+        return gid
+
     def _alias_name(self, col_expr: str) -> str:
-        m = re.search(r"\s+AS\s+\[(.+?)\]\s*$", col_expr, flags=re.IGNORECASE)
+        m = re.search(self.dialect.alias_pattern(), col_expr, flags=re.IGNORECASE)
         if m:
-            return m.group(1)
+            # undo identifier escaping ("" or ]])
+            return m.group(1).replace('""', '"').replace("]]", "]")
         return col_expr
 
     def _dedupe_by_alias(self, col_exprs: List[str]) -> List[str]:
@@ -291,7 +547,7 @@ class SQLAgent:
         return cleaned
 
     def _safe_alias(self, name: str) -> str:
-        # keep readable but safe for [alias]
+        # keep readable but safe as a quoted alias in every dialect
         name = (name or "").strip()
         name = re.sub(r"[^a-zA-Z0-9 _-]", "", name)
         name = re.sub(r"\s+", " ", name).strip()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.dialects import DuckDBDialect
+from utils.result_slicing import GROUPING_ID_COLUMN
+
+
+# Aggregates that can be recomputed from partial aggregates of the same kind.
+REAGGREGATE = {"sum": "SUM", "count": "SUM", "min": "MIN", "max": "MAX"}
+
+RAW_AGG = {
+    "sum": "SUM({c})",
+    "avg": "AVG({c})",
+    "mean": "AVG({c})",
+    "min": "MIN({c})",
+    "max": "MAX({c})",
+    "count": "COUNT(1)",
+    "count_distinct": "COUNT(DISTINCT {c})",
+}
+
+SAFE_OPS = {"=", "!=", "<>", ">", ">=", "<", "<=", "like", "in"}
+RANGE_OPS = {">", ">=", "<", "<="}
+
+_DUCK = DuckDBDialect()
+
+
+def _key(col: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    return (col.get("source"), col.get("bucket"))
+
+
+def _detail_grouping_id(cached: Dict[str, Any]) -> Optional[int]:
+    sets = [g for g in cached.get("grouping_sets") or [] if isinstance(g, dict)]
+    if not sets:
+        return None
+    return int(max(sets, key=lambda g: len(g.get("columns") or []))["id"])
+
+
+def _is_text(value: Any) -> bool:
+    if isinstance(value, (list, tuple)):
+        return bool(value) and all(isinstance(v, str) for v in value)
+    return isinstance(value, str)
+
+
+def find_derivation(spec: Dict[str, Any], cached: Dict[str, Any], cached_rows: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Decide whether the query described by `spec` can be computed from a cached snapshot whose
+    query is `cached` (both are SQLAgent "spec" dicts). Containment requires:
+      - same tables and joins
+      - the cached result is complete (not sampled, not cut by its row limit); for a GROUPING SETS
+        snapshot only its finest set (the full-detail rows) is read
+      - every cached filter is also in the new query; extra filters hit columns present in the snapshot
+        (string filters the source compares case-insensitively are matched with lower(); string
+        range filters under such a collation are not derived, DuckDB orders strings by bytes)
+      - new dimensions ⊆ cached dimensions (rollup) or new columns ⊆ cached raw columns
+    Returns a derivation plan or None.
+    """
+    if not spec or not cached or spec.get("sampled") or cached.get("sampled"):
+        return None
+    if sorted(spec.get("tables") or []) != sorted(cached.get("tables") or []):
+        return None
+    if sorted(spec.get("joins") or []) != sorted(cached.get("joins") or []):
+        return None
+    top = cached.get("top")
+    if cached_rows is None or (isinstance(top, int) and cached_rows >= top):
+        return None
+
+    new_filters: List[Dict[str, Any]] = list(spec.get("filters") or [])
+    old_filters: List[Dict[str, Any]] = list(cached.get("filters") or [])
+    if any(f not in new_filters for f in old_filters):
+        return None
+    extra = [f for f in new_filters if f not in old_filters]
+
+    cached_agg = bool(cached.get("aggregated"))
+    cached_cols = cached.get("dimensions") if cached_agg else cached.get("columns")
+    available = {_key(c): c["alias"] for c in (cached_cols or []) if c.get("source")}
+
+    ci_ops = set(spec.get("case_insensitive_ops") or [])
+    for f in extra:
+        if f.get("op") not in SAFE_OPS or (f.get("source"), None) not in available:
+            return None
+        if f.get("op") in RANGE_OPS and f.get("op") in ci_ops and _is_text(f.get("value")):
+            return None
+
+    operations = ["filter"] if extra else []
+    detail_id = _detail_grouping_id(cached)
+
+    if not spec.get("aggregated"):
+        if cached_agg:
+            return None
+        cols = spec.get("columns") or []
+        if not cols or any(_key(c) not in available for c in cols):
+            return None
+        return {"mode": "project", "extra_filters": extra, "available": available, "operations": operations + ["project"], "detail_grouping_id": None}
+
+    dims = spec.get("dimensions") or []
+    metrics = spec.get("metrics") or []
+
+    if cached_agg:
+        if any(_key(d) not in available for d in dims):
+            return None
+        cached_metrics = {(m.get("agg"), m.get("source")): m["alias"] for m in (cached.get("metrics") or [])}
+        same_grain = {_key(d) for d in dims} == set(available) and not spec.get("grouping_sets")
+        for m in metrics:
+            if (m.get("agg"), m.get("source")) not in cached_metrics:
+                return None
+            if not same_grain and m.get("agg") not in REAGGREGATE:
+                return None
+        mode = "copy" if same_grain else "rollup"
+        return {
+            "mode": mode,
+            "extra_filters": extra,
+            "available": available,
+            "metric_columns": cached_metrics,
+            "operations": operations + ([] if same_grain else ["rollup"]),
+            "detail_grouping_id": detail_id,
+        }
+
+    # Cached raw rows: any dimension/bucket/aggregate can be recomputed locally.
+    raw = {source for (source, _bucket) in available}
+    if any(d.get("source") not in raw for d in dims):
+        return None
+    if any(m.get("source") not in raw and m.get("agg") != "count" for m in metrics):
+        return None
+    return {"mode": "aggregate_raw", "extra_filters": extra, "available": available, "operations": operations + ["aggregate"], "detail_grouping_id": None}
+
+
+def derivation_sql(spec: Dict[str, Any], derivation: Dict[str, Any], parquet_path: str) -> Tuple[str, Dict[str, Any]]:
+    """DuckDB SQL (+ $named params) computing `spec` from the snapshot at parquet_path."""
+    q = _DUCK.quote_ident
+    available = derivation["available"]
+    raw_alias = {source: alias for (source, _bucket), alias in available.items()}
+
+    def col(source: Optional[str], bucket: Optional[str] = None) -> str:
+        if (source, bucket) in available:
+            return f"c.{q(available[(source, bucket)])}"
+        expr = f"c.{q(raw_alias[source])}"
+        return _DUCK.date_bucket(expr, bucket) or expr
+
+    select: List[str] = []
+    group_by: List[str] = []
+    mode = derivation["mode"]
+
+    if mode == "project":
+        select = [f"{col(c['source'])} AS {q(c['alias'])}" for c in spec.get("columns") or []]
+    else:
+        for d in spec.get("dimensions") or []:
+            expr = col(d.get("source"), d.get("bucket"))
+            select.append(f"{expr} AS {q(d['alias'])}")
+            group_by.append(expr)
+        for m in spec.get("metrics") or []:
+            agg = m.get("agg")
+            if mode == "copy":
+                expr = f"c.{q(derivation['metric_columns'][(agg, m.get('source'))])}"
+            elif mode == "rollup":
+                expr = f"{REAGGREGATE[agg]}(c.{q(derivation['metric_columns'][(agg, m.get('source'))])})"
+            else:
+                src = m.get("source")
+                expr = RAW_AGG.get(agg, "SUM({c})").format(c=col(src) if src in raw_alias else "1")
+            select.append(f"{expr} AS {q(m['alias'])}")
+
+    params: Dict[str, Any] = {}
+    where: List[str] = []
+    if derivation.get("detail_grouping_id") is not None:
+        where.append(f"c.{q(GROUPING_ID_COLUMN)} = {int(derivation['detail_grouping_id'])}")
+    ci_ops = set(spec.get("case_insensitive_ops") or [])
+    for i, f in enumerate(derivation["extra_filters"]):
+        left = col(f.get("source"))
+        op = f.get("op")
+        fold = op in ci_ops and _is_text(f.get("value"))
+        if fold:
+            left = f"lower(CAST({left} AS VARCHAR))"
+        if op == "in":
+            names = []
+            for j, v in enumerate(f.get("value") or []):
+                params[f"d{i}_{j}"] = v
+                names.append(f"lower($d{i}_{j})" if fold and isinstance(v, str) else f"$d{i}_{j}")
+            where.append(f"{left} IN ({', '.join(names)})")
+        else:
+            params[f"d{i}"] = f.get("value")
+            right = f"lower($d{i})" if fold else f"$d{i}"
+            where.append(f"{left} {op.upper() if op == 'like' else op} {right}")
+
+    sets = spec.get("grouping_sets") or []
+    tail: List[str] = []
+    if mode in ("rollup", "aggregate_raw") and group_by:
+        if sets:
+            by_alias = {d["alias"]: col(d.get("source"), d.get("bucket")) for d in spec.get("dimensions") or []}
+            select.append(f"{_DUCK.grouping_id(group_by)} AS {q(GROUPING_ID_COLUMN)}")
+            grouping = ", ".join("(" + ", ".join(by_alias[a] for a in g["columns"]) + ")" for g in sets)
+            tail.append(f"GROUP BY GROUPING SETS ({grouping})")
+            tail.append(f"ORDER BY {q(GROUPING_ID_COLUMN)} DESC")
+        else:
+            tail.append("GROUP BY " + ", ".join(group_by))
+    if isinstance(spec.get("top"), int):
+        tail.append(f"LIMIT {int(spec['top'])}")
+
+    path = str(parquet_path).replace("'", "''")
+    sql = "\n".join(
+        [
+            "SELECT " + ",\n  ".join(select),
+            f"FROM read_parquet('{path}') AS c",
+            ("WHERE " + " AND ".join(where)) if where else "",
+            *tail,
+        ]
+    )
+    return sql, params
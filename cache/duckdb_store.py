@@ -2,10 +2,368 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import atexit
+import contextlib
+import datetime as dt
+import json
+import logging
+import threading
+import time
 
 import duckdb
 import pandas as pd
+import pyarrow.parquet as pq
+
+from cache.containment import derivation_sql, find_derivation
+
+log = logging.getLogger("cache.duckdb_store")
+
+# Columns added after the first release; keep older catalogs readable.
+_CATALOG_MIGRATIONS = [
+    ("query_spec", "VARCHAR"),
+    ("row_count", "BIGINT"),
+    ("lineage", "VARCHAR"),
+    ("size_bytes", "BIGINT"),
+    ("hit_count", "BIGINT"),
+    ("last_access_epoch", "DOUBLE"),
+    ("fetch_seconds", "DOUBLE"),
+    ("sql_fingerprint", "VARCHAR"),
+    ("tables", "VARCHAR"),
+    ("sql_text", "VARCHAR"),
+    ("params", "VARCHAR"),
+    ("warmed_epoch", "DOUBLE"),
+    ("warm_hits", "BIGINT"),
+    ("db_seconds", "DOUBLE"),
+    ("db_bytes", "BIGINT"),
+]
+
+# Cache effectiveness counters, accumulated per dimension ("total", "table", "question").
+METRIC_COUNTERS = (
+    "hits",
+    "misses",
+    "local_fills",
+    "warm_fills",
+    "evictions",
+    "invalidations",
+    "bytes_served",
+    "db_bytes_saved",
+    "db_seconds_saved",
+    "db_seconds_spent",
+)
+
+# Every Streamlit session builds its own store: initialise each catalog once per process,
+# since concurrent DDL on one DuckDB file fails with a write-write conflict.
+_INIT_LOCK = threading.Lock()
+_INITIALISED: Set[str] = set()
+
+# Concurrent upserts of one key from separate connections race on the primary key.
+_WRITE_LOCK = threading.Lock()
+
+# Mirror refreshes rewrite Parquet parts in place; queries on the same table wait for them.
+_MIRROR_LOCKS: Dict[str, threading.Lock] = {}
+_MIRROR_LOCKS_GUARD = threading.Lock()
+
+# Derivations and query_cached run on a per-thread in-memory connection, never on the catalog's.
+_SCRATCH = threading.local()
+
+# DuckDB lets one process open a database file at a time. Worker processes sharing CACHE_DIR
+# (non-persistent stores) take turns: each store operation opens and closes the catalog,
+# others retry meanwhile.
+CATALOG_LOCK_WAIT_SECONDS = 30.0
+
+# Persistent catalogs write behind: hits and registrations change the in-memory rows at once
+# and reach the file in one transaction per batch, at most this many seconds later...
+CATALOG_FLUSH_SECONDS = 1.0
+# ...or as soon as this many rows are pending.
+CATALOG_FLUSH_ROWS = 500
+
+_CACHE_COLUMNS = (
+    "cache_key",
+    "parquet_path",
+    "created_at",
+    "query_spec",
+    "row_count",
+    "lineage",
+    "size_bytes",
+    "hit_count",
+    "last_access_epoch",
+    "fetch_seconds",
+    "sql_fingerprint",
+    "tables",
+    "sql_text",
+    "params",
+    "warmed_epoch",
+    "warm_hits",
+    "db_seconds",
+    "db_bytes",
+)
+
+# Overwritten by every registration; the other columns keep their value when the new one is NULL.
+_REPLACED_ON_REGISTER = (
+    "parquet_path", "created_at", "size_bytes", "last_access_epoch", "warmed_epoch", "db_seconds", "db_bytes",
+)
+
+_ENTRY_COLUMNS = (
+    "cache_key",
+    "parquet_path",
+    "sql_fingerprint",
+    "tables",
+    "row_count",
+    "size_bytes",
+    "created_at",
+    "last_access_epoch",
+    "hit_count",
+    "fetch_seconds",
+    "warmed_epoch",
+    "warm_hits",
+    "db_seconds",
+    "db_bytes",
+)
+
+
+def _file_size(path: Path) -> Optional[int]:
+    try:
+        return int(Path(path).stat().st_size)
+    except OSError:
+        return None
+
+
+def _connect(path: Path) -> duckdb.DuckDBPyConnection:
+    deadline = time.monotonic() + CATALOG_LOCK_WAIT_SECONDS
+    delay = 0.01
+    while True:
+        try:
+            return duckdb.connect(str(path))
+        except duckdb.IOException as e:
+            if "lock" not in str(e).lower() or time.monotonic() > deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def _create_schema(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cache_catalog (
+            cache_key VARCHAR PRIMARY KEY,
+            parquet_path VARCHAR NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    existing = {
+        r[0]
+        for r in con.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'cache_catalog'"
+        ).fetchall()
+    }
+    for col, typ in _CATALOG_MIGRATIONS:
+        if col not in existing:
+            con.execute(f"ALTER TABLE cache_catalog ADD COLUMN {col} {typ}")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mirror_catalog (
+            table_key VARCHAR PRIMARY KEY,
+            parquet_dir VARCHAR NOT NULL,
+            watermark_column VARCHAR,
+            watermark_kind VARCHAR,
+            watermark VARCHAR,
+            primary_key VARCHAR,
+            row_count BIGINT,
+            parts INTEGER,
+            refreshed_epoch DOUBLE
+        )
+        """
+    )
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS cache_metrics (
+            dimension VARCHAR,
+            name VARCHAR,
+            {", ".join(f"{c} DOUBLE DEFAULT 0" for c in METRIC_COUNTERS)},
+            updated_epoch DOUBLE,
+            PRIMARY KEY (dimension, name)
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS source_signals (
+            table_key VARCHAR PRIMARY KEY,
+            signal VARCHAR,
+            signal_kind VARCHAR,
+            checked_epoch DOUBLE,
+            changed_epoch DOUBLE
+        )
+        """
+    )
+
+
+def _metric_keys(tables: Optional[List[str]], question: Optional[str]) -> List[Tuple[str, str]]:
+    keys = [("total", "")] + [("table", str(t)) for t in dict.fromkeys(tables or [])]
+    q = " ".join((question or "").split())[:200]
+    if q:
+        keys.append(("question", q))
+    return keys
+
+
+def _add_metrics(cur: Any, deltas: Dict[Tuple[str, str], Dict[str, float]]) -> None:
+    cols = ", ".join(METRIC_COUNTERS)
+    cur.executemany(
+        f"""
+        INSERT INTO cache_metrics (dimension, name, {cols}, updated_epoch)
+        VALUES (?, ?, {", ".join("?" for _ in METRIC_COUNTERS)}, ?)
+        ON CONFLICT (dimension, name) DO UPDATE
+          SET {", ".join(f"{c}=cache_metrics.{c} + excluded.{c}" for c in METRIC_COUNTERS)},
+              updated_epoch=excluded.updated_epoch
+        """,
+        [[dim, name, *(float(d.get(c, 0.0)) for c in METRIC_COUNTERS), time.time()] for (dim, name), d in deltas.items()],
+    )
+
+
+def row_tables(row: Dict[str, Any]) -> List[str]:
+    """Source tables of a cache_catalog row (its json `tables` column)."""
+    try:
+        return [str(t) for t in json.loads(row.get("tables") or "[]")]
+    except ValueError:
+        return []
+
+
+def _hit_deltas(row: Dict[str, Any]) -> Dict[str, float]:
+    # What the hit spared the database: the snapshot's own DB cost, else what it took to produce.
+    saved = row.get("db_seconds") if row.get("db_seconds") is not None else row.get("fetch_seconds")
+    return {
+        "hits": 1,
+        "bytes_served": float(row.get("size_bytes") or 0),
+        "db_bytes_saved": float(row.get("db_bytes") or 0),
+        "db_seconds_saved": float(saved or 0.0),
+    }
+
+
+def _select_cache_rows(con: Any) -> List[Dict[str, Any]]:
+    cur = con.execute(f"SELECT {', '.join(_CACHE_COLUMNS)} FROM cache_catalog")
+    return [dict(zip(_CACHE_COLUMNS, r)) for r in cur.fetchall()]
+
+
+class _Catalog:
+    """
+    A process's long-lived handle on one catalog file: a single connection with a cursor per
+    thread, the cache_catalog rows held in memory for lookups, and write-behind of changed
+    rows by a background thread (CATALOG_FLUSH_SECONDS / CATALOG_FLUSH_ROWS).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.con = _connect(path)
+        _create_schema(self.con)
+        self.lock = threading.Lock()
+        self.rows: Dict[str, Dict[str, Any]] = {r["cache_key"]: r for r in _select_cache_rows(self.con)}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self.metrics: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._local = threading.local()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="catalog-writer", daemon=True)
+        self._thread.start()
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        cur = getattr(self._local, "cursor", None)
+        if cur is None:
+            cur = self._local.cursor = self.con.cursor()
+        return cur
+
+    def changed(self, cache_key: str) -> None:
+        """Mark a row for the next flush (call with self.lock held)."""
+        self._dirty.add(cache_key)
+        if len(self._dirty) >= CATALOG_FLUSH_ROWS:
+            self._wake.set()
+
+    def removed(self, cache_key: str) -> None:
+        self._dirty.discard(cache_key)
+        self._deleted.add(cache_key)
+
+    def count(self, deltas: Dict[str, float], keys: List[Tuple[str, str]]) -> None:
+        """Add to the pending metric counters (call with self.lock held)."""
+        for key in keys:
+            acc = self.metrics.setdefault(key, {})
+            for c, v in deltas.items():
+                acc[c] = acc.get(c, 0.0) + v
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self._dirty) + len(self._deleted) + len(self.metrics)
+
+    def flush(self) -> int:
+        """Write pending rows in one transaction; returns how many were written or deleted."""
+        with self._flush_lock:
+            with self.lock:
+                dirty, deleted, metrics = self._dirty, self._deleted, self.metrics
+                self._dirty, self._deleted, self.metrics = set(), set(), {}
+                rows = [tuple(self.rows[k][c] for c in _CACHE_COLUMNS) for k in dirty if k in self.rows]
+            if not rows and not deleted and not metrics:
+                return 0
+            cur = self.cursor()
+            try:
+                with _WRITE_LOCK:
+                    cur.execute("BEGIN TRANSACTION")
+                    try:
+                        if deleted:
+                            cur.executemany("DELETE FROM cache_catalog WHERE cache_key = ?", [[k] for k in deleted])
+                        if rows:
+                            cur.executemany(
+                                f"INSERT OR REPLACE INTO cache_catalog ({', '.join(_CACHE_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' for _ in _CACHE_COLUMNS)})",
+                                rows,
+                            )
+                        if metrics:
+                            _add_metrics(cur, metrics)
+                        cur.execute("COMMIT")
+                    except Exception:
+                        cur.execute("ROLLBACK")
+                        raise
+            except Exception:
+                with self.lock:
+                    self._deleted |= deleted - set(self.rows)
+                    self._dirty |= {k for k in dirty if k in self.rows}
+                    for key, d in metrics.items():
+                        self.count(d, [key])
+                raise
+            return len(rows) + len(deleted)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(CATALOG_FLUSH_SECONDS)
+            self._wake.clear()
+            if not self.path.parent.exists():  # catalog directory removed: nothing to persist to
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                log.warning(f"catalog flush failed ({self.path}): {e}")
+
+
+_CATALOGS: Dict[str, _Catalog] = {}
+
+
+def _catalog_for(path: Path) -> _Catalog:
+    key = str(path.resolve())
+    with _INIT_LOCK:
+        catalog = _CATALOGS.get(key)
+        if catalog is None:
+            catalog = _CATALOGS[key] = _Catalog(path)
+            _INITIALISED.add(key)
+        return catalog
+
+
+@atexit.register
+def _flush_catalogs() -> None:
+    for catalog in list(_CATALOGS.values()):
+        try:
+            catalog.flush()
+        except Exception:
+            pass
 
 
 @dataclass
@@ -18,68 +376,370 @@ class DuckDBStore:
       - cache_key (string)
       - parquet_path (string)
       - created_at (timestamp)
+      - query_spec (json; SQLAgent's structured query description, for containment)
+      - row_count (rows in the snapshot)
+      - lineage (json; set when a snapshot was derived from another one)
+      - size_bytes, hit_count, last_access_epoch (unix seconds), fetch_seconds (what it cost
+        to produce the snapshot): access stats for eviction (see cache.eviction)
+      - sql_fingerprint (normalised SQL hash) and tables (json list of source tables read)
+      - sql_text and params (json): what to re-run to refresh the snapshot
+      - warmed_epoch (set while the snapshot is the cache warmer's) and warm_hits (hits since)
+      - db_seconds and db_bytes: what the source database spent and sent to produce it
+        (None for snapshots derived locally)
+
+    a second one, mirror_catalog, for tables mirrored locally as partitioned Parquet
+    (see cache.mirror.TableMirror): parquet_dir, watermark column/kind/value, primary key,
+    row and part counts, refreshed_epoch (unix seconds of the last successful refresh),
+    source_signals: the last change signal seen per source table (see cache.freshness),
+    and cache_metrics: effectiveness counters (METRIC_COUNTERS) for the whole cache, per source
+    table and per user question (see record_metrics).
+
+    Persistent stores (the default) share one long-lived connection per catalog file and
+    process, with a cursor per thread; cache_catalog lookups are served from memory and its
+    writes are batched (see _Catalog), so a cache hit costs no DuckDB open, close or upsert.
+    When several worker processes share CACHE_DIR, use persistent=False: the catalog is then
+    opened per operation so the processes can take turns (see from_settings).
 
     Note: This does NOT mutate source DB. It's purely local.
     """
 
     duckdb_path: Path
+    persistent: bool = True
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "DuckDBStore":
+        multi_process = str(getattr(settings, "SINGLE_FLIGHT_MODE", "process")).lower() == "file"
+        return cls(Path(settings.DUCKDB_PATH), persistent=not multi_process)
 
     def __post_init__(self) -> None:
         self.duckdb_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
+        self._catalog: Optional[_Catalog] = _catalog_for(self.duckdb_path) if self.persistent else None
+        if self._catalog is None:
+            self._init_db()
 
     def _conn(self) -> duckdb.DuckDBPyConnection:
-        return duckdb.connect(str(self.duckdb_path))
+        return _connect(self.duckdb_path)
 
-    def _init_db(self) -> None:
+    @contextlib.contextmanager
+    def _cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """This thread's cursor on the persistent connection, or a connection for this operation."""
+        if self._catalog is not None:
+            yield self._catalog.cursor()
+            return
         con = self._conn()
         try:
-            con.execute(
-                """
-                CREATE TABLE IF NOT EXISTS cache_catalog (
-                    cache_key VARCHAR PRIMARY KEY,
-                    parquet_path VARCHAR NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-            )
+            yield con
         finally:
             con.close()
 
-    def register_parquet(self, cache_key: str, parquet_path: Path) -> None:
+    @contextlib.contextmanager
+    def _scratch(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """This thread's in-memory connection for DuckDB SQL over Parquet files (derivations);
+        it is not attached to the catalog, so its tables are not visible from it."""
+        con = getattr(_SCRATCH, "con", None)
+        if con is None:
+            con = _SCRATCH.con = duckdb.connect(database=":memory:")
+        yield con
+
+    def _init_db(self) -> None:
+        key = str(self.duckdb_path.resolve())
+        with _INIT_LOCK:
+            if key in _INITIALISED:
+                return
+            con = self._conn()
+            try:
+                _create_schema(con)
+            finally:
+                con.close()
+            _INITIALISED.add(key)
+
+    def flush(self) -> int:
+        """Write pending catalog changes now (persistent stores; others write through)."""
+        return self._catalog.flush() if self._catalog is not None else 0
+
+    def cache_rows(self) -> List[Dict[str, Any]]:
+        """Every cache_catalog row, all columns (json columns still encoded)."""
+        if self._catalog is not None:
+            with self._catalog.lock:
+                return [dict(r) for r in self._catalog.rows.values()]
+        with self._cursor() as con:
+            return _select_cache_rows(con)
+
+    def register_parquet(
+        self,
+        cache_key: str,
+        parquet_path: Path,
+        *,
+        spec: Optional[Dict[str, Any]] = None,
+        rows: Optional[int] = None,
+        lineage: Optional[Dict[str, Any]] = None,
+        fetch_seconds: Optional[float] = None,
+        sql_fingerprint: Optional[str] = None,
+        tables: Optional[List[str]] = None,
+        sql_text: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        warmed: bool = False,
+        db_seconds: Optional[float] = None,
+        db_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Catalog a snapshot; `warmed` marks a write by the cache warmer (cache.warmer), db_seconds
+        and db_bytes are the source database's share of producing it.
+        """
+        if self._catalog is not None:
+            new = {
+                "cache_key": cache_key,
+                "parquet_path": str(parquet_path),
+                "created_at": dt.datetime.now(),
+                "query_spec": json.dumps(spec, default=str) if spec else None,
+                "row_count": int(rows) if rows is not None else None,
+                "lineage": json.dumps(lineage, default=str) if lineage else None,
+                "size_bytes": _file_size(parquet_path),
+                "last_access_epoch": time.time(),
+                "fetch_seconds": float(fetch_seconds) if fetch_seconds is not None else None,
+                "sql_fingerprint": sql_fingerprint,
+                "tables": json.dumps(list(tables)) if tables else None,
+                "sql_text": sql_text,
+                "params": json.dumps(params, default=str) if params is not None and sql_text else None,
+                "warmed_epoch": time.time() if warmed else None,
+                "db_seconds": float(db_seconds) if db_seconds is not None else None,
+                "db_bytes": int(db_bytes) if db_bytes is not None else None,
+            }
+            with self._catalog.lock:
+                old = self._catalog.rows.get(cache_key) or {}
+                row = {c: old.get(c) for c in _CACHE_COLUMNS}
+                for c, v in new.items():
+                    if v is not None or c in _REPLACED_ON_REGISTER:
+                        row[c] = v
+                row["hit_count"] = old.get("hit_count") or 0
+                row["warm_hits"] = 0 if warmed else old.get("warm_hits") or 0
+                self._catalog.rows[cache_key] = row
+                self._catalog.changed(cache_key)
+            return
+        with _WRITE_LOCK:
+            self._upsert(
+                cache_key,
+                parquet_path,
+                spec=spec,
+                rows=rows,
+                lineage=lineage,
+                fetch_seconds=fetch_seconds,
+                sql_fingerprint=sql_fingerprint,
+                tables=tables,
+                sql_text=sql_text,
+                params=params,
+                warmed=warmed,
+                db_seconds=db_seconds,
+                db_bytes=db_bytes,
+            )
+
+    def _upsert(
+        self,
+        cache_key: str,
+        parquet_path: Path,
+        *,
+        spec: Optional[Dict[str, Any]],
+        rows: Optional[int],
+        lineage: Optional[Dict[str, Any]],
+        fetch_seconds: Optional[float],
+        sql_fingerprint: Optional[str] = None,
+        tables: Optional[List[str]] = None,
+        sql_text: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        warmed: bool = False,
+        db_seconds: Optional[float] = None,
+        db_bytes: Optional[int] = None,
+    ) -> None:
         con = self._conn()
         try:
             con.execute(
                 """
-                INSERT INTO cache_catalog (cache_key, parquet_path)
-                VALUES (?, ?)
+                INSERT INTO cache_catalog
+                  (cache_key, parquet_path, query_spec, row_count, lineage, size_bytes, hit_count, last_access_epoch,
+                   fetch_seconds, sql_fingerprint, tables, sql_text, params, warmed_epoch, warm_hits,
+                   db_seconds, db_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
                 ON CONFLICT (cache_key) DO UPDATE
-                  SET parquet_path=excluded.parquet_path, created_at=CURRENT_TIMESTAMP
+                  SET parquet_path=excluded.parquet_path,
+                      created_at=now(),
+                      query_spec=COALESCE(excluded.query_spec, cache_catalog.query_spec),
+                      row_count=COALESCE(excluded.row_count, cache_catalog.row_count),
+                      lineage=COALESCE(excluded.lineage, cache_catalog.lineage),
+                      size_bytes=excluded.size_bytes,
+                      last_access_epoch=excluded.last_access_epoch,
+                      fetch_seconds=COALESCE(excluded.fetch_seconds, cache_catalog.fetch_seconds),
+                      sql_fingerprint=COALESCE(excluded.sql_fingerprint, cache_catalog.sql_fingerprint),
+                      tables=COALESCE(excluded.tables, cache_catalog.tables),
+                      sql_text=COALESCE(excluded.sql_text, cache_catalog.sql_text),
+                      params=COALESCE(excluded.params, cache_catalog.params),
+                      warmed_epoch=excluded.warmed_epoch,
+                      warm_hits=CASE WHEN excluded.warmed_epoch IS NOT NULL THEN 0 ELSE cache_catalog.warm_hits END,
+                      db_seconds=excluded.db_seconds,
+                      db_bytes=excluded.db_bytes
                 """,
-                [cache_key, str(parquet_path)],
+                [
+                    cache_key,
+                    str(parquet_path),
+                    json.dumps(spec, default=str) if spec else None,
+                    int(rows) if rows is not None else None,
+                    json.dumps(lineage, default=str) if lineage else None,
+                    _file_size(parquet_path),
+                    time.time(),
+                    float(fetch_seconds) if fetch_seconds is not None else None,
+                    sql_fingerprint,
+                    json.dumps(list(tables)) if tables else None,
+                    sql_text,
+                    json.dumps(params, default=str) if params is not None and sql_text else None,
+                    time.time() if warmed else None,
+                    float(db_seconds) if db_seconds is not None else None,
+                    int(db_bytes) if db_bytes is not None else None,
+                ],
             )
         finally:
             con.close()
 
+    def record_hit(self, cache_key: str, parquet_path: Path, question: Optional[str] = None) -> None:
+        """
+        Count a cache hit (registers snapshots that predate the catalog), and in cache_metrics
+        the bytes served and DB time saved, per source table and for `question`.
+        """
+        if self._catalog is not None:
+            with self._catalog.lock:
+                row = self._catalog.rows.get(cache_key)
+                if row is None:
+                    row = self._catalog.rows[cache_key] = {c: None for c in _CACHE_COLUMNS}
+                    row.update(
+                        cache_key=cache_key,
+                        parquet_path=str(parquet_path),
+                        created_at=dt.datetime.now(),
+                        size_bytes=_file_size(parquet_path),
+                    )
+                row["hit_count"] = (row.get("hit_count") or 0) + 1
+                if row.get("warmed_epoch") is not None:
+                    row["warm_hits"] = (row.get("warm_hits") or 0) + 1
+                row["last_access_epoch"] = time.time()
+                self._catalog.changed(cache_key)
+                self._catalog.count(_hit_deltas(row), _metric_keys(row_tables(row), question))
+            return
+        with _WRITE_LOCK:
+            con = self._conn()
+            try:
+                con.execute(
+                    """
+                    INSERT INTO cache_catalog (cache_key, parquet_path, size_bytes, hit_count, last_access_epoch)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT (cache_key) DO UPDATE
+                      SET hit_count=COALESCE(cache_catalog.hit_count, 0) + 1,
+                          warm_hits=COALESCE(cache_catalog.warm_hits, 0)
+                            + CASE WHEN cache_catalog.warmed_epoch IS NOT NULL THEN 1 ELSE 0 END,
+                          last_access_epoch=excluded.last_access_epoch,
+                          size_bytes=COALESCE(cache_catalog.size_bytes, excluded.size_bytes)
+                    """,
+                    [cache_key, str(parquet_path), _file_size(parquet_path), time.time()],
+                )
+                cols = ("tables", "size_bytes", "db_seconds", "db_bytes", "fetch_seconds")
+                found = con.execute(f"SELECT {', '.join(cols)} FROM cache_catalog WHERE cache_key = ?", [cache_key]).fetchone()
+                row = dict(zip(cols, found))
+                _add_metrics(con, {k: _hit_deltas(row) for k in _metric_keys(row_tables(row), question)})
+            finally:
+                con.close()
+
+    def record_metrics(self, deltas: Dict[str, float], *, tables: Optional[List[str]] = None, question: Optional[str] = None) -> None:
+        """Add to cache_metrics counters (METRIC_COUNTERS) for the total, each table and the question."""
+        keys = _metric_keys(tables, question)
+        if self._catalog is not None:
+            with self._catalog.lock:
+                self._catalog.count(deltas, keys)
+            return
+        with _WRITE_LOCK:
+            con = self._conn()
+            try:
+                _add_metrics(con, {k: deltas for k in keys})
+            finally:
+                con.close()
+
+    def cache_metrics(self) -> List[Dict[str, Any]]:
+        """Every cache_metrics row (dimension, name, counters, updated_epoch), pending counts included."""
+        self.flush()
+        with self._cursor() as con:
+            cur = con.execute("SELECT * FROM cache_metrics ORDER BY dimension, name")
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, r)) for r in cur.fetchall()]
+
+    def reset_metrics(self) -> None:
+        if self._catalog is not None:
+            with self._catalog.lock:
+                self._catalog.metrics.clear()
+        with _WRITE_LOCK, self._cursor() as con:
+            con.execute("DELETE FROM cache_metrics")
+
+    def cache_entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Catalog rows with their access stats, most recently used first."""
+        rows = sorted(self.cache_rows(), key=lambda r: -(r["last_access_epoch"] or float("-inf")))
+        if limit is not None:
+            rows = rows[: int(limit)]
+        return [{**{c: r[c] for c in _ENTRY_COLUMNS}, "derived": r["lineage"] is not None} for r in rows]
+
+    def cache_totals(self) -> Dict[str, Any]:
+        """Totals, plus warm-up effect: warmed snapshots and how many were hit since (warm hit rate)."""
+        rows = self.cache_rows()
+        warmed = [r for r in rows if r["warmed_epoch"] is not None]
+        warmed_hit = sum(1 for r in warmed if r["warm_hits"])
+        return {
+            "entries": len(rows),
+            "bytes": sum(int(r["size_bytes"] or 0) for r in rows),
+            "hits": sum(int(r["hit_count"] or 0) for r in rows),
+            "warmed": len(warmed),
+            "warmed_hit": warmed_hit,
+            "warm_hits": sum(int(r["warm_hits"] or 0) for r in warmed),
+            "warm_hit_rate": round(warmed_hit / len(warmed), 3) if warmed else None,
+        }
+
+    def forget(self, cache_keys: List[str]) -> None:
+        if not cache_keys:
+            return
+        if self._catalog is not None:
+            with self._catalog.lock:
+                for k in cache_keys:
+                    self._catalog.rows.pop(k, None)
+                    self._catalog.removed(k)
+            return
+        with _WRITE_LOCK:
+            con = self._conn()
+            try:
+                con.executemany("DELETE FROM cache_catalog WHERE cache_key = ?", [[k] for k in cache_keys])
+            finally:
+                con.close()
+
+    def forget_all(self) -> None:
+        if self._catalog is not None:
+            with self._catalog.lock:
+                keys = list(self._catalog.rows)
+            self.forget(keys)
+            return
+        with _WRITE_LOCK:
+            con = self._conn()
+            try:
+                con.execute("DELETE FROM cache_catalog")
+            finally:
+                con.close()
+
     def get_parquet_path(self, cache_key: str) -> Optional[Path]:
-        con = self._conn()
-        try:
+        if self._catalog is not None:
+            with self._catalog.lock:
+                row = self._catalog.rows.get(cache_key)
+            return Path(row["parquet_path"]) if row else None
+        with self._cursor() as con:
             row = con.execute(
                 "SELECT parquet_path FROM cache_catalog WHERE cache_key = ?",
                 [cache_key],
             ).fetchone()
-            if not row:
-                return None
-            return Path(row[0])
-        finally:
-            con.close()
+        return Path(row[0]) if row else None
 
     def list_catalog(self) -> pd.DataFrame:
-        con = self._conn()
-        try:
+        self.flush()
+        with self._cursor() as con:
             return con.execute("SELECT * FROM cache_catalog ORDER BY created_at DESC").df()
-        finally:
-            con.close()
 
     def query_cached(self, cache_key: str, duckdb_sql: str) -> pd.DataFrame:
         """
@@ -88,20 +748,198 @@ class DuckDBStore:
         The parquet is exposed as a view called: cached
         Example duckdb_sql:
           SELECT col1, SUM(col2) FROM cached GROUP BY col1
+        For read-only SQL across several snapshots see cache.workbench.SnapshotWorkbench.
         """
         parquet_path = self.get_parquet_path(cache_key)
         if parquet_path is None or not parquet_path.exists():
             raise FileNotFoundError(f"No cached parquet found for cache_key={cache_key}")
 
-        con = self._conn()
-        try:
-            con.execute(f"CREATE OR REPLACE VIEW cached AS SELECT * FROM read_parquet('{parquet_path.as_posix()}')")
+        with self._scratch() as con:
+            con.execute(f"CREATE OR REPLACE TEMP VIEW cached AS SELECT * FROM read_parquet('{parquet_path.as_posix()}')")
             return con.execute(duckdb_sql).df()
-        finally:
-            con.close()
+
+    def find_containing(self, spec: Dict[str, Any]) -> Optional[Tuple[str, Path, Dict[str, Any]]]:
+        """
+        Query-containment match: a cached snapshot whose result is a superset of `spec`
+        (same tables/joins, finer or equal grain, looser or equal filters).
+        Prefers the smallest snapshot, since that is the cheapest to re-aggregate.
+        """
+        if not spec or spec.get("sampled"):
+            return None
+        rows = sorted(
+            (r for r in self.cache_rows() if r["query_spec"] is not None),
+            key=lambda r: (r["row_count"] is None, r["row_count"] or 0),
+        )
+        for r in rows:
+            cache_key, parquet_path, spec_json, row_count = r["cache_key"], r["parquet_path"], r["query_spec"], r["row_count"]
+            try:
+                cached_spec = json.loads(spec_json)
+            except Exception:
+                continue
+            derivation = find_derivation(spec, cached_spec, row_count)
+            if derivation is not None and Path(parquet_path).exists():
+                return cache_key, Path(parquet_path), derivation
+        return None
+
+    def derive_from_snapshots(self, spec: Dict[str, Any]) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Answer `spec` locally from a containing snapshot (filter + re-aggregate in DuckDB).
+        Returns (df, lineage) or None when no snapshot contains the query.
+        """
+        match = self.find_containing(spec)
+        if match is None:
+            return None
+        source_key, parquet_path, derivation = match
+        sql, params = derivation_sql(spec, derivation, parquet_path.as_posix())
+
+        with self._scratch() as con:
+            df = con.execute(sql, params).df()
+
+        lineage = {
+            "source_cache_key": source_key,
+            "derivation": derivation["mode"],
+            "operations": derivation["operations"],
+            "extra_filters": len(derivation["extra_filters"]),
+            "duckdb_sql": sql,
+        }
+        return df, lineage
+
+    # ------------------------------------------------------------------
+    # Table mirror
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def mirror_lock(table_key: str) -> threading.Lock:
+        """Process-wide lock held while a table's mirror parts are rewritten or read."""
+        with _MIRROR_LOCKS_GUARD:
+            return _MIRROR_LOCKS.setdefault(table_key, threading.Lock())
+
+    def register_mirror(
+        self,
+        table_key: str,
+        parquet_dir: Path,
+        *,
+        watermark_column: Optional[str],
+        watermark_kind: Optional[str],
+        watermark: Optional[str],
+        primary_key: List[str],
+        rows: int,
+        parts: int,
+        refreshed_epoch: float,
+    ) -> None:
+        with _WRITE_LOCK, self._cursor() as con:
+            con.execute(
+                """
+                INSERT OR REPLACE INTO mirror_catalog
+                  (table_key, parquet_dir, watermark_column, watermark_kind, watermark, primary_key, row_count, parts, refreshed_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    table_key,
+                    str(parquet_dir),
+                    watermark_column,
+                    watermark_kind,
+                    watermark,
+                    json.dumps(list(primary_key)),
+                    int(rows),
+                    int(parts),
+                    float(refreshed_epoch),
+                ],
+            )
+
+    def get_mirror(self, table_key: str) -> Optional[Dict[str, Any]]:
+        with self._cursor() as con:
+            cur = con.execute("SELECT * FROM mirror_catalog WHERE table_key = ?", [table_key])
+            row = cur.fetchone()
+            if not row:
+                return None
+            out = dict(zip([d[0] for d in cur.description], row))
+        out["primary_key"] = json.loads(out["primary_key"] or "[]")
+        return out
+
+    def list_mirrors(self) -> pd.DataFrame:
+        with self._cursor() as con:
+            return con.execute("SELECT * FROM mirror_catalog ORDER BY table_key").df()
+
+    def derive_from_mirror(self, spec: Dict[str, Any], max_age_seconds: float) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Answer a single-table `spec` from that table's local mirror when the mirror was refreshed
+        within max_age_seconds: the mirror is treated as a complete raw snapshot of the table, so
+        filters, buckets and aggregates are recomputed in DuckDB (same rules as containment).
+        Returns (df, lineage) or None when the query is not eligible.
+        """
+        if not spec or spec.get("sampled") or len(spec.get("tables") or []) != 1 or spec.get("joins"):
+            return None
+        table_key = spec["tables"][0]
+        mirror = self.get_mirror(table_key)
+        if mirror is None or mirror["refreshed_epoch"] is None:
+            return None
+        age = time.time() - float(mirror["refreshed_epoch"])
+        if age > float(max_age_seconds):
+            return None
+
+        with self.mirror_lock(table_key):
+            parts = sorted(Path(mirror["parquet_dir"]).glob("*.parquet"))
+            if not parts:
+                return None
+            names = pq.read_schema(parts[0]).names
+            mirror_spec = {
+                "tables": [table_key],
+                "joins": [],
+                "aggregated": False,
+                "columns": [{"source": f"{table_key}.{c}", "alias": c} for c in names],
+                "filters": [],
+            }
+            derivation = find_derivation(spec, mirror_spec, int(mirror["row_count"] or 0))
+            if derivation is None:
+                return None
+            sql, params = derivation_sql(spec, derivation, (Path(mirror["parquet_dir"]) / "*.parquet").as_posix())
+
+            with self._scratch() as con:
+                df = con.execute(sql, params).df()
+
+        lineage = {
+            "source_mirror": table_key,
+            "mirror_age_seconds": round(age, 1),
+            "watermark_column": mirror["watermark_column"],
+            "watermark": mirror["watermark"],
+            "derivation": derivation["mode"],
+            "operations": derivation["operations"],
+            "extra_filters": len(derivation["extra_filters"]),
+            "duckdb_sql": sql,
+        }
+        return df, lineage
+
+    # ------------------------------------------------------------------
+    # Source change signals
+    # ------------------------------------------------------------------
+
+    def source_signals(self) -> Dict[str, Dict[str, Any]]:
+        with self._cursor() as con:
+            cur = con.execute("SELECT * FROM source_signals")
+            names = [d[0] for d in cur.description]
+            return {r[0]: dict(zip(names, r)) for r in cur.fetchall()}
+
+    def record_source_signal(self, table_key: str, signal: str, kind: str, *, changed: bool) -> None:
+        now = time.time()
+        with _WRITE_LOCK, self._cursor() as con:
+            con.execute(
+                """
+                INSERT INTO source_signals (table_key, signal, signal_kind, checked_epoch, changed_epoch)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (table_key) DO UPDATE
+                  SET signal=excluded.signal,
+                      signal_kind=excluded.signal_kind,
+                      checked_epoch=excluded.checked_epoch,
+                      changed_epoch=COALESCE(excluded.changed_epoch, source_signals.changed_epoch)
+                """,
+                [table_key, signal, kind, now, now if changed else None],
+            )
 
     def health(self) -> Dict[str, Any]:
         return {
             "duckdb_path": str(self.duckdb_path),
             "exists": self.duckdb_path.exists(),
+            "persistent": self._catalog is not None,
+            "pending_writes": self._catalog.pending() if self._catalog is not None else 0,
         }
\ No newline at end of file
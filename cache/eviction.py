@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+import time
+
+from config import Settings
+from cache.service import CacheService
+
+log = logging.getLogger("cache.eviction")
+
+EVICTION_POLICIES = ("lru", "lfu", "ttl")
+
+# Recompute cost buys retention: under LRU/TTL ordering each second the snapshot took to
+# produce counts as this many seconds of recency, so cheap snapshots leave first.
+COST_CREDIT_SECONDS = 600.0
+
+
+def retention_score(entry: Dict[str, Any], policy: str) -> float:
+    """Higher = keep longer. LFU: hits weighted by fetch cost; LRU/TTL: last access plus cost credit."""
+    cost = float(entry.get("fetch_seconds") or 0.0)
+    if policy == "lfu":
+        return (int(entry.get("hit_count") or 0) + 1) * (1.0 + cost)
+    return float(entry.get("last_access_epoch") or 0.0) + COST_CREDIT_SECONDS * cost
+
+
+def plan_eviction(
+    entries: List[Dict[str, Any]],
+    *,
+    max_bytes: int,
+    max_entries: int,
+    policy: str,
+    ttl_seconds: int,
+    now: float,
+) -> List[Dict[str, Any]]:
+    """
+    Entries to delete so the rest fits both budgets, lowest retention score first. Under the
+    "ttl" policy every entry written more than ttl_seconds ago goes regardless of budget.
+    Entries need size_bytes, hit_count, last_access_epoch, fetch_seconds and created_epoch.
+    """
+    policy = policy if policy in EVICTION_POLICIES else "lru"
+    victims: List[Dict[str, Any]] = []
+    live = list(entries)
+    if policy == "ttl":
+        expired = [e.get("created_epoch") is not None and now - float(e["created_epoch"]) > ttl_seconds for e in live]
+        victims = [e for e, x in zip(live, expired) if x]
+        live = [e for e, x in zip(live, expired) if not x]
+
+    total = sum(int(e.get("size_bytes") or 0) for e in live)
+    count = len(live)
+    for e in sorted(live, key=lambda e: retention_score(e, policy)):
+        if total <= max_bytes and count <= max_entries:
+            break
+        victims.append(e)
+        total -= int(e.get("size_bytes") or 0)
+        count -= 1
+    return victims
+
+
+class CacheEvictor:
+    """
+    Keeps CACHE_DIR's snapshots within CACHE_MAX_BYTES / CACHE_MAX_ENTRIES using the access
+    stats in DuckDBStore's cache_catalog (CACHE_EVICTION_POLICY). Snapshot files the catalog
+    does not know are ranked as never hit; catalog rows whose file is gone are dropped.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.cache = CacheService(settings)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _entries(self) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        known = set()
+        for e in self.cache.catalog.cache_entries():
+            known.add(e["cache_key"])
+            try:
+                st = Path(e["parquet_path"]).stat()
+            except OSError:
+                e["missing"] = True
+                out.append(e)
+                continue
+            e.update(size_bytes=int(st.st_size), created_epoch=st.st_mtime)
+            out.append(e)
+        for p in self.cache.snapshots.cache_dir.glob("*.parquet"):
+            if p.stem in known:
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            out.append(
+                {
+                    "cache_key": p.stem,
+                    "parquet_path": str(p),
+                    "size_bytes": int(st.st_size),
+                    "hit_count": 0,
+                    "last_access_epoch": st.st_mtime,
+                    "fetch_seconds": 0.0,
+                    "created_epoch": st.st_mtime,
+                }
+            )
+        return out
+
+    def run_once(self) -> Dict[str, Any]:
+        start = time.time()
+        entries = self._entries()
+        missing = [e["cache_key"] for e in entries if e.get("missing")]
+        present = [e for e in entries if not e.get("missing")]
+        policy = str(getattr(self.settings, "CACHE_EVICTION_POLICY", "lru")).lower()
+        victims = plan_eviction(
+            present,
+            max_bytes=int(getattr(self.settings, "CACHE_MAX_BYTES", 10 * 1024**3)),
+            max_entries=int(getattr(self.settings, "CACHE_MAX_ENTRIES", 5000)),
+            policy=policy,
+            ttl_seconds=int(getattr(self.settings, "CACHE_TTL_SECONDS", 7 * 86400)),
+            now=start,
+        )
+        catalog_rows = {r["cache_key"]: r for r in self.cache.catalog.cache_rows()}
+        self.cache.count_removals([catalog_rows.get(e["cache_key"], e) for e in victims], "evictions")
+        freed = 0
+        for e in victims:
+            if self.cache.snapshots.delete(e["cache_key"]):
+                freed += int(e.get("size_bytes") or 0)
+        self.cache.catalog.forget(missing + [e["cache_key"] for e in victims])
+        return {
+            "policy": policy,
+            "evicted": len(victims),
+            "freed_bytes": freed,
+            "forgotten_missing": len(missing),
+            "remaining_entries": len(present) - len(victims),
+            "remaining_bytes": sum(int(e.get("size_bytes") or 0) for e in present) - freed,
+            "seconds": round(time.time() - start, 4),
+        }
+
+    def start(self, interval_seconds: float) -> None:
+        if self._thread is not None:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    report = self.run_once()
+                    if report["evicted"]:
+                        log.info(f"evicted {report['evicted']} snapshots ({report['freed_bytes']} bytes)")
+                except Exception as e:
+                    log.warning(f"cache eviction failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="cache-evictor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_EVICTORS: Dict[str, CacheEvictor] = {}
+_EVICTORS_LOCK = threading.Lock()
+
+
+def start_background_eviction(settings: Settings) -> Optional[CacheEvictor]:
+    """One background evictor per cache directory and process (CACHE_EVICTION_INTERVAL_SECONDS; 0 = off)."""
+    interval = float(getattr(settings, "CACHE_EVICTION_INTERVAL_SECONDS", 300) or 0)
+    if interval <= 0:
+        return None
+    key = str(Path(settings.CACHE_DIR).resolve())
+    with _EVICTORS_LOCK:
+        evictor = _EVICTORS.get(key)
+        if evictor is None:
+            evictor = CacheEvictor(settings)
+            evictor.start(interval)
+            _EVICTORS[key] = evictor
+    return evictor
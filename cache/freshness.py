@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+from config import Settings
+from db.dialects import get_dialect
+from db.engine import get_engine
+from cache.incremental import supports_incremental
+from cache.mirror import parse_mirror_tables
+from cache.service import CacheService
+from knowledge_graph.schema_registry import SchemaRegistry
+
+log = logging.getLogger("cache.freshness")
+
+FRESHNESS_ACTIONS = ("invalidate", "refresh")
+
+
+def resolve_table(name: str, reg_tables: Dict[str, Any]) -> Optional[str]:
+    """Registry key for a table name from a snapshot ("schema.table" or bare "table"), case-insensitively."""
+    if name in reg_tables:
+        return name
+    lowered = name.lower()
+    matches = [
+        k
+        for k, t in reg_tables.items()
+        if k.lower() == lowered or ("." not in name and str(t.get("name") or "").lower() == lowered)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+class FreshnessChecker:
+    """
+    Invalidates (or refreshes) the snapshots that read a source table once that table changes.
+
+    Each poll reads one cheap change signal per source table that some snapshot depends on:
+      - "watermark": MAX(column) for tables listed in FRESHNESS_WATERMARKS ("schema.table:column, ...")
+      - "change_tracking": the table's latest change tracking version (SQL Server, tracked tables)
+      - "stats": the dialect's change_signal_sql (partition row counts / last write, row counts)
+    and compares it with the one stored in the catalog's source_signals. The first poll of a
+    table only records its baseline, so a change between a snapshot's write and that poll is
+    missed. On a change, every snapshot listing that table is deleted
+    (FRESHNESS_ACTION="invalidate") or re-run from its stored SQL ("refresh"); snapshots of
+    other tables are untouched. Time-series snapshots (spec["time"]) are kept aside instead of
+    deleted when INCREMENTAL_REFRESH is on, so their next run only fetches the new rows.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.cache = CacheService(settings)
+        self._untracked: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _dependents(self, reg_tables: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.cache.catalog.cache_rows():
+            try:
+                names = json.loads(row["tables"] or "[]")
+            except ValueError:
+                continue
+            for name in names:
+                key = resolve_table(str(name), reg_tables)
+                if key is not None:
+                    out.setdefault(key, []).append(row)
+        return out
+
+    def signal(self, conn: Any, table_key: str, table: Dict[str, Any]) -> Tuple[str, str]:
+        """(signal, kind) for one table; the signal is the JSON of the signal query's row."""
+        d = get_dialect(self.settings)
+        schema, name = table.get("schema"), table.get("name")
+        params = {"schema": schema, "table": name}
+        watermark = parse_mirror_tables(getattr(self.settings, "FRESHNESS_WATERMARKS", "")).get(table_key)
+        candidates: List[Tuple[str, Optional[str]]] = []
+        if watermark:
+            candidates.append(("watermark", f"SELECT MAX({d.quote_ident(watermark)}) AS watermark FROM {d.table_ref(schema, name)}"))
+        if table_key not in self._untracked:
+            candidates.append(("change_tracking", d.change_version_sql(schema, name)))
+        candidates.append(("stats", d.change_signal_sql(schema, name)))
+        for kind, sql in candidates:
+            if not sql:
+                continue
+            try:
+                row = conn.execute(text(sql), params).mappings().first()
+            except Exception:
+                if kind != "change_tracking":
+                    raise
+                # Not tracked (or no permission): remember and use the next signal.
+                conn.rollback()
+                self._untracked.add(table_key)
+                continue
+            return json.dumps(dict(row or {}), default=str, sort_keys=True), kind
+        raise RuntimeError(f"no change signal for {table_key}")
+
+    def run_once(self) -> Dict[str, Any]:
+        start = time.time()
+        reg_tables = SchemaRegistry(self.settings.KNOWLEDGE_GRAPH_DIR).load().get("tables", {})
+        dependents = self._dependents(reg_tables)
+        known = self.cache.catalog.source_signals()
+        action = str(getattr(self.settings, "FRESHNESS_ACTION", "invalidate")).lower()
+        changed: List[str] = []
+        errors: Dict[str, str] = {}
+        with get_engine(self.settings).connect() as conn:
+            for table_key in sorted(dependents):
+                try:
+                    signal, kind = self.signal(conn, table_key, reg_tables[table_key])
+                except Exception as e:
+                    errors[table_key] = str(e)
+                    continue
+                previous = known.get(table_key)
+                # A different kind of signal is not comparable: it becomes the new baseline.
+                moved = previous is not None and previous["signal_kind"] == kind and previous["signal"] != signal
+                self.cache.catalog.record_source_signal(table_key, signal, kind, changed=moved)
+                if moved:
+                    changed.append(table_key)
+
+        stale: Dict[str, Dict[str, Any]] = {}
+        for table_key in changed:
+            for row in dependents[table_key]:
+                stale[row["cache_key"]] = row
+        self.cache.count_removals(stale.values(), "invalidations")
+        incremental = bool(getattr(self.settings, "INCREMENTAL_REFRESH", True))
+        retired = 0
+        for cache_key, row in stale.items():
+            spec = json.loads(row["query_spec"]) if row.get("query_spec") else None
+            if incremental and supports_incremental(spec):
+                retired += int(self.cache.retire(cache_key, rows=row.get("row_count")))
+            else:
+                self.cache.delete(cache_key)
+        # Only after every stale snapshot is gone, so none is derived from another stale one.
+        refreshed = 0
+        if action == "refresh":
+            refreshed = sum(int(self._refresh(row)) for row in stale.values() if row.get("sql_text"))
+        return {
+            "tables_checked": len(dependents) - len(errors),
+            "changed_tables": changed,
+            "invalidated": len(stale),
+            "kept_for_incremental": retired,
+            "refreshed": refreshed,
+            "errors": errors,
+            "seconds": round(time.time() - start, 4),
+        }
+
+    def _refresh(self, row: Dict[str, Any]) -> bool:
+        from agents.executor import Executor  # the executor starts this checker
+
+        try:
+            spec = json.loads(row["query_spec"]) if row.get("query_spec") else None
+            Executor(settings=self.settings).run(sql=row["sql_text"], params=json.loads(row.get("params") or "{}"), spec=spec)
+            return True
+        except Exception as e:
+            log.warning(f"refresh of {row['cache_key']} failed: {e}")
+            return False
+
+    def start(self, interval_seconds: float) -> None:
+        if self._thread is not None:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    report = self.run_once()
+                    if report["changed_tables"]:
+                        log.info(f"source changes in {report['changed_tables']}: {report['invalidated']} snapshots invalidated")
+                except Exception as e:
+                    log.warning(f"freshness check failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="cache-freshness", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_CHECKERS: Dict[str, FreshnessChecker] = {}
+_CHECKERS_LOCK = threading.Lock()
+
+
+def start_background_freshness(settings: Settings) -> Optional[FreshnessChecker]:
+    """One background checker per cache directory and process (FRESHNESS_CHECK_INTERVAL_SECONDS; 0 = off)."""
+    interval = float(getattr(settings, "FRESHNESS_CHECK_INTERVAL_SECONDS", 0) or 0)
+    if interval <= 0 or bool(getattr(settings, "OFFLINE_ONLY", False)):
+        return None
+    key = str(Path(settings.CACHE_DIR).resolve())
+    with _CHECKERS_LOCK:
+        checker = _CHECKERS.get(key)
+        if checker is None:
+            checker = FreshnessChecker(settings)
+            checker.start(interval)
+            _CHECKERS[key] = checker
+    return checker
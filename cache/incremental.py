@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Bind parameter of the lower time bound in SQLAgent's spec["time"]["incremental_sql"].
+INCREMENTAL_SINCE_PARAM = "incr_since"
+
+
+def base_key_for(cache_key: str) -> str:
+    """Key under which an invalidated time-series snapshot waits as the base of its refresh."""
+    return f"{cache_key}-base"
+
+
+def supports_incremental(spec: Optional[Dict[str, Any]]) -> bool:
+    return bool(spec and (spec.get("time") or {}).get("incremental_sql") and not spec.get("sampled"))
+
+
+def watermark(path: Path, column: str) -> Any:
+    """Latest value of `column` in a snapshot (None when it is empty or has no such column)."""
+    if column not in pq.read_schema(path).names:
+        return None
+    return pc.max(pq.read_table(path, columns=[column]).column(0)).as_py()
+
+
+def merged_batches(base: Path, column: str, since: Any, new: pa.Table) -> Iterator[pa.RecordBatch]:
+    """
+    The base snapshot's rows before `since` (row groups at or after it are skipped by their
+    statistics) followed by the newly fetched rows, cast to the base schema.
+    """
+    dataset = ds.dataset(str(base), format="parquet")
+    yield from dataset.to_batches(filter=ds.field(column) < since)
+    yield from new.select(dataset.schema.names).cast(dataset.schema).to_batches()
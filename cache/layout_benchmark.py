@@ -0,0 +1,131 @@
+"""
+Disk footprint and read latency of snapshot Parquet layouts across representative result shapes.
+
+    python -m cache.layout_benchmark [rows]
+
+For every shape x layout: file bytes, write seconds, full read, projected read (two columns)
+and filtered read (the last tenth by the shape's sort column, pushed down to the row groups).
+Timings are the best of a few repeats; the default layout (ParquetLayout()) is what the
+SNAPSHOT_* settings default to.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache.snapshot_cache import ParquetLayout, SnapshotCache
+
+LAYOUTS: Dict[str, ParquetLayout] = {
+    "snappy (pandas default)": ParquetLayout(compression="snappy", compression_level=None, row_group_rows=2**30),
+    "zstd-1 (default)": ParquetLayout(),
+    "zstd-3": ParquetLayout(compression_level=3),
+    "zstd-9": ParquetLayout(compression_level=9),
+    "zstd-1, no dictionary": ParquetLayout(dictionary=False),
+    "zstd-1, 1M row groups": ParquetLayout(row_group_rows=2**20),
+    "zstd-1, 16k row groups": ParquetLayout(row_group_rows=16384),
+}
+
+
+def shapes(rows: int, seed: int = 7) -> Dict[str, pd.DataFrame]:
+    """Result shapes the pipeline produces: aggregates, time series, wide detail, text-heavy detail."""
+    rng = np.random.default_rng(seed)
+    regions = np.array(["EU", "US", "APAC", "LATAM", "MEA"])
+    days = pd.date_range("2020-01-01", periods=max(1, rows // 50), freq="D")
+    return {
+        "aggregate (dims x metrics)": pd.DataFrame(
+            {
+                "region": rng.choice(regions, 2000),
+                "channel": rng.choice(["web", "shop", "partner"], 2000),
+                "month": rng.choice(pd.date_range("2020-01-01", periods=48, freq="MS"), 2000),
+                "revenue": rng.gamma(2.0, 500.0, 2000),
+                "orders": rng.integers(1, 5000, 2000),
+            }
+        ),
+        "time series": pd.DataFrame(
+            {
+                "day": np.sort(rng.choice(days, rows)),
+                "region": rng.choice(regions, rows),
+                "value": rng.normal(100.0, 15.0, rows),
+            }
+        ),
+        "wide detail": pd.DataFrame(
+            {
+                "id": np.arange(rows),
+                "region": rng.choice(regions, rows),
+                "status": rng.choice(["open", "shipped", "returned"], rows),
+                **{f"m{i}": rng.normal(0.0, 1.0, rows) for i in range(12)},
+                **{f"n{i}": rng.integers(0, 1000, rows) for i in range(4)},
+            }
+        ),
+        "text detail": pd.DataFrame(
+            {
+                "id": np.arange(rows),
+                "region": rng.choice(regions, rows),
+                "customer": [f"customer-{i:08d}" for i in rng.integers(0, rows, rows)],
+                "note": [f"order note {i % 997} for batch {i // 997}" for i in range(rows)],
+                "amount": rng.gamma(2.0, 50.0, rows),
+            }
+        ),
+    }
+
+
+# The last tenth of each shape by its sort column; the aggregate is unsorted (one row group).
+FILTERS: Dict[str, Callable[[pd.DataFrame], list]] = {
+    "aggregate (dims x metrics)": lambda df: [("region", "=", "EU")],
+    "time series": lambda df: [("day", ">=", df["day"].quantile(0.9))],
+    "wide detail": lambda df: [("id", ">=", int(len(df) * 0.9))],
+    "text detail": lambda df: [("id", ">=", int(len(df) * 0.9))],
+}
+
+
+def _best(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_benchmark(
+    frames: Optional[Dict[str, pd.DataFrame]] = None,
+    layouts: Optional[Dict[str, ParquetLayout]] = None,
+    *,
+    repeats: int = 3,
+) -> pd.DataFrame:
+    frames = frames if frames is not None else shapes(200000)
+    layouts = layouts or LAYOUTS
+    out: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as d:
+        for shape, df in frames.items():
+            projected = list(df.columns[:2])
+            filters = FILTERS[shape](df)
+            for name, layout in layouts.items():
+                cache = SnapshotCache(Path(d, name.replace(" ", "_")), layout=layout)
+                key = shape.replace(" ", "_")
+                write_s = _best(lambda: cache.put(key, df), repeats)
+                out.append(
+                    {
+                        "shape": shape,
+                        "layout": name,
+                        "rows": len(df),
+                        "bytes": cache.path_for_key(key).stat().st_size,
+                        "write_s": round(write_s, 4),
+                        "read_s": round(_best(lambda: cache.get(key), repeats), 4),
+                        "projected_read_s": round(_best(lambda: cache.get(key, columns=projected), repeats), 4),
+                        "filtered_read_s": round(_best(lambda: cache.get(key, filters=filters), repeats), 4),
+                    }
+                )
+    return pd.DataFrame(out)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(run_benchmark(shapes(n)).to_string(index=False))
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+
+import pyarrow as pa
+
+from config import Settings
+
+
+# A single snapshot may take at most this share of the budget, so one huge result
+# cannot flush every hot dashboard out of memory.
+MAX_ENTRY_SHARE = 0.25
+
+
+class ArrowMemoryTier:
+    """
+    Process-wide LRU of decoded snapshots as Arrow tables, in front of the Parquet files.
+    Entries are keyed by snapshot path and carry the file signature (mtime, size) they were
+    read from; a rewritten or deleted file never serves its old table. Tables are immutable,
+    so every Streamlit session can share them: each reader builds its own DataFrame on top.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[str, Tuple[Hashable, pa.Table]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def admits(self, nbytes: int) -> bool:
+        return self.max_bytes > 0 and nbytes <= self.max_bytes * MAX_ENTRY_SHARE
+
+    def get(self, key: str, signature: Hashable) -> Optional[pa.Table]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, signature: Hashable, table: pa.Table) -> bool:
+        nbytes = int(table.nbytes)
+        if not self.admits(nbytes):
+            return False
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (signature, table)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+        return True
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= int(entry[1].nbytes)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._drop(key)
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            while self._entries and self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+MEMORY_TIER = ArrowMemoryTier()
+
+
+def shared_memory_tier(settings: Settings) -> Optional[ArrowMemoryTier]:
+    """The process-wide tier sized to CACHE_MEMORY_BYTES, or None when that is 0."""
+    budget = int(getattr(settings, "CACHE_MEMORY_BYTES", 0) or 0)
+    if MEMORY_TIER.max_bytes != budget:
+        MEMORY_TIER.resize(budget)
+    return MEMORY_TIER if budget > 0 else None
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import datetime as dt
+import decimal
+import json
+import re
+import shutil
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import Settings
+from db import stream_sql_query
+from db.dialects import get_dialect
+from cache.duckdb_store import DuckDBStore
+from cache.snapshot_cache import ParquetLayout, write_batches
+from knowledge_graph.schema_registry import SchemaRegistry
+from utils.result_typing import DATE_TYPES
+
+
+# Columns picked as watermark when MIRROR_TABLES names none, by preference.
+_MODIFIED_NAME = re.compile(r"modif|updat|chang", re.IGNORECASE)
+_INTEGER_TYPES = ("int", "bigint", "smallint", "tinyint", "integer")
+
+# Bulk extraction has no practical row cap; the mirror is written to disk as it streams.
+_NO_ROW_CAP = 2**62
+
+
+def parse_mirror_tables(value: str) -> Dict[str, Optional[str]]:
+    """MIRROR_TABLES ("dbo.Orders:ModifiedDate, dbo.Customers") -> {table_key: watermark column or None}."""
+    out: Dict[str, Optional[str]] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        table, _, column = item.partition(":")
+        out[table.strip()] = column.strip() or None
+    return out
+
+
+def choose_watermark(table: Dict[str, Any], requested: Optional[str], dialect_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (column, kind) used for incremental extraction, kind being "rowversion", "modified" or
+    "identity". Without a requested column: a rowversion column, else a modified/updated date
+    column, else a single integer primary key. (None, None) means full refreshes only.
+    """
+    columns = {c["name"]: str(c.get("type") or "").lower() for c in table.get("columns") or []}
+    pk = (table.get("pk_fk_hints") or {}).get("primary_key") or []
+
+    def kind_of(name: str) -> Optional[str]:
+        t = columns[name]
+        # SQL Server reports rowversion columns as "timestamp".
+        if t == "rowversion" or (t == "timestamp" and dialect_name == "mssql"):
+            return "rowversion"
+        if t.startswith(DATE_TYPES) and "offset" not in t:
+            return "modified"
+        if t.startswith(_INTEGER_TYPES):
+            return "identity"
+        return None
+
+    if requested:
+        if requested not in columns:
+            raise ValueError(f"Watermark column {requested!r} is not a column of {table.get('name')!r}.")
+        return requested, kind_of(requested) or "modified"
+    for name in columns:
+        if kind_of(name) == "rowversion":
+            return name, "rowversion"
+    for name in columns:
+        if kind_of(name) == "modified" and _MODIFIED_NAME.search(name):
+            return name, "modified"
+    if len(pk) == 1 and pk[0] in columns and kind_of(pk[0]) == "identity":
+        return pk[0], "identity"
+    return None, None
+
+
+def encode_watermark(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return json.dumps({"type": "bytes", "value": bytes(value).hex()})
+    if isinstance(value, dt.datetime):
+        return json.dumps({"type": "datetime", "value": value.isoformat()})
+    if isinstance(value, dt.date):
+        return json.dumps({"type": "date", "value": value.isoformat()})
+    if isinstance(value, decimal.Decimal):
+        return json.dumps({"type": "decimal", "value": str(value)})
+    return json.dumps({"type": "json", "value": value})
+
+
+def decode_watermark(text: Optional[str]) -> Any:
+    if text is None:
+        return None
+    d = json.loads(text)
+    kind, value = d["type"], d["value"]
+    if kind == "bytes":
+        return bytes.fromhex(value)
+    if kind == "datetime":
+        return dt.datetime.fromisoformat(value)
+    if kind == "date":
+        return dt.date.fromisoformat(value)
+    if kind == "decimal":
+        return decimal.Decimal(value)
+    return value
+
+
+def _track_max(batches: Iterable[pa.RecordBatch], column: Optional[str], state: Dict[str, Any]) -> Iterator[pa.RecordBatch]:
+    for batch in batches:
+        if column is not None and batch.num_rows:
+            arr = batch.column(batch.schema.get_field_index(column))
+            try:
+                high = pc.max(arr).as_py()
+            except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+                high = max((v for v in arr.to_pylist() if v is not None), default=None)
+            if high is not None and (state.get("max") is None or high > state["max"]):
+                state["max"] = high
+        yield batch
+
+
+def _part_path(table_dir: Path, seq: int) -> Path:
+    return table_dir / f"part-{seq:06d}.parquet"
+
+
+def _part_seq(path: Path) -> int:
+    return int(path.stem.split("-", 1)[1])
+
+
+@dataclass
+class TableMirror:
+    """
+    Local columnar copies of heavily queried registry tables (MIRROR_TABLES), so eligible
+    queries read Parquet through DuckDB instead of the OLTP-backed source.
+
+    Each table lives in MIRROR_DIR/<table_key>/ as part-NNNNNN.parquet files of at most
+    MIRROR_PART_ROWS rows, registered in DuckDBStore's mirror_catalog. A refresh is:
+      - full: re-extract everything into a new directory and swap it in
+      - incremental: extract rows whose watermark column is past the stored watermark into a new
+        part; rows of older parts with the same primary key are dropped from those parts
+        (parts without updated keys are not touched)
+    Incremental refresh needs a watermark and, unless the watermark is an identity column
+    (append-only), a primary key; otherwise every refresh is full. Deletes at the source are
+    only picked up by a full refresh.
+    """
+
+    settings: Settings
+
+    def __post_init__(self) -> None:
+        self.store = DuckDBStore.from_settings(self.settings)
+        self.root = Path(getattr(self.settings, "MIRROR_DIR", "./cache_data/mirror"))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.layout = ParquetLayout.from_settings(self.settings)
+
+    def configured_tables(self) -> Dict[str, Optional[str]]:
+        return parse_mirror_tables(getattr(self.settings, "MIRROR_TABLES", ""))
+
+    def table_dir(self, table_key: str) -> Path:
+        return self.root / re.sub(r"[^A-Za-z0-9_.-]", "_", table_key)
+
+    def refresh_all(self, *, full: bool = False) -> List[Dict[str, Any]]:
+        reports = []
+        for table_key, column in self.configured_tables().items():
+            try:
+                reports.append(self.refresh(table_key, watermark_column=column, full=full))
+            except Exception as e:
+                reports.append({"table": table_key, "error": str(e)})
+        return reports
+
+    def refresh(self, table_key: str, *, watermark_column: Optional[str] = None, full: bool = False) -> Dict[str, Any]:
+        start = time.time()
+        table = SchemaRegistry(self.settings.KNOWLEDGE_GRAPH_DIR).load().get("tables", {}).get(table_key)
+        if not table:
+            raise ValueError(f"{table_key!r} is not in the schema registry; refresh the schema first.")
+        column, kind = choose_watermark(table, watermark_column, get_dialect(self.settings).name)
+        pk = [c for c in (table.get("pk_fk_hints") or {}).get("primary_key") or []]
+        table_dir = self.table_dir(table_key)
+
+        with self.store.mirror_lock(table_key):
+            entry = self.store.get_mirror(table_key)
+            parts = sorted(table_dir.glob("part-*.parquet"))
+            incremental = (
+                not full
+                and entry is not None
+                and column is not None
+                and entry["watermark_column"] == column
+                and entry["watermark"] is not None
+                and bool(parts)
+                and (bool(pk) or kind == "identity")
+            )
+            report: Dict[str, Any] = {"table": table_key, "watermark_column": column, "watermark_kind": kind}
+            if incremental:
+                try:
+                    report.update(self._incremental(table, table_dir, parts, column, entry["watermark"], pk, kind))
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                    # The source schema changed under the mirror: start over.
+                    report.update(self._full(table, table_dir, column), fallback=str(e))
+            else:
+                report.update(self._full(table, table_dir, column))
+            if report.get("watermark") is None and incremental:
+                report["watermark"] = entry["watermark"]
+
+            parts = sorted(table_dir.glob("part-*.parquet"))
+            rows = sum(pq.ParquetFile(p).metadata.num_rows for p in parts)
+            self.store.register_mirror(
+                table_key,
+                table_dir,
+                watermark_column=column,
+                watermark_kind=kind,
+                watermark=report.get("watermark"),
+                primary_key=pk,
+                rows=rows,
+                parts=len(parts),
+                refreshed_epoch=time.time(),
+            )
+        report.update(rows=rows, parts=len(parts), seconds=round(time.time() - start, 4))
+        return report
+
+    def _extract(self, table: Dict[str, Any], column: Optional[str], since: Any, meta: Dict[str, Any]) -> Iterator[pa.RecordBatch]:
+        d = get_dialect(self.settings)
+        cols = ", ".join(d.quote_ident(c["name"]) for c in table.get("columns") or [])
+        sql = f"SELECT {cols} FROM {d.table_ref(table.get('schema'), table.get('name'))}"
+        params: Dict[str, Any] = {}
+        if since is not None:
+            sql += f" WHERE {d.quote_ident(column)} > :watermark"
+            params["watermark"] = since
+        return stream_sql_query(
+            sql=sql,
+            params=params,
+            timeout_seconds=int(getattr(self.settings, "MIRROR_EXTRACT_TIMEOUT_SECONDS", 3600)),
+            max_rows=_NO_ROW_CAP,
+            meta=meta,
+            settings=self.settings,
+        )
+
+    def _write_parts(
+        self, table_dir: Path, batches: Iterable[pa.RecordBatch], *, seq: int, schema: Optional[pa.Schema]
+    ) -> List[Path]:
+        """Split the stream into parts of about MIRROR_PART_ROWS rows; later parts use the first part's schema."""
+        part_rows = max(1, int(getattr(self.settings, "MIRROR_PART_ROWS", 1000000)))
+        it = iter(batches)
+        written: List[Path] = []
+        while True:
+            head = next(it, None)
+            if head is None:
+                return written
+
+            def part(head: pa.RecordBatch = head) -> Iterator[pa.RecordBatch]:
+                n = head.num_rows
+                yield head
+                while n < part_rows:
+                    b = next(it, None)
+                    if b is None:
+                        return
+                    n += b.num_rows
+                    yield b
+
+            path = _part_path(table_dir, seq)
+            if write_batches(path, part(), schema=schema, layout=self.layout) is not None:
+                written.append(path)
+                schema = schema or pq.read_schema(path)
+                seq += 1
+
+    def _full(self, table: Dict[str, Any], table_dir: Path, column: Optional[str]) -> Dict[str, Any]:
+        staging = table_dir.with_name(f"{table_dir.name}.{uuid.uuid4().hex}.tmp")
+        fetch: Dict[str, Any] = {}
+        state: Dict[str, Any] = {}
+        try:
+            written = self._write_parts(staging, _track_max(self._extract(table, column, None, fetch), column, state), seq=1, schema=None)
+            if not written:
+                # Empty table: keep one empty part so the mirror still has its columns.
+                staging.mkdir(parents=True, exist_ok=True)
+                names = fetch.get("columns") or [c["name"] for c in table.get("columns") or []]
+                pq.write_table(pa.table({n: pa.array([], type=pa.string()) for n in names}), _part_path(staging, 1))
+            old = table_dir.with_name(f"{table_dir.name}.{uuid.uuid4().hex}.old")
+            if table_dir.exists():
+                table_dir.rename(old)
+            staging.rename(table_dir)
+            shutil.rmtree(old, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return {"mode": "full", "rows_extracted": int(fetch.get("rows") or 0), "watermark": encode_watermark(state.get("max"))}
+
+    def _incremental(
+        self,
+        table: Dict[str, Any],
+        table_dir: Path,
+        parts: List[Path],
+        column: str,
+        watermark: str,
+        pk: List[str],
+        kind: Optional[str],
+    ) -> Dict[str, Any]:
+        fetch: Dict[str, Any] = {}
+        state: Dict[str, Any] = {}
+        schema = pq.read_schema(parts[0])
+        batches = _track_max(self._extract(table, column, decode_watermark(watermark), fetch), column, state)
+        written = self._write_parts(table_dir, batches, seq=max(_part_seq(p) for p in parts) + 1, schema=schema)
+
+        rewritten = 0
+        if written and pk and kind != "identity":
+            # Updated rows: drop the previous version of each key from the older parts.
+            keys = pa.concat_tables([pq.read_table(p, columns=pk) for p in written])
+            for p in parts:
+                old = pq.read_table(p)
+                kept = old.join(keys, keys=pk, join_type="left anti")
+                if kept.num_rows == old.num_rows:
+                    continue
+                rewritten += 1
+                if kept.num_rows == 0:
+                    p.unlink()
+                    continue
+                write_batches(p, kept.select(old.column_names).cast(old.schema).to_batches(), schema=old.schema, layout=self.layout)
+        return {
+            "mode": "incremental",
+            "rows_extracted": int(fetch.get("rows") or 0),
+            "new_parts": len(written),
+            "rewritten_parts": rewritten,
+            "watermark": encode_watermark(state.get("max")),
+        }
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from config import Settings
+from cache.duckdb_store import METRIC_COUNTERS, DuckDBStore, row_tables
+from cache.incremental import base_key_for
+from cache.memory_tier import MEMORY_TIER, shared_memory_tier
+from cache.snapshot_cache import Filters, ParquetLayout, SnapshotCache
+from observability.timing import PhaseTimer
+
+
+def cache_key_for(sql: str, params: Dict[str, Any]) -> str:
+    payload = (sql + "|" + repr(sorted((params or {}).items()))).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def sql_fingerprint(sql: str) -> str:
+    """Hash of the SQL text with whitespace and case folded: groups runs of the same query shape."""
+    return hashlib.sha256(re.sub(r"\s+", " ", (sql or "").strip().lower()).encode("utf-8")).hexdigest()[:16]
+
+
+_IDENT = r'(?:\[[^\]]+\]|"[^"]+"|`[^`]+`|\w+)'
+_TABLE_REF = re.compile(rf"\b(?:from|join)\s+({_IDENT}(?:\s*\.\s*{_IDENT}){{0,2}})", re.IGNORECASE)
+
+
+def referenced_tables(sql: str) -> List[str]:
+    """
+    Table names after FROM / JOIN in raw SQL ("schema.table" or bare "table", quotes stripped),
+    for snapshots that come without SQLAgent's spec. CTE and subquery aliases may show up too;
+    consumers match the names against the schema registry.
+    """
+    out: List[str] = []
+    for m in _TABLE_REF.finditer(sql or ""):
+        parts = [p.strip().strip('[]"`') for p in m.group(1).split(".")]
+        name = ".".join(parts[-2:])
+        if name and name not in out:
+            out.append(name)
+    return out
+
+
+@dataclass
+class CacheService:
+    """
+    The query-snapshot cache: Parquet files plus the in-process Arrow tier (SnapshotCache) and
+    one metadata catalog (DuckDBStore's cache_catalog: key, SQL fingerprint, tables, rows,
+    bytes, created, last access, hits, fetch cost). Reads, writes, listing and clearing all go
+    through here; listing is a single catalog query and never touches the snapshot files.
+    Methods taking `timer` record their cache_read / parquet_write / catalog_register phases.
+
+    Effectiveness is accounted in the catalog's cache_metrics (see metrics()): hits with the
+    bytes served and DB time saved, misses with the DB time spent, local fills, warm fills,
+    evictions and invalidations, overall, per source table and per user question.
+    """
+
+    settings: Settings
+
+    def __post_init__(self) -> None:
+        self.snapshots = SnapshotCache(
+            Path(self.settings.CACHE_DIR),
+            memory=shared_memory_tier(self.settings),
+            layout=ParquetLayout.from_settings(self.settings),
+        )
+        self.catalog = DuckDBStore.from_settings(self.settings)
+
+    def path_for_key(self, cache_key: str) -> Path:
+        return self.snapshots.path_for_key(cache_key)
+
+    def read(
+        self,
+        cache_key: str,
+        *,
+        columns: Optional[List[str]] = None,
+        max_rows: Optional[int] = None,
+        filters: Optional[Filters] = None,
+        record_hit: bool = True,
+        question: Optional[str] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Optional[Tuple[pd.DataFrame, str]]:
+        """
+        Snapshot as (df, "memory" | "disk"), counting the hit in the catalog; None on a miss.
+        Only `columns` are decoded and `filters` are pushed down to the Parquet row groups.
+        """
+        timer = timer or PhaseTimer()
+        with timer.phase("cache_read"):
+            read = self.snapshots.read(cache_key, columns=columns, max_rows=max_rows, filters=filters)
+        if read is not None and record_hit:
+            with timer.phase("catalog_register"):
+                self.catalog.record_hit(cache_key, self.path_for_key(cache_key), question=question)
+        return read
+
+    def put(
+        self,
+        cache_key: str,
+        df: pd.DataFrame,
+        *,
+        sql: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        spec: Optional[Dict[str, Any]] = None,
+        lineage: Optional[Dict[str, Any]] = None,
+        fetch_seconds: Optional[float] = None,
+        warmed: bool = False,
+        db_seconds: Optional[float] = None,
+        db_bytes: Optional[int] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Path:
+        timer = timer or PhaseTimer()
+        with timer.phase("parquet_write"):
+            path = self.snapshots.put(cache_key, df)
+        self.register(
+            cache_key, path, sql=sql, params=params, spec=spec, rows=len(df), lineage=lineage,
+            fetch_seconds=fetch_seconds, warmed=warmed, db_seconds=db_seconds, db_bytes=db_bytes, timer=timer,
+        )
+        return path
+
+    def put_batches(self, cache_key: str, batches: Iterable[pa.RecordBatch]) -> Tuple[Optional[Path], int]:
+        """Stream batches into the snapshot file; register() it once the caller knows the outcome."""
+        return self.snapshots.put_batches(cache_key, batches)
+
+    def register(
+        self,
+        cache_key: str,
+        path: Path,
+        *,
+        sql: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        spec: Optional[Dict[str, Any]] = None,
+        rows: Optional[int] = None,
+        lineage: Optional[Dict[str, Any]] = None,
+        fetch_seconds: Optional[float] = None,
+        warmed: bool = False,
+        db_seconds: Optional[float] = None,
+        db_bytes: Optional[int] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> None:
+        """
+        Catalog a snapshot file with the source tables it read (spec tables, else parsed from sql).
+        `warmed` marks it as written by the cache warmer, so its later hits count as warm hits.
+        """
+        timer = timer or PhaseTimer()
+        tables = list(spec.get("tables") or []) if spec else referenced_tables(sql or "")
+        with timer.phase("catalog_register"):
+            self.catalog.register_parquet(
+                cache_key,
+                path,
+                spec=spec,
+                rows=rows,
+                lineage=lineage,
+                fetch_seconds=fetch_seconds,
+                sql_fingerprint=sql_fingerprint(sql) if sql else None,
+                tables=tables or None,
+                sql_text=sql,
+                params=params or {},
+                warmed=warmed,
+                db_seconds=db_seconds,
+                db_bytes=db_bytes,
+            )
+
+    def list_entries(self, limit: int = 500) -> List[Dict[str, Any]]:
+        return self.catalog.cache_entries(limit=limit)
+
+    def delete(self, cache_key: str) -> bool:
+        """Delete a snapshot with its catalog row, and the incremental base it may have left."""
+        removed = self.snapshots.delete(cache_key)
+        self.snapshots.delete(base_key_for(cache_key))
+        self.catalog.forget([cache_key, base_key_for(cache_key)])
+        return removed
+
+    def retire(self, cache_key: str, *, rows: Optional[int] = None) -> bool:
+        """
+        Invalidate a time-series snapshot but keep its file as the base of an incremental
+        refresh (cache.incremental): it moves to base_key_for(cache_key), catalogued without
+        SQL or spec so no lookup, derivation or freshness check uses it.
+        """
+        path = self.path_for_key(cache_key)
+        base_key = base_key_for(cache_key)
+        base = self.path_for_key(base_key)
+        if self.snapshots.memory is not None:
+            self.snapshots.memory.invalidate(str(path.resolve()))
+            self.snapshots.memory.invalidate(str(base.resolve()))
+        self.catalog.forget([cache_key])
+        try:
+            os.replace(path, base)
+        except FileNotFoundError:
+            return False
+        self.register(base_key, base, rows=rows, lineage={"base_of": cache_key})
+        return True
+
+    def clear(self, key: Optional[str] = None) -> int:
+        """Delete one snapshot (by key) or all of them, files and catalog rows. Returns files removed."""
+        if key:
+            return int(self.delete(key))
+        removed = self.snapshots.clear_all()
+        self.catalog.forget_all()
+        return removed
+
+    def derive_from_snapshots(self, spec: Dict[str, Any]) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        return self.catalog.derive_from_snapshots(spec)
+
+    def derive_from_mirror(self, spec: Dict[str, Any], max_age_seconds: float) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        return self.catalog.derive_from_mirror(spec, max_age_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.catalog.cache_totals(), "memory": MEMORY_TIER.stats()}
+
+    def count_removals(self, rows: Iterable[Dict[str, Any]], counter: str) -> None:
+        """Count evicted / invalidated catalog rows against their source tables."""
+        for row in rows:
+            self.catalog.record_metrics({counter: 1}, tables=row_tables(row))
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Exportable effectiveness snapshot: totals (with hit_rate over hits + misses), and the
+        per-table and per-question counters, each sorted by DB seconds saved.
+        """
+        rows = self.catalog.cache_metrics()
+
+        def shape(r: Dict[str, Any]) -> Dict[str, Any]:
+            out: Dict[str, Any] = {
+                c: round(float(r.get(c) or 0.0), 4) if c.startswith("db_seconds") else int(r.get(c) or 0)
+                for c in METRIC_COUNTERS
+            }
+            lookups = out["hits"] + out["misses"]
+            out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else None
+            return out
+
+        total = next((r for r in rows if r["dimension"] == "total"), {})
+
+        def by(dimension: str) -> List[Dict[str, Any]]:
+            picked = [{"name": r["name"], **shape(r)} for r in rows if r["dimension"] == dimension]
+            return sorted(picked, key=lambda r: -r["db_seconds_saved"])
+
+        return {
+            "generated_epoch": round(time.time(), 3),
+            "totals": shape(total),
+            "by_table": by("table"),
+            "by_question": by("question"),
+        }
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+import os
+import threading
+import time
+
+from db.cancellation import CancelToken
+
+T = TypeVar("T")
+
+# How often a waiting caller re-checks its own cancel token.
+_WAIT_SLICE_SECONDS = 0.05
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: for one key, the first caller runs fn and every caller
+    that arrives while it is running waits for, and shares, that same outcome.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], T], *, cancel: Optional[CancelToken] = None) -> Tuple[T, bool]:
+        """
+        Returns (result, shared); shared=True when another caller's execution was reused.
+        A waiting caller whose own `cancel` token fires stops waiting and raises QueryCancelled
+        (the leader keeps running for the others).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            while not call.done.wait(_WAIT_SLICE_SECONDS):
+                if cancel is not None and cancel.cancelled:
+                    with self._lock:
+                        call.waiters -= 1
+                    cancel.raise_if_cancelled()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> Dict[str, int]:
+        with self._lock:
+            return {k: c.waiters for k, c in self._calls.items()}
+
+
+class FileSingleFlight:
+    """
+    Cross-process variant for several worker processes sharing one cache directory.
+    The leader holds `<lock_dir>/<key>.lock` (created with O_EXCL) while it runs fn;
+    other processes poll until the lock is gone and then call `recheck` (normally a cache
+    lookup). Locks older than stale_seconds (crashed leader) are broken.
+    """
+
+    def __init__(self, lock_dir: Path, *, stale_seconds: float, poll_seconds: float = 0.05):
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.stale_seconds = float(stale_seconds)
+        self.poll_seconds = float(poll_seconds)
+
+    def _path(self, key: str) -> Path:
+        return self.lock_dir / f"{key}.lock"
+
+    def _try_acquire(self, path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{os.getpid()} {time.time()}")
+        return True
+
+    def _is_stale(self, path: Path) -> bool:
+        try:
+            return time.time() - path.stat().st_mtime > self.stale_seconds
+        except FileNotFoundError:
+            return False
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], T],
+        recheck: Callable[[], Optional[T]],
+        *,
+        cancel: Optional[CancelToken] = None,
+    ) -> Tuple[T, bool]:
+        path = self._path(key)
+        while True:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if self._try_acquire(path):
+                try:
+                    return fn(), False
+                finally:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+
+            delay = self.poll_seconds
+            while path.exists():
+                if self._is_stale(path):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                    break
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+            result = recheck()
+            if result is not None:
+                return result, True
+            # Leader failed (or its result was not cacheable): compete for the lock again.
+
+
+# Shared by every Executor in the process (each Streamlit session builds its own Executor).
+QUERY_FLIGHTS = SingleFlight()
@@ -1,10 +1,175 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+import uuid
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from cache.memory_tier import ArrowMemoryTier
+from db.arrow_fetch import conform_batch, unify_schema, widen_for_stream
+
+
+# Batches held back while some column is still all-NULL (type unknown) before the
+# Parquet schema is fixed; past this, unknown columns are written as strings.
+SCHEMA_PROBE_BATCHES = 8
+
+# Codecs that take a compression level.
+_LEVELLED_CODECS = ("zstd", "gzip", "brotli")
+
+# (column, op, value) triples, ANDed; ops as in pyarrow.parquet filters ("=", "!=", "<", "in", ...).
+Filters = Sequence[Tuple[str, str, Any]]
+
+
+@dataclass(frozen=True)
+class ParquetLayout:
+    """
+    How snapshot and mirror Parquet files are written. zstd level 1 is 10-40% smaller than
+    snappy (most on text); higher levels save little more and write much slower. Bounded row
+    groups carry min/max statistics, so filtered reads skip the groups that cannot match.
+    Dictionary encoding is applied to text, binary and categorical columns only: on
+    high-cardinality numbers it costs space and write time. Measure changes with
+    cache.layout_benchmark.
+    """
+
+    compression: str = "zstd"
+    compression_level: Optional[int] = 1
+    row_group_rows: int = 131072
+    dictionary: bool = True
+    statistics: bool = True
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "ParquetLayout":
+        level = getattr(settings, "SNAPSHOT_COMPRESSION_LEVEL", 1)
+        return cls(
+            compression=str(getattr(settings, "SNAPSHOT_COMPRESSION", "zstd")).lower(),
+            compression_level=int(level) if level is not None else None,
+            row_group_rows=max(1, int(getattr(settings, "SNAPSHOT_ROW_GROUP_ROWS", 131072))),
+            dictionary=bool(getattr(settings, "SNAPSHOT_DICTIONARY", True)),
+            statistics=bool(getattr(settings, "SNAPSHOT_STATISTICS", True)),
+        )
+
+    def writer_kwargs(self, schema: pa.Schema) -> Dict[str, Any]:
+        dictionary = [
+            f.name
+            for f in schema
+            if pa.types.is_string(f.type)
+            or pa.types.is_large_string(f.type)
+            or pa.types.is_binary(f.type)
+            or pa.types.is_dictionary(f.type)
+        ]
+        kw: Dict[str, Any] = {
+            "compression": self.compression,
+            "use_dictionary": dictionary if self.dictionary else False,
+            "write_statistics": self.statistics,
+        }
+        if self.compression_level is not None and self.compression in _LEVELLED_CODECS:
+            kw["compression_level"] = self.compression_level
+        return kw
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+
+def write_table(path: Path, table: pa.Table, *, layout: Optional[ParquetLayout] = None) -> None:
+    """Write `table` with `layout` into a temp file that is atomically renamed to `path`."""
+    layout = layout or ParquetLayout()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    try:
+        pq.write_table(table, tmp, row_group_size=layout.row_group_rows, **layout.writer_kwargs(table.schema))
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def write_batches(
+    path: Path,
+    batches: Iterable[pa.RecordBatch],
+    *,
+    schema: Optional[pa.Schema] = None,
+    layout: Optional[ParquetLayout] = None,
+) -> Optional[int]:
+    """
+    Write record batches as Parquet into a temp file that is atomically renamed to `path` at
+    the end. Batches are gathered into row groups of layout.row_group_rows, so memory stays at
+    about one row group. Without `schema` the file schema is probed from the first batches
+    (see SCHEMA_PROBE_BATCHES); with it every batch is cast to it.
+    Returns the rows written, or None when the stream had no batches (nothing is written).
+    """
+    layout = layout or ParquetLayout()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+
+    writer: Optional[pq.ParquetWriter] = None
+    group: List[pa.RecordBatch] = []
+    group_rows = 0
+    rows = 0
+
+    def open_writer(file_schema: pa.Schema) -> pq.ParquetWriter:
+        return pq.ParquetWriter(tmp, file_schema, **layout.writer_kwargs(file_schema))
+
+    def flush(final: bool = False) -> None:
+        # Full row groups go out; the remainder waits for more batches unless this is the end.
+        nonlocal group, group_rows
+        assert writer is not None
+        table = pa.Table.from_batches(group, schema=writer.schema)
+        size = layout.row_group_rows
+        while table.num_rows >= size or (final and table.num_rows):
+            writer.write_table(table.slice(0, size), row_group_size=size)
+            table = table.slice(size)
+        group, group_rows = table.to_batches(), table.num_rows
+
+    def add(batch: pa.RecordBatch) -> None:
+        nonlocal group_rows, rows
+        assert writer is not None
+        group.append(conform_batch(batch, writer.schema))
+        group_rows += batch.num_rows
+        rows += batch.num_rows
+        if group_rows >= layout.row_group_rows:
+            flush()
+
+    if schema is not None:
+        writer = open_writer(schema)
+    pending: List[pa.RecordBatch] = []
+    try:
+        for batch in batches:
+            if writer is None:
+                pending.append(batch)
+                probed = unify_schema(pending)
+                if any(pa.types.is_null(f.type) for f in probed) and len(pending) < SCHEMA_PROBE_BATCHES:
+                    continue
+                writer = open_writer(widen_for_stream(probed))
+                for b in pending:
+                    add(b)
+                pending = []
+                continue
+            add(batch)
+
+        if writer is None and pending:
+            # Short result that never got past the schema probe.
+            writer = open_writer(widen_for_stream(unify_schema(pending)))
+            for b in pending:
+                add(b)
+        if writer is None or (schema is not None and rows == 0):
+            return None
+        flush(final=True)
+        writer.close()
+        writer = None
+        os.replace(tmp, path)
+        return rows
+    finally:
+        if writer is not None:
+            writer.close()
+        if tmp.exists():
+            tmp.unlink()
 
 
 @dataclass
@@ -17,10 +182,18 @@ class SnapshotCache:
 
     This avoids re-querying the DB for repeated analytics/dashboard runs.
 
+    With `memory` (cache.memory_tier.ArrowMemoryTier) recently read snapshots are kept
+    decoded in process memory and hits are served without touching disk.
+
+    Files are written with `layout` (compression, row-group size, dictionary encoding,
+    statistics); reads project columns and push filters down to the row groups.
+
     NOTE: This cache is local only; it does NOT alter the source database.
     """
 
     cache_dir: Path
+    memory: Optional[ArrowMemoryTier] = None
+    layout: ParquetLayout = field(default_factory=ParquetLayout)
 
     def __post_init__(self) -> None:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -28,27 +201,124 @@ class SnapshotCache:
     def path_for_key(self, cache_key: str) -> Path:
         return self.cache_dir / f"{cache_key}.parquet"
 
-    def get(self, cache_key: str) -> Optional[pd.DataFrame]:
+    def get(
+        self,
+        cache_key: str,
+        *,
+        columns: Optional[List[str]] = None,
+        max_rows: Optional[int] = None,
+        filters: Optional[Filters] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read a snapshot. `columns` projects (unknown names are ignored), `filters` keeps the
+        matching rows (row groups whose statistics rule them out are not decoded) and
+        `max_rows` stops after that many rows, so only the needed row groups are decoded.
+        """
+        read = self.read(cache_key, columns=columns, max_rows=max_rows, filters=filters)
+        return read[0] if read is not None else None
+
+    def read(
+        self,
+        cache_key: str,
+        *,
+        columns: Optional[List[str]] = None,
+        max_rows: Optional[int] = None,
+        filters: Optional[Filters] = None,
+    ) -> Optional[Tuple[pd.DataFrame, str]]:
+        """get() that also says where the frame came from: "memory" or "disk"."""
         path = self.path_for_key(cache_key)
         if not path.exists():
             return None
+        if self.memory is not None:
+            try:
+                table, source = self._memory_table(self.memory, path)
+            except Exception:
+                table, source = None, "disk"
+            if table is not None:
+                if filters:
+                    table = table.filter(pq.filters_to_expression(list(filters)))
+                if columns is not None:
+                    table = table.select([c for c in columns if c in table.column_names])
+                if max_rows is not None:
+                    table = table.slice(0, int(max_rows))
+                # Single-chunk columns without nulls are handed to pandas without a copy (read-only arrays).
+                return table.to_pandas(split_blocks=True), source
+        df = self._read_disk(path, columns=columns, max_rows=max_rows, filters=filters)
+        return (df, "disk") if df is not None else None
+
+    @staticmethod
+    def _memory_table(memory: ArrowMemoryTier, path: Path) -> Tuple[Optional[pa.Table], str]:
+        st = path.stat()
+        key, signature = str(path.resolve()), (st.st_mtime_ns, st.st_size)
+        table = memory.get(key, signature)
+        if table is not None:
+            return table, "memory"
+        pf = pq.ParquetFile(path)
+        decoded = sum(pf.metadata.row_group(i).total_byte_size for i in range(pf.metadata.num_row_groups))
+        if not memory.admits(decoded):
+            return None, "disk"
+        # One chunk per column: later hits slice it without copying.
+        table = pf.read().combine_chunks()
+        memory.put(key, signature, table)
+        return table, "disk"
+
+    def _read_disk(
+        self,
+        path: Path,
+        *,
+        columns: Optional[List[str]],
+        max_rows: Optional[int],
+        filters: Optional[Filters] = None,
+    ) -> Optional[pd.DataFrame]:
         try:
-            return pd.read_parquet(path)
+            if columns is None and max_rows is None and not filters:
+                return pd.read_parquet(path)
+            dataset = ds.dataset(str(path), format="parquet")
+            cols = [c for c in columns if c in dataset.schema.names] if columns is not None else None
+            expr = pq.filters_to_expression(list(filters)) if filters else None
+            if max_rows is None:
+                return dataset.to_table(columns=cols, filter=expr).to_pandas()
+            batches: List[pa.RecordBatch] = []
+            n = 0
+            scanner = dataset.scanner(columns=cols, filter=expr, batch_size=max(1, min(int(max_rows), 65536)))
+            for batch in scanner.to_batches():
+                batches.append(batch.slice(0, int(max_rows) - n))
+                n += batches[-1].num_rows
+                if n >= int(max_rows):
+                    break
+            return pa.Table.from_batches(batches, schema=scanner.projected_schema).to_pandas()
         except Exception:
             # corrupt cache file → ignore (safe fallback)
             return None
 
-    def put(self, cache_key: str, df: pd.DataFrame) -> Path:
+    def row_count(self, cache_key: str) -> Optional[int]:
         path = self.path_for_key(cache_key)
-        # Ensure directory exists
-        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            return None
+        try:
+            return int(pq.ParquetFile(path).metadata.num_rows)
+        except Exception:
+            return None
 
-        # Write Parquet (fast and compact)
-        df.to_parquet(path, index=False)
+    def put(self, cache_key: str, df: pd.DataFrame) -> Path:
+        path = self.path_for_key(cache_key)
+        write_table(path, pa.Table.from_pandas(df, preserve_index=False), layout=self.layout)
         return path
 
+    def put_batches(self, cache_key: str, batches: Iterable[pa.RecordBatch]) -> Tuple[Optional[Path], int]:
+        """
+        Write record batches as Parquet row groups while they are being fetched, into a temp
+        file that is atomically renamed over the snapshot at the end. Memory stays at about
+        one batch. Returns (path, rows); path is None when the stream had no batches.
+        """
+        path = self.path_for_key(cache_key)
+        rows = write_batches(path, batches, layout=self.layout)
+        return (None, 0) if rows is None else (path, rows)
+
     def delete(self, cache_key: str) -> bool:
         path = self.path_for_key(cache_key)
+        if self.memory is not None:
+            self.memory.invalidate(str(path.resolve()))
         if path.exists():
             path.unlink()
             return True
@@ -59,6 +329,8 @@ class SnapshotCache:
         Deletes all cached parquet files.
         Returns number of deleted files.
         """
+        if self.memory is not None:
+            self.memory.invalidate_prefix(str(self.cache_dir.resolve()))
         n = 0
         for p in self.cache_dir.glob("*.parquet"):
             try:
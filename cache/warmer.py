@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from concurrent.futures import wait
+from datetime import datetime, time as dtime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+import uuid
+
+from config import Settings
+from cache.service import CacheService, sql_fingerprint
+from guards.sql_safety import SQLSafetyGuard
+from observability.query_log import QueryLogStore
+from traces.trace_store import TraceStore
+
+log = logging.getLogger("cache.warmer")
+
+# How often the background loop looks at the clock; a window is warmed once per day.
+WINDOW_POLL_SECONDS = 60.0
+# Query log lines read per pass (the log is append-only; older lines fall out of the lookback anyway).
+LOG_SCAN_ROWS = 20000
+
+Window = Tuple[dtime, dtime]
+
+
+def parse_windows(raw: str) -> List[Window]:
+    """Parse WARM_WINDOWS ("02:00-06:00, 22:30-01:00"); a window ending before it starts wraps midnight."""
+    out: List[Window] = []
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        try:
+            out.append((dtime.fromisoformat(start.strip()), dtime.fromisoformat(end.strip())))
+        except ValueError:
+            raise ValueError(f"bad warm-up window {part!r} (expected HH:MM-HH:MM)") from None
+    return out
+
+
+def current_window(now: datetime, windows: List[Window]) -> Optional[str]:
+    """Id ("<start date> <start>-<end>") of the window `now` falls in, else None."""
+    t = now.time()
+    for start, end in windows:
+        if start <= end:
+            inside, day = start <= t < end, now.date()
+        else:
+            inside = t >= start or t < end
+            day = now.date() if t >= start else now.date() - timedelta(days=1)
+        if inside:
+            return f"{day.isoformat()} {start.strftime('%H:%M')}-{end.strftime('%H:%M')}"
+    return None
+
+
+class CacheWarmer:
+    """
+    Re-executes the most frequently run queries during off-peak windows (WARM_WINDOWS), so the
+    first dashboards of the day hit fresh snapshots instead of the source database.
+
+    Candidates come from the query log (executions per cache key within WARM_LOOKBACK_SECONDS,
+    cache hits included) and are ranked by how often their SQL fingerprint ran, then by their
+    own count; keys run fewer than WARM_MIN_EXECUTIONS times are ignored and at most
+    WARM_MAX_QUERIES are warmed. The SQL, params, spec and sampling to re-run come from the run
+    traces (E_sql_generation of the run whose G_execute produced the key), else from the
+    catalog. Snapshots written less than WARM_MAX_AGE_SECONDS ago are left alone. Every query
+    is re-validated by SQLSafetyGuard and runs through ConcurrentExecutor under its own run id
+    with at most WARM_CONCURRENCY in flight; the snapshots are catalogued as warmed, and the
+    Cache Manager reports how many of them were hit afterwards (warm hit rate).
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.cache = CacheService(settings)
+        self._done: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _executions(self, since: float) -> Dict[str, Dict[str, Any]]:
+        counts: Dict[str, Dict[str, Any]] = {}
+        for row in QueryLogStore(self.settings.LOG_DIR).read_recent(LOG_SCAN_ROWS):
+            key = row.get("cache_key")
+            if not key or row.get("error") or float(row.get("ts") or 0) < since:
+                continue
+            c = counts.setdefault(key, {"cache_key": key, "executions": 0, "last_ts": 0, "db_seconds": []})
+            c["executions"] += 1
+            c["last_ts"] = max(c["last_ts"], int(row.get("ts") or 0))
+            if row.get("mode") == "db" and row.get("seconds") is not None:
+                c["db_seconds"].append(float(row["seconds"]))
+        return counts
+
+    def _traced_queries(self, since: float, keys: set) -> Dict[str, Dict[str, Any]]:
+        """cache_key -> E_sql_generation payload of the newest traced run that executed it."""
+        store = TraceStore(self.settings.TRACES_DIR)
+        runs = sorted(store.list_runs(), key=lambda r: r.get("created_at") or 0, reverse=True)
+        out: Dict[str, Dict[str, Any]] = {}
+        for run in runs:
+            if float(run.get("created_at") or 0) < since or len(out) == len(keys):
+                break
+            nodes = store.load(run["run_id"]).get("nodes", {})
+            executed = (nodes.get("G_execute") or {}).get("payload") or {}
+            generated = (nodes.get("E_sql_generation") or {}).get("payload") or {}
+            key = executed.get("cache_key")
+            if key in keys and key not in out and generated.get("sql"):
+                out[key] = generated
+        return out
+
+    def candidates(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Ranked queries to warm: cache_key, fingerprint, executions, sql, params, spec, sampling."""
+        now = now or time.time()
+        since = now - float(getattr(self.settings, "WARM_LOOKBACK_SECONDS", 7 * 86400))
+        min_runs = int(getattr(self.settings, "WARM_MIN_EXECUTIONS", 3))
+        counts = {k: c for k, c in self._executions(since).items() if c["executions"] >= min_runs}
+        traced = self._traced_queries(since, set(counts))
+        catalog = {r["cache_key"]: r for r in self.cache.catalog.cache_rows() if r["cache_key"] in counts}
+
+        out: List[Dict[str, Any]] = []
+        for key, c in counts.items():
+            if key in traced:
+                q = traced[key]
+                query = {"sql": q["sql"], "params": q.get("params") or {}, "spec": q.get("spec"), "sampling": q.get("sampling")}
+            elif key in catalog and catalog[key].get("sql_text"):
+                row = catalog[key]
+                query = {
+                    "sql": row["sql_text"],
+                    "params": json.loads(row.get("params") or "{}"),
+                    "spec": json.loads(row["query_spec"]) if row.get("query_spec") else None,
+                    "sampling": None,
+                }
+            else:
+                continue
+            seconds = c.pop("db_seconds")
+            c["avg_db_seconds"] = round(sum(seconds) / len(seconds), 4) if seconds else None
+            out.append({**c, "fingerprint": sql_fingerprint(query["sql"]), **query})
+
+        per_fingerprint: Dict[str, int] = {}
+        for q in out:
+            per_fingerprint[q["fingerprint"]] = per_fingerprint.get(q["fingerprint"], 0) + q["executions"]
+        out.sort(key=lambda q: (per_fingerprint[q["fingerprint"]], q["executions"], q["last_ts"]), reverse=True)
+        return out[: int(getattr(self.settings, "WARM_MAX_QUERIES", 50))]
+
+    def run_once(self) -> Dict[str, Any]:
+        from agents.concurrent_executor import ConcurrentExecutor, QueryJob  # the executor starts this warmer
+
+        start = time.time()
+        candidates = self.candidates(start)
+        max_age = float(getattr(self.settings, "WARM_MAX_AGE_SECONDS", 21600))
+        guard = SQLSafetyGuard(self.settings)
+        jobs: List[QueryJob] = []
+        skipped_fresh = 0
+        rejected: Dict[str, List[str]] = {}
+        for q in candidates:
+            path = self.cache.path_for_key(q["cache_key"])
+            if path.exists() and start - path.stat().st_mtime < max_age:
+                skipped_fresh += 1
+                continue
+            safety = guard.validate(q["sql"])
+            if not safety["ok"]:
+                rejected[q["cache_key"]] = list(safety.get("reasons") or [])
+                continue
+            # The original SQL, not the guard's normalized text: the snapshot key must match.
+            jobs.append(
+                QueryJob(sql=q["sql"], params=q["params"], sampling=q["sampling"], spec=q["spec"], label=q["cache_key"], warm=True)
+            )
+
+        errors: Dict[str, str] = {}
+        warmed = 0
+        if jobs:
+            runner = ConcurrentExecutor(self.settings)
+            runner.per_run_limit = max(1, int(getattr(self.settings, "WARM_CONCURRENCY", 2)))
+            futures = runner.submit_many(f"warmup-{uuid.uuid4().hex[:8]}", jobs)
+            wait(futures)
+            for job, fut in zip(jobs, futures):
+                error = fut.exception()
+                if error is None:
+                    warmed += 1
+                else:
+                    errors[str(job.label)] = str(error)
+        return {
+            "candidates": len(candidates),
+            "warmed": warmed,
+            "skipped_fresh": skipped_fresh,
+            "rejected": rejected,
+            "failed": len(errors),
+            "errors": errors,
+            "seconds": round(time.time() - start, 4),
+        }
+
+    def tick(self, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Warm if `now` is inside a window not warmed yet; returns the report, else None."""
+        window = current_window(now or datetime.now(), parse_windows(getattr(self.settings, "WARM_WINDOWS", "")))
+        if window is None or window in self._done:
+            return None
+        self._done.add(window)
+        return self.run_once()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(WINDOW_POLL_SECONDS):
+                try:
+                    report = self.tick()
+                    if report is not None:
+                        log.info(f"cache warm-up: {report['warmed']} warmed, {report['failed']} failed of {report['candidates']}")
+                except Exception as e:
+                    log.warning(f"cache warm-up failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_WARMERS: Dict[str, CacheWarmer] = {}
+_WARMERS_LOCK = threading.Lock()
+
+
+def start_background_warmer(settings: Settings) -> Optional[CacheWarmer]:
+    """One background warmer per cache directory and process, when WARM_WINDOWS is set."""
+    if not str(getattr(settings, "WARM_WINDOWS", "") or "").strip() or bool(getattr(settings, "OFFLINE_ONLY", False)):
+        return None
+    parse_windows(settings.WARM_WINDOWS)  # fail loudly on a malformed setting
+    key = str(Path(settings.CACHE_DIR).resolve())
+    with _WARMERS_LOCK:
+        warmer = _WARMERS.get(key)
+        if warmer is None:
+            warmer = CacheWarmer(settings)
+            warmer.start()
+            _WARMERS[key] = warmer
+    return warmer
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import re
+import threading
+import time
+
+import duckdb
+import pandas as pd
+
+from config import Settings
+from cache.service import CacheService
+from db.dialects import get_dialect
+from guards.sql_safety import SQLSafetyGuard
+
+# Workbench views are named after the snapshot key: snap_<first 12 hex chars>.
+VIEW_PREFIX = "snap_"
+_VIEW_REF = re.compile(rf"\b{VIEW_PREFIX}([0-9a-f]{{12}})\b", re.IGNORECASE)
+# Catalog listing inside the session (view name, key, rows, tables, SQL, created).
+SNAPSHOTS_TABLE = "snapshots"
+
+
+def view_name(cache_key: str) -> str:
+    return f"{VIEW_PREFIX}{cache_key[:12]}"
+
+
+class SnapshotWorkbench:
+    """
+    Ad-hoc DuckDB SQL across every cached snapshot, without touching the source database.
+
+    One in-memory DuckDB session per cache directory and process holds a view per catalog
+    entry (snap_<key prefix>, see view_name) plus a `snapshots` table listing them; views
+    follow the catalog before each query. The session is read-only twice over: statements
+    must pass SQLSafetyGuard (single SELECT / WITH, DuckDB row limit) and the engine itself
+    may only read files under CACHE_DIR with its configuration locked, so no query can
+    attach, copy or read anything else. Results are memoized (WORKBENCH_MEMO_BYTES) per
+    normalized SQL and are reused until a snapshot the query names is rewritten or dropped.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.cache = CacheService(settings)
+        self.guard = SQLSafetyGuard(settings, dialect=get_dialect("duckdb"))
+        self.memo_bytes = int(getattr(settings, "WORKBENCH_MEMO_BYTES", 256 * 1024**2))
+        self._memo: "OrderedDict[str, Tuple[Any, pd.DataFrame, int]]" = OrderedDict()
+        self._memo_used = 0
+        self._views: Dict[str, Tuple[Any, ...]] = {}
+        self._lock = threading.Lock()
+        self._con = duckdb.connect(database=":memory:")
+        root = self.cache.snapshots.cache_dir.resolve().as_posix()
+        self._con.execute(f"SET allowed_directories=['{root}']")
+        self._con.execute("SET enable_external_access=false")
+        self._con.execute("SET lock_configuration=true")
+
+    # -----------------------------
+    # Views
+    # -----------------------------
+    def sync(self) -> Dict[str, Tuple[Any, ...]]:
+        """Create, replace and drop views so they match the catalog; returns key -> signature."""
+        rows = {r["cache_key"]: r for r in self.cache.catalog.cache_rows() if r["parquet_path"]}
+        current = {k: (r["parquet_path"], str(r["created_at"]), r["size_bytes"]) for k, r in rows.items()}
+        with self._lock:
+            if current == self._views:
+                return current
+            for key in set(self._views) - set(current):
+                self._con.execute(f"DROP VIEW IF EXISTS {view_name(key)}")
+            for key, sig in current.items():
+                if self._views.get(key) != sig:
+                    path = Path(sig[0]).resolve().as_posix().replace("'", "''")
+                    self._con.execute(f"CREATE OR REPLACE VIEW {view_name(key)} AS SELECT * FROM read_parquet('{path}')")
+            listing = pd.DataFrame(
+                [
+                    {
+                        "view_name": view_name(k),
+                        "cache_key": k,
+                        "rows": r["row_count"],
+                        "size_bytes": r["size_bytes"],
+                        "tables": r["tables"],
+                        "sql_text": r["sql_text"],
+                        "created_at": r["created_at"],
+                    }
+                    for k, r in sorted(rows.items())
+                ],
+                columns=["view_name", "cache_key", "rows", "size_bytes", "tables", "sql_text", "created_at"],
+            )
+            self._con.register("_snapshot_listing", listing)
+            self._con.execute(f"CREATE OR REPLACE TABLE {SNAPSHOTS_TABLE} AS SELECT * FROM _snapshot_listing")
+            self._con.unregister("_snapshot_listing")
+            self._views = current
+        return current
+
+    def views(self) -> pd.DataFrame:
+        self.sync()
+        with self._lock:
+            return self._con.execute(f"SELECT * FROM {SNAPSHOTS_TABLE} ORDER BY created_at DESC").df()
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def query(self, sql: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Run read-only DuckDB SQL over the snapshot views. Returns (df, meta) with the normalized
+        SQL, memoized, rows, seconds and the views it read; raises ValueError when the guard
+        rejects the statement.
+        """
+        start = time.time()
+        safety = self.guard.validate(sql)
+        if not safety["ok"]:
+            raise ValueError("; ".join(safety["reasons"]) or "rejected")
+        normalized = safety["normalized_sql"]
+        current = self.sync()
+        prefixes = {m.lower() for m in _VIEW_REF.findall(normalized)}
+        read = sorted(k for k in current if k[:12] in prefixes)
+        # A query over the listing depends on every snapshot.
+        lists_all = re.search(rf"\b{SNAPSHOTS_TABLE}\b", normalized, re.IGNORECASE) is not None
+        signature = tuple(sorted(current.items())) if lists_all else tuple((k, current[k]) for k in read)
+        meta: Dict[str, Any] = {
+            "normalized_sql": normalized,
+            "views": [view_name(k) for k in read],
+            "enforced_limit": safety["enforced_limit"],
+        }
+
+        with self._lock:
+            memo = self._memo.get(normalized)
+            if memo is not None and memo[0] == signature:
+                self._memo.move_to_end(normalized)
+                df = memo[1]
+                meta.update(memoized=True, rows=int(len(df)), seconds=round(time.time() - start, 4))
+                return df.copy(deep=False), meta
+            con = self._con.cursor()
+        try:
+            df = con.execute(normalized).df()
+        finally:
+            con.close()
+        self._remember(normalized, signature, df)
+        meta.update(memoized=False, rows=int(len(df)), seconds=round(time.time() - start, 4))
+        return df, meta
+
+    def _remember(self, key: str, signature: Any, df: pd.DataFrame) -> None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.memo_bytes:
+            return
+        with self._lock:
+            old = self._memo.pop(key, None)
+            if old is not None:
+                self._memo_used -= old[2]
+            self._memo[key] = (signature, df.copy(deep=False), nbytes)
+            self._memo_used += nbytes
+            while self._memo_used > self.memo_bytes and self._memo:
+                _key, (_sig, _df, n) = self._memo.popitem(last=False)
+                self._memo_used -= n
+
+    def clear_memo(self) -> None:
+        with self._lock:
+            self._memo.clear()
+            self._memo_used = 0
+
+    def memo_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._memo), "bytes": self._memo_used, "max_bytes": self.memo_bytes}
+
+
+_WORKBENCHES: Dict[str, SnapshotWorkbench] = {}
+_WORKBENCHES_LOCK = threading.Lock()
+
+
+def shared_workbench(settings: Settings) -> SnapshotWorkbench:
+    """The process-wide workbench session for settings.CACHE_DIR (shared by Streamlit sessions)."""
+    key = str(Path(settings.CACHE_DIR).resolve())
+    with _WORKBENCHES_LOCK:
+        bench = _WORKBENCHES.get(key)
+        if bench is None:
+            bench = _WORKBENCHES[key] = SnapshotWorkbench(settings)
+    return bench
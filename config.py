@@ -18,6 +18,7 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "qwen3:8b"
 
     # DB
+    # "mssql+pyodbc" (SQL Server) | "duckdb" | "sqlite"; for duckdb/sqlite DB_NAME is the database file path
     DB_DIALECT: str = "mssql+pyodbc"
     DB_HOST: str = "DRWNWSQATSI12.amer.dell.com"
     DB_PORT: int = 1433
@@ -26,17 +27,63 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = "@Reward123"
     ODBC_DRIVER: str = "ODBC Driver 18 for SQL Server"
     ODBC_EXTRA_PARAMS: str = "TrustServerCertificate=yes;Encrypt=no"
+    # Connection pool (one process-wide engine per target; see db.engine.get_engine)
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     # Safety & performance
     MAX_RETURNED_ROWS: int = 200000
     DEFAULT_EXPLORATORY_TOP: int = 10000
-    FETCH_CHUNK_SIZE: int = 50000
-    STATEMENT_TIMEOUT_SECONDS: int = 360000  # keep large if you want
+    FETCH_CHUNK_SIZE: int = 50000  # rows per Arrow record batch when fetching results
+    MAX_RESULT_BYTES: int = 2147483648  # stop fetching once the Arrow buffers pass this size (2 GiB)
+    STREAM_RESULTS_TO_PARQUET: bool = False  # write fetched batches straight to the snapshot (always on in large mode)
+    MAX_CONCURRENT_QUERIES: int = 8  # process-wide query worker threads (ConcurrentExecutor)
+    MAX_CONCURRENT_QUERIES_PER_RUN: int = 2  # in-flight queries per pipeline run
+    STREAM_MAX_ROWS: int = 50000000  # row cap for streamed snapshots; the in-memory frame stays <= MAX_RETURNED_ROWS
+    STATEMENT_TIMEOUT_SECONDS: int = 360000  # legacy; no longer used for execution (see QUERY_TIMEOUT_SECONDS)
+    QUERY_TIMEOUT_SECONDS: int = 300  # enforced by a watchdog that cancels the in-flight cursor
+    ENABLE_GROUPING_SETS: bool = True  # one GROUPING SETS scan for multi-grain plans
+    COMPACT_RESULT_DTYPES: bool = True  # downcast/categorize result frames before validation and insights
+    APPROX_SAMPLE_TARGET_ROWS: int = 1000000  # approximate mode: rows to read from the sampled table
+    APPROX_MIN_TABLE_ROWS: int = 5000000  # smaller tables are scanned in full even in approximate mode
+    INDEX_WARN_MIN_ROWS: int = 1000000  # warn on unindexed filters/joins against tables at least this big
 
     # Storage
     DATA_DIR: str = "./data"
     KNOWLEDGE_GRAPH_DIR: str = "./knowledge_graph_data"
     CACHE_DIR: str = "./cache_data"
+    DUCKDB_PATH: str = "./cache_data/catalog.duckdb"
+    SINGLE_FLIGHT_MODE: str = "process"  # "process" | "file" (several worker processes share CACHE_DIR; the catalog is then opened per operation) | "off"
+    CACHE_MAX_BYTES: int = 10737418240  # snapshot cache budget (10 GiB), enforced by background eviction
+    CACHE_MAX_ENTRIES: int = 5000
+    CACHE_EVICTION_POLICY: str = "lru"  # "lru" | "lfu" | "ttl" (older than CACHE_TTL_SECONDS first, then LRU); cheap snapshots go first
+    CACHE_TTL_SECONDS: int = 604800
+    CACHE_EVICTION_INTERVAL_SECONDS: int = 300  # 0 = no background eviction
+    CACHE_MEMORY_BYTES: int = 536870912  # in-process Arrow tier for hot snapshots, shared by all sessions (0 = off)
+    SNAPSHOT_COMPRESSION: str = "zstd"  # snapshot/mirror Parquet codec: "zstd" | "snappy" | "lz4" | "gzip" | "none"
+    SNAPSHOT_COMPRESSION_LEVEL: int = 1  # zstd/gzip/brotli level; measure with `python -m cache.layout_benchmark`
+    SNAPSHOT_ROW_GROUP_ROWS: int = 131072  # rows per Parquet row group (the unit filtered reads can skip)
+    SNAPSHOT_DICTIONARY: bool = True  # dictionary-encode columns (small for repetitive dimensions)
+    SNAPSHOT_STATISTICS: bool = True  # min/max per row group, needed for predicate pushdown
+    FRESHNESS_CHECK_INTERVAL_SECONDS: int = 60  # poll source tables for changes and drop dependent snapshots (0 = off)
+    FRESHNESS_ACTION: str = "invalidate"  # "invalidate" | "refresh" (re-run dependent snapshots right away)
+    FRESHNESS_WATERMARKS: str = ""  # "schema.table:column, ..." whose MAX() is the change signal (cache.freshness)
+    INCREMENTAL_REFRESH: bool = True  # invalidated time-series snapshots are topped up with only the new rows (cache.incremental)
+    WARM_WINDOWS: str = ""  # local off-peak windows "02:00-06:00, ..." for cache warm-up (cache.warmer; "" = off)
+    WARM_LOOKBACK_SECONDS: int = 604800  # query history mined for warm-up candidates
+    WARM_MIN_EXECUTIONS: int = 3  # runs within the lookback before a query is worth warming
+    WARM_MAX_QUERIES: int = 50
+    WARM_MAX_AGE_SECONDS: int = 21600  # snapshots younger than this are not re-run
+    WARM_CONCURRENCY: int = 2  # warm-up queries in flight at once
+    WORKBENCH_MEMO_BYTES: int = 268435456  # memoized Snapshot Workbench results (cache.workbench)
+    MIRROR_DIR: str = "./cache_data/mirror"
+    MIRROR_TABLES: str = ""  # "schema.table[:watermark_column], ..." copied into the local DuckDB mirror (cache.mirror)
+    MIRROR_FRESHNESS_SLA_SECONDS: int = 900  # route queries to a mirror refreshed at most this long ago (0 = never)
+    MIRROR_PART_ROWS: int = 1000000  # rows per mirror Parquet part; incremental updates rewrite only touched parts
+    MIRROR_EXTRACT_TIMEOUT_SECONDS: int = 3600  # bulk extraction gets more time than interactive queries
     TRACES_DIR: str = "./traces_data"
     LOG_DIR: str = "./logs"
 
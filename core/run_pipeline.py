@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
+from typing import Any, Callable, Dict, Optional, List, Tuple
+import queue
+import time
 import traceback
 
 import pandas as pd
@@ -15,12 +17,16 @@ from agents.planner_agent import PlannerAgent
 from agents.sql_agent import SQLAgent
 from guards.sql_safety import SQLSafetyGuard
 from agents.executor import Executor
+from agents.concurrent_executor import ConcurrentExecutor, QueryJob, cancel_run
+from db.cancellation import QueryTimeoutError
 from agents.data_quality_agent import DataQualityAgent
 from agents.insight_agent import InsightAgent
 from agents.dashboard_agent import DashboardAgent
 from agents.critique_agent import CritiqueAgent
 
 from observability.query_log import QueryLogStore
+from utils.result_slicing import INTERNAL_PREFIX, detail_slice
+from utils.result_typing import compact_dtypes, frame_bytes, result_column_types
 
 
 PIPELINE_STEPS = [
@@ -39,6 +45,69 @@ PIPELINE_STEPS = [
 ]
 
 
+# How often the pipeline thread checks for a first chunk while the query runs.
+_PREVIEW_POLL_SECONDS = 0.05
+
+
+def _run_with_preview(
+    executor: ConcurrentExecutor,
+    run_id: str,
+    job: QueryJob,
+    first_chunks: "queue.Queue[pd.DataFrame]",
+    publish: Callable[[pd.DataFrame], None],
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Like ConcurrentExecutor.run_all for one job, but hands the first chunk to `publish` on this
+    (the caller's) thread while the fetch continues, e.g. so Streamlit can draw into the page.
+    """
+    fut = executor.submit(run_id, job)
+    try:
+        published = False
+        while True:
+            try:
+                first = first_chunks.get(timeout=_PREVIEW_POLL_SECONDS)
+            except queue.Empty:
+                if fut.done():
+                    break
+                continue
+            if not published:
+                published = True
+                try:
+                    publish(first)
+                except Exception:
+                    pass
+        return fut.result()
+    except BaseException:
+        cancel_run(run_id, reason="run failed")
+        raise
+
+
+def _publish_preview(
+    first: pd.DataFrame,
+    *,
+    plan: Dict[str, Any],
+    insight: InsightAgent,
+    on_preview: Callable[[Dict[str, Any]], None],
+    trace_store: TraceStore,
+    run_id: str,
+) -> None:
+    rows = int(len(first))
+    provisional = insight.generate(df=first, plan=plan)
+    provisional["kpis"] = [
+        {**k, "context": f"{k.get('context', '')} · provisional (first {rows:,} rows)".strip(" ·"), "provisional": True}
+        for k in provisional.get("kpis") or []
+    ]
+    detail = detail_slice(first, plan)
+    payload = {
+        "rows": rows,
+        "columns": [str(c) for c in detail.columns],
+        "df_preview": detail.head(50).to_dict(orient="records"),
+        "insights": provisional,
+    }
+    trace_store.add_node(run_id, "G_execute__first_chunk", {"rows": rows, "columns": payload["columns"]})
+    on_preview(payload)
+
+
 def run_agentic_pipeline(
     *,
     settings: Settings,
@@ -49,6 +118,8 @@ def run_agentic_pipeline(
     human_review: Optional[Dict[str, Any]],
     developer_mode: bool,
     large_mode: bool,
+    approximate: bool = False,
+    on_preview: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> Dict[str, Any]:
     """
     Runs A→L deterministically, persisting node outputs to TraceStore.
@@ -57,6 +128,16 @@ def run_agentic_pipeline(
     large_mode:
       - True: SQLAgent uses TOP(MAX_RETURNED_ROWS)
       - False: SQLAgent uses TOP(DEFAULT_EXPLORATORY_TOP)
+
+    approximate:
+      - only with large_mode=False: SQLAgent samples big tables (TABLESAMPLE) with scaled
+        aggregates; exec_meta["approximate"] records rate + error, KPIs are labeled approximate
+
+    on_preview:
+      - called on the calling thread as soon as the first fetched chunk arrives, with
+        {"rows", "columns", "df_preview", "insights"} (provisional KPIs on that chunk); the rest
+        of the result keeps streaming and H→J run on the full result as usual
+        (exec_meta["first_chunk_seconds"] = time to first result)
     """
     kg = KnowledgeGraphStore(settings.KNOWLEDGE_GRAPH_DIR)
     registry = SchemaRegistry(settings.KNOWLEDGE_GRAPH_DIR)
@@ -65,7 +146,7 @@ def run_agentic_pipeline(
     planner = PlannerAgent(settings=settings, kg=kg, registry=registry)
     sql_agent = SQLAgent(settings=settings, registry=registry)
     guard = SQLSafetyGuard(settings=settings)
-    executor = Executor(settings=settings)
+    executor = ConcurrentExecutor(settings=settings, executor=Executor(settings=settings))
     dq = DataQualityAgent()
     insight = InsightAgent()
     dashboard = DashboardAgent(settings=settings)
@@ -78,6 +159,7 @@ def run_agentic_pipeline(
     trace_store.add_node(run_id, "RUN_CONFIG", {
         "developer_mode": bool(developer_mode),
         "large_mode": bool(large_mode),
+        "approximate": bool(approximate),
         "allowed_tables_count": len(allowed_tables),
         "allowed_tables_preview": allowed_tables[:50],
     })
@@ -119,6 +201,7 @@ def run_agentic_pipeline(
 
         # ✅ attach large_mode to plan so every downstream node can use it
         plan["large_mode"] = bool(large_mode)
+        plan["approximate"] = bool(approximate)
 
         trace_store.add_node(run_id, "C_plan", plan)
         trace_store.add_node(run_id, "C_plan__large_mode", {"large_mode": bool(large_mode)})
@@ -170,8 +253,10 @@ def run_agentic_pipeline(
             plan=plan,
             allowed_tables=allowed_tables,
             large_mode=bool(plan.get("large_mode", large_mode)),
+            approximate=bool(plan.get("approximate", approximate)),
         )
         trace_store.add_node(run_id, "E_sql_generation", sql_bundle)
+        trace_store.add_node(run_id, "E_sql_generation__cost", sql_bundle.get("cost") or {})
         critique_e = critique.critique_step("E_sql_generation", sql_bundle)
         trace_store.add_node(run_id, "E_sql_generation__critique", critique_e)
     except Exception as e:
@@ -198,20 +283,66 @@ def run_agentic_pipeline(
     # G) Execute SQL safely (with cache)
     # -------------------------
     try:
-        df, exec_meta = executor.run(sql=sql_bundle["sql"], params=sql_bundle.get("params") or {})
+        # Runs on the shared query pool under this run_id, so a failed or abandoned run
+        # (ui: new question, Streamlit stop) can cancel it via cancel_run(run_id).
+        first_chunks: "queue.Queue[pd.DataFrame]" = queue.Queue()
+        job = QueryJob(
+            sql=sql_bundle["sql"],
+            params=sql_bundle.get("params") or {},
+            sampling=sql_bundle.get("sampling"),
+            spec=sql_bundle.get("spec"),
+            # Large mode streams into the snapshot so results bigger than RAM stay on disk.
+            stream=True if bool(plan.get("large_mode", large_mode)) else None,
+            columns=sql_bundle.get("expected_columns"),
+            label="main",
+            question=user_question,
+            on_first_chunk=first_chunks.put if on_preview is not None else None,
+        )
+        if on_preview is None:
+            [(df, exec_meta)] = executor.run_all(run_id, [job])
+        else:
+            df, exec_meta = _run_with_preview(
+                executor,
+                run_id,
+                job,
+                first_chunks,
+                lambda first: _publish_preview(first, plan=plan, insight=insight, on_preview=on_preview, trace_store=trace_store, run_id=run_id),
+            )
         trace_store.add_node(run_id, "G_execute", exec_meta)
         query_logs.append(exec_meta)
         critique_g = critique.critique_step("G_execute", exec_meta)
         trace_store.add_node(run_id, "G_execute__critique", critique_g)
     except Exception as e:
+        if isinstance(e, QueryTimeoutError):
+            # Record the timeout like any execution, so it is visible in the trace and query log.
+            trace_store.add_node(run_id, "G_execute", e.meta)
+            query_logs.append(e.meta)
         trace_store.add_error(run_id, "G_execute", str(e), traceback.format_exc())
         return {"run_id": run_id, "status": "failed", "error": f"Execution failed: {e}"}
 
+    # Result typing: smallest faithful dtypes before H/I/J each walk the frame.
+    typing_report: Dict[str, Any] = {"enabled": bool(getattr(settings, "COMPACT_RESULT_DTYPES", True))}
+    if typing_report["enabled"]:
+        try:
+            column_types = result_column_types(sql_bundle.get("spec"), registry.load().get("tables", {}))
+            df, report = compact_dtypes(df, column_types)
+            typing_report.update(report)
+        except Exception as e:
+            typing_report["error"] = str(e)
+    else:
+        typing_report["bytes_before"] = typing_report["bytes_after"] = frame_bytes(df)
+    trace_store.add_node(run_id, "G_execute__typing", typing_report)
+    stage_seconds: Dict[str, float] = {}
+
     # -------------------------
     # H) Data validation
     # -------------------------
+    stage_t0 = time.perf_counter()
     try:
-        dq_report = dq.run(df, expected_columns=plan.get("expected_columns"))
+        # Profile the finest grain only: rolled-up rows of a GROUPING SETS result carry NULLs
+        # (and repeat values) by design.
+        expected = [c for c in plan.get("expected_columns") or [] if not str(c).startswith(INTERNAL_PREFIX)]
+        dq_report = dq.run(detail_slice(df, plan), expected_columns=expected or None)
         trace_store.add_node(run_id, "H_data_validation", dq_report)
         critique_h = critique.critique_step("H_data_validation", dq_report)
         trace_store.add_node(run_id, "H_data_validation__critique", critique_h)
@@ -223,11 +354,14 @@ def run_agentic_pipeline(
         trace_store.add_error(run_id, "H_data_validation", str(e), traceback.format_exc())
         return {"run_id": run_id, "status": "failed", "error": f"Data validation failed: {e}"}
 
+    stage_seconds["H_data_validation"] = round(time.perf_counter() - stage_t0, 4)
+
     # -------------------------
     # I) Insights
     # -------------------------
+    stage_t0 = time.perf_counter()
     try:
-        insights = insight.generate(df=df, plan=plan)
+        insights = insight.generate(df=df, plan=plan, exec_meta=exec_meta)
         trace_store.add_node(run_id, "I_insights", insights)
         critique_i = critique.critique_step("I_insights", insights)
         trace_store.add_node(run_id, "I_insights__critique", critique_i)
@@ -235,9 +369,12 @@ def run_agentic_pipeline(
         trace_store.add_error(run_id, "I_insights", str(e), traceback.format_exc())
         return {"run_id": run_id, "status": "failed", "error": f"Insights failed: {e}"}
 
+    stage_seconds["I_insights"] = round(time.perf_counter() - stage_t0, 4)
+
     # -------------------------
     # J) Dashboard generation (HTML)
     # -------------------------
+    stage_t0 = time.perf_counter()
     try:
         html_bundle = dashboard.build_dashboard(df=df, plan=plan, insights=insights)
         trace_store.add_node(run_id, "J_dashboard", {"dashboard_meta": html_bundle["meta"]})
@@ -252,6 +389,15 @@ def run_agentic_pipeline(
         trace_store.add_error(run_id, "J_dashboard", str(e), traceback.format_exc())
         return {"run_id": run_id, "status": "failed", "error": f"Dashboard failed: {e}"}
 
+    stage_seconds["J_dashboard"] = round(time.perf_counter() - stage_t0, 4)
+    stage_profile = {
+        "frame_bytes_before_typing": typing_report.get("bytes_before"),
+        "frame_bytes": typing_report.get("bytes_after"),
+        "typing_seconds": typing_report.get("seconds"),
+        "stage_seconds": stage_seconds,
+    }
+    trace_store.add_node(run_id, "J_dashboard__stages", stage_profile)
+
     # -------------------------
     # K) Render
     # -------------------------
@@ -287,6 +433,7 @@ def run_agentic_pipeline(
             "params": sql_bundle.get("params") or {},
             "exec_meta": exec_meta,
             "data_quality": dq_report,
+            "stage_profile": stage_profile,
             "insights": insights,
             "dashboard_html": html_bundle["html"],
             "dashboard_meta": html_bundle["meta"],
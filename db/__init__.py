@@ -1,49 +1,20 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Tuple
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 import os
 import re
 import time
 
 import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+import pyarrow as pa
+from sqlalchemy import text
 
 from config import Settings
-
-
-_ENGINE: Optional[Engine] = None
-
-
-def build_mssql_engine(settings: Settings) -> Engine:
-    """
-    Build SQL Server engine using SQLAlchemy + pyodbc.
-    Keeps it read-only at app-level; DB user should also be read-only.
-    """
-    driver = settings.MSSQL_DRIVER
-    server = settings.MSSQL_SERVER
-    database = settings.MSSQL_DATABASE
-    username = settings.MSSQL_USERNAME
-    password = settings.MSSQL_PASSWORD
-
-    encrypt = "yes" if str(settings.MSSQL_ENCRYPT).lower() in ("1", "true", "yes") else "no"
-    trust_cert = "yes" if str(settings.MSSQL_TRUST_CERT).lower() in ("1", "true", "yes") else "no"
-
-    # NOTE: do not print this; treat as secret
-    conn_str = (
-        f"mssql+pyodbc://{username}:{password}@{server}/{database}"
-        f"?driver={driver}"
-        f"&Encrypt={encrypt}"
-        f"&TrustServerCertificate={trust_cert}"
-    )
-    return create_engine(conn_str, pool_pre_ping=True, fast_executemany=True)
-
-
-def get_engine(settings: Settings) -> Engine:
-    global _ENGINE
-    if _ENGINE is None:
-        _ENGINE = build_mssql_engine(settings)
-    return _ENGINE
+from db.arrow_fetch import fetch_arrow, iter_capped_batches
+from db.cancellation import CancelToken, QueryCancelled, QueryTimeoutError, interrupt_dbapi, watchdog
+from db.engine import get_engine
+from observability.timing import PhaseTimer
 
 
 def _enforce_select_only(sql: str) -> None:
@@ -75,43 +46,172 @@ def _enforce_select_only(sql: str) -> None:
         raise ValueError("Unsafe SQL blocked at DB layer: only SELECT allowed")
 
 
-def run_sql_query(
-    *,
+@contextmanager
+def _execute(
     sql: str,
     params: Dict[str, Any],
     timeout_seconds: int,
-    max_rows: int,
-    settings: Optional[Settings] = None,
-) -> pd.DataFrame:
+    settings: Settings,
+    cancel: Optional[CancelToken] = None,
+    timer: Optional[PhaseTimer] = None,
+) -> Iterator[Any]:
     """
-    Executes a SELECT-only SQL query safely with:
-      - per-statement timeout
-      - max rows cutoff
+    Execute under a watchdog: after timeout_seconds (or when `cancel` fires) the in-flight
+    cursor is cancelled at the driver, the connection is invalidated so the pool hands out
+    a fresh one, and QueryTimeoutError / QueryCancelled is raised.
+    `timer` gets the "pool_checkout" and "execute" phases.
     """
-    if settings is None:
-        settings = Settings()
-
     _enforce_select_only(sql)
+    token = cancel or CancelToken()
+    token.raise_if_cancelled()
+    timer = timer or PhaseTimer()
 
     engine = get_engine(settings)
-
-    start = time.time()
-    with engine.connect() as conn:
-        # Set timeout for SQL Server (seconds). SQLAlchemy uses driver-specific.
-        # For pyodbc, you can set it on the connection if needed.
+    with timer.phase("pool_checkout"):
+        conn = engine.connect()
+    with conn:
+        # Server-side timeout where the driver supports it (pyodbc); the watchdog covers the rest.
+        raw = None
         try:
-            raw = conn.connection
+            raw = conn.connection.dbapi_connection
             if hasattr(raw, "timeout"):
                 raw.timeout = int(timeout_seconds)
         except Exception:
             pass
 
-        result = conn.execute(text(sql), params or {})
-        rows = result.fetchmany(max_rows + 1)
+        unregister = token.add_callback(lambda: interrupt_dbapi(conn.info.get("inflight_cursor"), raw))
+        try:
+            with watchdog(token, timeout_seconds):
+                with timer.phase("execute"):
+                    result = conn.execute(text(sql), params or {})
+                try:
+                    yield result
+                finally:
+                    result.close()
+        except BaseException as e:
+            if not token.cancelled:
+                raise
+            conn.invalidate()
+            if token.reason == "timeout":
+                raise QueryTimeoutError(
+                    f"Query cancelled after exceeding its {int(timeout_seconds)}s timeout.",
+                    meta={"timed_out": True, "timeout_seconds": int(timeout_seconds)},
+                ) from e
+            if isinstance(e, QueryCancelled):
+                raise
+            raise QueryCancelled(f"Query cancelled ({token.reason}).") from e
+        finally:
+            unregister()
+            if not conn.invalidated:
+                conn.info.pop("inflight_cursor", None)
+        if token.cancelled and not conn.invalidated:
+            # Interrupt raced with a normal finish; don't return a possibly-interrupted connection.
+            conn.invalidate()
+
+
+def run_sql_query_arrow(
+    *,
+    sql: str,
+    params: Dict[str, Any],
+    timeout_seconds: int,
+    max_rows: int,
+    settings: Optional[Settings] = None,
+    cancel: Optional[CancelToken] = None,
+    on_first_batch: Optional[Callable[[pa.RecordBatch], None]] = None,
+    timer: Optional[PhaseTimer] = None,
+) -> Tuple[pa.Table, Dict[str, Any]]:
+    """
+    Executes a SELECT-only SQL query safely with:
+      - per-statement timeout (watchdog-enforced; raises QueryTimeoutError)
+      - max rows cutoff and MAX_RESULT_BYTES memory cutoff
+      - columnar fetch: FETCH_CHUNK_SIZE rows at a time into Arrow record batches
+        (no SQLAlchemy Row objects, no full-result Python list)
+    `cancel` (db.cancellation.CancelToken) aborts the fetch with QueryCancelled.
+    `on_first_batch` receives the first record batch as soon as it is fetched.
+    `timer` (observability.timing.PhaseTimer) collects the pool_checkout / execute /
+    first_row / fetch phase timings.
+    Returns (arrow_table, fetch_meta).
+    """
+    if settings is None:
+        settings = Settings()
+    chunk_size = max(1, int(getattr(settings, "FETCH_CHUNK_SIZE", 50000)))
+    max_bytes = int(getattr(settings, "MAX_RESULT_BYTES", 2 * 1024**3))
+
+    start = time.time()
+    with _execute(sql, params, timeout_seconds, settings, cancel, timer) as result:
+        table, fetch = fetch_arrow(
+            result,
+            chunk_size=chunk_size,
+            max_rows=int(max_rows),
+            max_bytes=max_bytes,
+            cancel=cancel,
+            on_first_batch=on_first_batch,
+            timer=timer,
+        )
+
+    fetch["seconds"] = round(time.time() - start, 4)
+    return table, fetch
+
+
+def stream_sql_query(
+    *,
+    sql: str,
+    params: Dict[str, Any],
+    timeout_seconds: int,
+    max_rows: int,
+    meta: Dict[str, Any],
+    settings: Optional[Settings] = None,
+    cancel: Optional[CancelToken] = None,
+    timer: Optional[PhaseTimer] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Same safety rules as run_sql_query_arrow(), but yields the FETCH_CHUNK_SIZE record batches
+    as they arrive instead of collecting them. No byte cap: the consumer is expected to write
+    each batch out (see SnapshotCache.put_batches). Fetch stats are filled into `meta`.
+    `timer` gets pool_checkout / execute; wrap the iterator in db.arrow_fetch.timed_batches
+    for first_row / fetch.
+    """
+    if settings is None:
+        settings = Settings()
+    chunk_size = max(1, int(getattr(settings, "FETCH_CHUNK_SIZE", 50000)))
 
-        if len(rows) > max_rows:
-            rows = rows[:max_rows]
+    start = time.time()
+    with _execute(sql, params, timeout_seconds, settings, cancel, timer) as result:
+        yield from iter_capped_batches(
+            result, chunk_size=chunk_size, max_rows=int(max_rows), max_bytes=None, meta=meta, cancel=cancel
+        )
+    meta["seconds"] = round(time.time() - start, 4)
 
-        df = pd.DataFrame(rows, columns=result.keys())
 
-    return df
\ No newline at end of file
+def run_sql_query(
+    *,
+    sql: str,
+    params: Dict[str, Any],
+    timeout_seconds: int,
+    max_rows: int,
+    settings: Optional[Settings] = None,
+    cancel: Optional[CancelToken] = None,
+    on_first_batch: Optional[Callable[[pa.RecordBatch], None]] = None,
+    timer: Optional[PhaseTimer] = None,
+) -> pd.DataFrame:
+    """
+    run_sql_query_arrow() converted to pandas; fetch stats are kept in df.attrs["fetch"].
+    The conversion is timed as phase "dataframe".
+    """
+    timer = timer or PhaseTimer()
+    table, fetch = run_sql_query_arrow(
+        sql=sql,
+        params=params,
+        timeout_seconds=timeout_seconds,
+        max_rows=max_rows,
+        settings=settings,
+        cancel=cancel,
+        on_first_batch=on_first_batch,
+        timer=timer,
+    )
+    # self_destruct releases each Arrow column once pandas owns it, so only one copy peaks.
+    with timer.phase("dataframe"):
+        df = table.to_pandas(self_destruct=True, split_blocks=True)
+        del table
+    df.attrs["fetch"] = fetch
+    return df
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import decimal
+import time
+
+import pyarrow as pa
+
+from db.cancellation import CancelToken
+from observability.timing import PhaseTimer
+
+
+def _native_reader(cursor: Any, chunk_size: int) -> Optional[pa.RecordBatchReader]:
+    """Drivers that speak Arrow natively (DuckDB) hand us record batches directly."""
+    for name in ("to_arrow_reader", "fetch_record_batch"):
+        fn = getattr(cursor, name, None)
+        if callable(fn):
+            try:
+                return fn(int(chunk_size))
+            except Exception:
+                return None
+    return None
+
+
+def _description_types(cursor: Any) -> List[Optional[pa.DataType]]:
+    """
+    Arrow types the DBAPI description pins down for every chunk. Only DECIMAL/NUMERIC/MONEY
+    for now: inferring them per chunk gives each chunk its own precision and scale.
+    """
+    types: List[Optional[pa.DataType]] = []
+    for d in getattr(cursor, "description", None) or []:
+        type_code, precision, scale = d[1], d[4], d[5]
+        if type_code is decimal.Decimal and isinstance(precision, int) and isinstance(scale, int) and 0 < precision:
+            types.append(pa.decimal128(min(precision, 38), scale))
+        else:
+            types.append(None)
+    return types
+
+
+def _rows_to_batch(rows: List[Any], columns: List[str], types: Optional[List[Optional[pa.DataType]]] = None) -> pa.RecordBatch:
+    # Transpose one DBAPI chunk into columns; the chunk's row tuples are dropped right after.
+    cols = list(zip(*rows)) if rows else [()] * len(columns)
+    types = types or [None] * len(columns)
+    return pa.RecordBatch.from_arrays([pa.array(list(c), type=t) for c, t in zip(cols, types)], names=columns)
+
+
+def iter_record_batches(result: Any, *, chunk_size: int, meta: Dict[str, Any]) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a SQLAlchemy CursorResult as Arrow record batches of <= chunk_size rows,
+    reading from the DBAPI cursor (no SQLAlchemy Row objects). Records the path in meta.
+    """
+    columns = [str(c) for c in result.keys()]
+    meta["columns"] = columns
+    cursor = result.cursor
+    reader = _native_reader(cursor, chunk_size)
+    if reader is not None:
+        meta["fetch_path"] = "arrow_native"
+        for batch in reader:
+            yield batch
+        return
+
+    meta["fetch_path"] = "dbapi_chunks"
+    types = _description_types(cursor)
+    if len(types) != len(columns):
+        types = None
+    while True:
+        rows = cursor.fetchmany(int(chunk_size))
+        if not rows:
+            return
+        yield _rows_to_batch(rows, columns, types)
+
+
+def iter_capped_batches(
+    result: Any,
+    *,
+    chunk_size: int,
+    max_rows: int,
+    max_bytes: Optional[int],
+    meta: Dict[str, Any],
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    iter_record_batches() with a row cap and an optional byte cap (None = unbounded, for
+    consumers that stream to disk). Fetching stops as soon as a cap is hit. Fills meta with
+    chunks, rows, bytes, fetch_path and truncated_by ("rows" | "bytes" | None).
+    A cancelled `cancel` token raises QueryCancelled at the next chunk boundary.
+    """
+    meta.update({"chunks": 0, "rows": 0, "bytes": 0, "truncated_by": None})
+    for batch in iter_record_batches(result, chunk_size=chunk_size, meta=meta):
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        if meta["rows"] + batch.num_rows > max_rows:
+            # Like fetchmany(max_rows + 1): seeing a row past the cap means the result was cut.
+            batch = batch.slice(0, max_rows - meta["rows"])
+            meta["truncated_by"] = "rows"
+        if batch.num_rows:
+            meta["chunks"] += 1
+            meta["rows"] += batch.num_rows
+            meta["bytes"] += batch.nbytes
+            yield batch
+        if meta["truncated_by"]:
+            return
+        if max_bytes is not None and meta["bytes"] > max_bytes:
+            meta["truncated_by"] = "bytes"
+            return
+
+
+def unify_schema(batches: List[pa.RecordBatch]) -> pa.Schema:
+    # Chunks infer types independently (an all-NULL chunk is `null`, an int64 chunk of a
+    # mostly-REAL SQLite column, decimals with per-chunk precision); widen to one schema.
+    return pa.unify_schemas([b.schema for b in batches], promote_options="permissive")
+
+
+def widen_for_stream(schema: pa.Schema) -> pa.Schema:
+    """
+    Schema for a writer fixed before all chunks are seen: decimals get full precision so later
+    chunks with more integer digits still fit; all-NULL columns become strings.
+    """
+    fields = []
+    for f in schema:
+        if pa.types.is_null(f.type):
+            f = f.with_type(pa.string())
+        elif pa.types.is_decimal128(f.type):
+            f = f.with_type(pa.decimal128(38, f.type.scale))
+        fields.append(f)
+    return pa.schema(fields)
+
+
+def conform_batch(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    if batch.schema.equals(schema):
+        return batch
+    return pa.Table.from_batches([batch]).cast(schema).combine_chunks().to_batches()[0]
+
+
+def timed_batches(batches: Iterator[pa.RecordBatch], timer: PhaseTimer) -> Iterator[pa.RecordBatch]:
+    """
+    Time spent waiting on `batches`: the first pull goes to phase "first_row", the others to
+    "fetch". Phases the source records itself while being pulled (pool_checkout, execute for a
+    lazily executed stream) are not counted twice.
+    """
+    it = iter(batches)
+    name = "first_row"
+    while True:
+        t0, inner = time.perf_counter(), timer.total()
+        try:
+            batch = next(it)
+        except StopIteration:
+            timer.add(name, time.perf_counter() - t0 - (timer.total() - inner))
+            return
+        timer.add(name, time.perf_counter() - t0 - (timer.total() - inner))
+        name = "fetch"
+        yield batch
+
+
+def fetch_arrow(
+    result: Any,
+    *,
+    chunk_size: int,
+    max_rows: int,
+    max_bytes: Optional[int],
+    cancel: Optional[CancelToken] = None,
+    on_first_batch: Optional[Callable[[pa.RecordBatch], None]] = None,
+    timer: Optional[PhaseTimer] = None,
+) -> Tuple[pa.Table, Dict[str, Any]]:
+    """
+    Read the capped result into one Arrow Table. Returns (table, fetch_meta).
+    on_first_batch is called with the first chunk as soon as it arrives (progressive preview).
+    `timer` gets the "first_row" and "fetch" phases (building the table counts as fetch).
+    """
+    timer = timer or PhaseTimer()
+    meta: Dict[str, Any] = {}
+    batches: List[pa.RecordBatch] = []
+    capped = iter_capped_batches(result, chunk_size=chunk_size, max_rows=max_rows, max_bytes=max_bytes, meta=meta, cancel=cancel)
+    for batch in timed_batches(capped, timer):
+        if not batches and on_first_batch is not None:
+            on_first_batch(batch)
+        batches.append(batch)
+    with timer.phase("fetch"):
+        if batches:
+            schema = unify_schema(batches)
+            table = pa.Table.from_batches([conform_batch(b, schema) for b in batches], schema=schema)
+        else:
+            table = pa.table({str(c): pa.array([], type=pa.null()) for c in result.keys()})
+    return table, meta
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import threading
+
+
+class QueryCancelled(RuntimeError):
+    """Raised inside a query's fetch loop once its CancelToken has been cancelled."""
+
+
+class QueryTimeoutError(TimeoutError):
+    """The query ran past its execution deadline and was cancelled by the watchdog."""
+
+    def __init__(self, message: str, meta: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.meta: Dict[str, Any] = dict(meta or {})
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one in-flight query. The fetch loop checks it between
+    chunks; callbacks (e.g. a driver-level cursor interrupt) run once, on cancel().
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def add_callback(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register fn; runs immediately if already cancelled. Returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+
+                def remove() -> None:
+                    with self._lock:
+                        if fn in self._callbacks:
+                            self._callbacks.remove(fn)
+
+                return remove
+        fn()
+        return lambda: None
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise QueryCancelled(f"Query cancelled ({self.reason}).")
+
+
+@contextmanager
+def watchdog(token: CancelToken, seconds: Optional[float]) -> Iterator[None]:
+    """Cancel `token` with reason "timeout" if the block is still running after `seconds`."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    timer = threading.Timer(float(seconds), token.cancel, args=("timeout",))
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+
+
+def interrupt_dbapi(cursor: Any, dbapi_connection: Any) -> None:
+    """
+    Driver-level cancel of the statement running on another thread:
+    pyodbc -> cursor.cancel() (SQLCancel), sqlite3 / duckdb -> connection.interrupt().
+    """
+    cancel = getattr(cursor, "cancel", None) if cursor is not None else None
+    if callable(cancel):
+        cancel()
+        return
+    interrupt = getattr(dbapi_connection, "interrupt", None)
+    if callable(interrupt):
+        interrupt()
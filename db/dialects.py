@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import re
+
+
+DATE_GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+
+class SQLDialect(ABC):
+    """
+    Everything engine-specific the pipeline needs to emit or inspect SQL:
+    identifier quoting, row limits, date bucketing, sampling, approximate
+    aggregates and catalog introspection queries.
+
+    Catalog queries use SQLAlchemy named params (:schema, :table) and must
+    return the column names db.introspect expects. Subclasses must implement
+    date_bucket and the catalog queries; the rest have ANSI defaults.
+    """
+
+    name = "generic"
+    supports_grouping_sets = True
+    supports_tablesample = True
+    supports_approx_count_distinct = True
+    # Column-oriented storage (zone maps / segment elimination) makes unindexed scans cheap.
+    columnar_storage = False
+    # Comparison operators whose string matching ignores case under the default collation.
+    case_insensitive_ops: frozenset = frozenset()
+
+    # ---- identifiers ----
+    def quote_ident(self, name: str) -> str:
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def table_ref(self, schema: str, table: str) -> str:
+        return f"{self.quote_ident(schema)}.{self.quote_ident(table)}"
+
+    def alias_pattern(self) -> str:
+        # Regex matching the quoted alias at the end of "expr AS <alias>"; group 1 = alias.
+        return r'\s+AS\s+"((?:[^"]|"")+)"\s*$'
+
+    # ---- row limits ----
+    def limit_prefix(self, n: int) -> str:
+        return ""
+
+    def limit_suffix(self, n: int) -> str:
+        return f"LIMIT {int(n)}"
+
+    def has_row_limit(self, sql: str) -> bool:
+        lowered = sql.lower()
+        has_top = re.search(r"\bselect\b\s+(distinct\s+)?top\s*\(", lowered) or re.search(
+            r"\bselect\b\s+(distinct\s+)?top\s+\d+", lowered
+        )
+        has_offset_fetch = "offset" in lowered and "fetch" in lowered
+        has_limit = re.search(r"\blimit\b\s+\d+", lowered)
+        return bool(has_top or has_offset_fetch or has_limit)
+
+    def apply_row_limit(self, sql: str, n: int) -> str:
+        body = sql.rstrip().rstrip(";").rstrip()
+        return f"{body}\n{self.limit_suffix(n)}"
+
+    # ---- expressions ----
+    @abstractmethod
+    def date_bucket(self, expr: str, granularity: str) -> Optional[str]:
+        ...
+
+    def tablesample(self, rate_pct: float) -> str:
+        return f"TABLESAMPLE SYSTEM ({rate_pct} PERCENT)"
+
+    def approx_count_distinct(self, expr: str) -> str:
+        return f"APPROX_COUNT_DISTINCT({expr})"
+
+    def grouping_id(self, exprs: List[str]) -> str:
+        return f"GROUPING_ID({', '.join(exprs)})"
+
+    # ---- catalog ----
+    @abstractmethod
+    def tables_sql(self) -> str:
+        ...
+
+    @abstractmethod
+    def columns_sql(self) -> str:
+        ...
+
+    @abstractmethod
+    def row_count_sql(self, schema: str, table: str) -> str:
+        ...
+
+    @abstractmethod
+    def primary_key_sql(self) -> str:
+        ...
+
+    @abstractmethod
+    def foreign_keys_sql(self) -> str:
+        ...
+
+    def indexes_sql(self) -> Optional[str]:
+        # Rows: index_name, column_name, key_ordinal, is_unique, is_primary_key, index_type.
+        return None
+
+    def partitioning_sql(self) -> Optional[str]:
+        # Rows: partition_column, partition_scheme, partitions.
+        return None
+
+    # ---- change signals (cache.freshness) ----
+    def change_signal_sql(self, schema: str, table: str) -> str:
+        # One row whose values change when the table's data does; compared between polls.
+        # Row counts miss in-place updates: dialects override with something finer where cheap.
+        return f"SELECT COUNT(1) AS row_count FROM {self.table_ref(schema, table)}"
+
+    def change_version_sql(self, schema: str, table: str) -> Optional[str]:
+        # Row: change_version, from the engine's change tracking; fails when the table is not tracked.
+        return None
+
+    def sample_sql(self, schema: str, table: str, columns: List[str], top_n: int) -> str:
+        col_list = ", ".join([self.quote_ident(c) for c in columns])
+        prefix = self.limit_prefix(top_n)
+        sql = f"SELECT {prefix}{col_list} FROM {self.table_ref(schema, table)}"
+        suffix = self.limit_suffix(top_n)
+        return f"{sql} {suffix}" if suffix else sql
+
+
+class SQLServerDialect(SQLDialect):
+    name = "mssql"
+    # Default collations are *_CI_AS.
+    case_insensitive_ops = frozenset({"=", "!=", "<>", ">", ">=", "<", "<=", "like", "in"})
+
+    def quote_ident(self, name: str) -> str:
+        return "[" + str(name).replace("]", "]]") + "]"
+
+    def alias_pattern(self) -> str:
+        return r"\s+AS\s+\[((?:[^\]]|\]\])+)\]\s*$"
+
+    def limit_prefix(self, n: int) -> str:
+        return f"TOP ({int(n)}) "
+
+    def limit_suffix(self, n: int) -> str:
+        return ""
+
+    def apply_row_limit(self, sql: str, n: int) -> str:
+        # Insert TOP (n) after SELECT or SELECT DISTINCT
+        def repl(m: re.Match) -> str:
+            return f"{m.group(0)} TOP ({int(n)}) "
+
+        return re.sub(r"\bSELECT\s+(DISTINCT\s+)?", repl, sql, flags=re.IGNORECASE, count=1)
+
+    def date_bucket(self, expr: str, granularity: str) -> Optional[str]:
+        g = (granularity or "").lower().strip()
+        if g == "day":
+            return f"CAST({expr} AS date)"
+        if g == "week":
+            # DATEDIFF(week) counts Sunday boundaries but day 0 (1900-01-01) is a Monday: shift
+            # by a day so weeks start on Monday, like DuckDB's date_trunc('week').
+            return f"DATEADD(week, DATEDIFF(week, 0, DATEADD(day, -1, {expr})), 0)"
+        if g in ("month", "quarter", "year"):
+            # DATEADD/DATEDIFF from day 0 works on every SQL Server version (DATETRUNC is 2022+).
+            return f"DATEADD({g}, DATEDIFF({g}, 0, {expr}), 0)"
+        return None
+
+    def tables_sql(self) -> str:
+        return """
+    SELECT
+        s.name AS schema_name,
+        t.name AS table_name
+    FROM sys.tables t
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE t.is_ms_shipped = 0
+    ORDER BY s.name, t.name
+    """
+
+    def columns_sql(self) -> str:
+        return """
+    SELECT
+        c.name AS column_name,
+        ty.name AS data_type,
+        c.max_length,
+        c.precision,
+        c.scale,
+        c.is_nullable
+    FROM sys.columns c
+    JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+    JOIN sys.tables t ON c.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE s.name = :schema AND t.name = :table
+    ORDER BY c.column_id
+    """
+
+    def row_count_sql(self, schema: str, table: str) -> str:
+        # Approx row count from sys.dm_db_partition_stats (faster than COUNT(*))
+        return """
+    SELECT SUM(ps.row_count) AS row_count
+    FROM sys.dm_db_partition_stats ps
+    JOIN sys.tables t ON ps.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE s.name = :schema AND t.name = :table
+      AND ps.index_id IN (0,1)
+    """
+
+    def primary_key_sql(self) -> str:
+        return """
+    SELECT c.name AS column_name
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+    JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+    JOIN sys.tables t ON i.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE i.is_primary_key = 1 AND s.name = :schema AND t.name = :table
+    ORDER BY ic.key_ordinal
+    """
+
+    def foreign_keys_sql(self) -> str:
+        return """
+    SELECT
+      cpa.name AS parent_column,
+      s2.name AS ref_schema,
+      t2.name AS ref_table,
+      cr.name AS ref_column
+    FROM sys.foreign_key_columns fkc
+    JOIN sys.tables t1 ON fkc.parent_object_id = t1.object_id
+    JOIN sys.schemas s1 ON t1.schema_id = s1.schema_id
+    JOIN sys.columns cpa ON fkc.parent_object_id = cpa.object_id AND fkc.parent_column_id = cpa.column_id
+    JOIN sys.tables t2 ON fkc.referenced_object_id = t2.object_id
+    JOIN sys.schemas s2 ON t2.schema_id = s2.schema_id
+    JOIN sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
+    WHERE s1.name = :schema AND t1.name = :table
+    """
+
+    def indexes_sql(self) -> Optional[str]:
+        # Columnstore indexes list their columns with key_ordinal 0; included columns are not keys.
+        return """
+    SELECT
+      i.name AS index_name,
+      c.name AS column_name,
+      ic.key_ordinal AS key_ordinal,
+      CAST(i.is_unique AS int) AS is_unique,
+      CAST(i.is_primary_key AS int) AS is_primary_key,
+      i.type_desc AS index_type
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+    JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+    JOIN sys.tables t ON i.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE s.name = :schema AND t.name = :table
+      AND i.is_hypothetical = 0 AND i.is_disabled = 0
+      AND ic.is_included_column = 0
+    ORDER BY i.index_id, ic.key_ordinal
+    """
+
+    def partitioning_sql(self) -> Optional[str]:
+        return """
+    SELECT TOP 1
+      c.name AS partition_column,
+      ps.name AS partition_scheme,
+      pf.fanout AS partitions
+    FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON i.data_space_id = ps.data_space_id
+    JOIN sys.partition_functions pf ON ps.function_id = pf.function_id
+    JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id AND ic.partition_ordinal > 0
+    JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+    JOIN sys.tables t ON i.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE s.name = :schema AND t.name = :table AND i.index_id IN (0,1)
+    """
+
+    def change_signal_sql(self, schema: str, table: str) -> str:
+        # Partition stats row counts plus the last write seen by the index usage DMV
+        # (reset on restart, which only costs one spurious refresh).
+        return """
+    SELECT
+      (SELECT SUM(ps.row_count) FROM sys.dm_db_partition_stats ps
+       WHERE ps.object_id = OBJECT_ID(QUOTENAME(:schema) + '.' + QUOTENAME(:table)) AND ps.index_id IN (0,1)) AS row_count,
+      (SELECT MAX(us.last_user_update) FROM sys.dm_db_index_usage_stats us
+       WHERE us.database_id = DB_ID() AND us.object_id = OBJECT_ID(QUOTENAME(:schema) + '.' + QUOTENAME(:table))) AS last_user_update
+    """
+
+    def change_version_sql(self, schema: str, table: str) -> Optional[str]:
+        return f"SELECT MAX(ct.SYS_CHANGE_VERSION) AS change_version FROM CHANGETABLE(CHANGES {self.table_ref(schema, table)}, NULL) AS ct"
+
+
+class DuckDBDialect(SQLDialect):
+    name = "duckdb"
+    columnar_storage = True
+
+    def date_bucket(self, expr: str, granularity: str) -> Optional[str]:
+        g = (granularity or "").lower().strip()
+        if g in DATE_GRANULARITIES:
+            return f"date_trunc('{g}', {expr})"
+        return None
+
+    def tablesample(self, rate_pct: float) -> str:
+        return f"TABLESAMPLE {rate_pct} PERCENT (system)"
+
+    def approx_count_distinct(self, expr: str) -> str:
+        return f"approx_count_distinct({expr})"
+
+    def tables_sql(self) -> str:
+        return """
+    SELECT table_schema AS schema_name, table_name
+    FROM information_schema.tables
+    WHERE table_type = 'BASE TABLE'
+      AND table_schema NOT IN ('information_schema', 'pg_catalog')
+    ORDER BY table_schema, table_name
+    """
+
+    def columns_sql(self) -> str:
+        return """
+    SELECT
+        column_name,
+        data_type,
+        character_maximum_length AS max_length,
+        numeric_precision AS precision,
+        numeric_scale AS scale,
+        CASE WHEN is_nullable = 'YES' THEN 1 ELSE 0 END AS is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = :schema AND table_name = :table
+    ORDER BY ordinal_position
+    """
+
+    def row_count_sql(self, schema: str, table: str) -> str:
+        # estimated_size is maintained by DuckDB; no scan needed.
+        return """
+    SELECT estimated_size AS row_count
+    FROM duckdb_tables()
+    WHERE schema_name = :schema AND table_name = :table
+    """
+
+    def primary_key_sql(self) -> str:
+        return """
+    SELECT UNNEST(constraint_column_names) AS column_name
+    FROM duckdb_constraints()
+    WHERE constraint_type = 'PRIMARY KEY' AND schema_name = :schema AND table_name = :table
+    """
+
+    def foreign_keys_sql(self) -> str:
+        return """
+    SELECT
+      UNNEST(constraint_column_names) AS parent_column,
+      schema_name AS ref_schema,
+      referenced_table AS ref_table,
+      UNNEST(referenced_column_names) AS ref_column
+    FROM duckdb_constraints()
+    WHERE constraint_type = 'FOREIGN KEY' AND schema_name = :schema AND table_name = :table
+    """
+
+    def indexes_sql(self) -> Optional[str]:
+        # ART indexes; `expressions` is a printed list like "[a, b]". PK/UNIQUE constraints
+        # are indexed implicitly and come through primary_key_sql.
+        return """
+    SELECT
+      index_name,
+      trim(UNNEST(string_split(trim(expressions, '[]'), ', ')), '"') AS column_name,
+      UNNEST(range(1, len(string_split(trim(expressions, '[]'), ', ')) + 1)) AS key_ordinal,
+      CAST(is_unique AS INTEGER) AS is_unique,
+      CAST(is_primary AS INTEGER) AS is_primary_key,
+      'ART' AS index_type
+    FROM duckdb_indexes()
+    WHERE schema_name = :schema AND table_name = :table
+    """
+
+
+class SQLiteDialect(SQLDialect):
+    """SQLite has one schema per attached file; we expose it as 'main'."""
+
+    name = "sqlite"
+    # LIKE folds ASCII case; "=" is binary.
+    case_insensitive_ops = frozenset({"like"})
+    supports_grouping_sets = False
+    supports_tablesample = False
+    supports_approx_count_distinct = False
+
+    def table_ref(self, schema: str, table: str) -> str:
+        return f"{self.quote_ident(schema or 'main')}.{self.quote_ident(table)}"
+
+    def date_bucket(self, expr: str, granularity: str) -> Optional[str]:
+        g = (granularity or "").lower().strip()
+        if g == "day":
+            return f"date({expr})"
+        if g == "week":
+            return f"date({expr}, 'weekday 0', '-6 days')"
+        if g == "month":
+            return f"strftime('%Y-%m-01', {expr})"
+        if g == "quarter":
+            return (
+                f"printf('%04d-%02d-01', CAST(strftime('%Y', {expr}) AS INTEGER), "
+                f"((CAST(strftime('%m', {expr}) AS INTEGER) - 1) / 3) * 3 + 1)"
+            )
+        if g == "year":
+            return f"strftime('%Y-01-01', {expr})"
+        return None
+
+    def tablesample(self, rate_pct: float) -> str:
+        return ""
+
+    def approx_count_distinct(self, expr: str) -> str:
+        return f"COUNT(DISTINCT {expr})"
+
+    def tables_sql(self) -> str:
+        return """
+    SELECT 'main' AS schema_name, name AS table_name
+    FROM sqlite_master
+    WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+    ORDER BY name
+    """
+
+    def columns_sql(self) -> str:
+        return """
+    SELECT
+        name AS column_name,
+        type AS data_type,
+        NULL AS max_length,
+        NULL AS precision,
+        NULL AS scale,
+        CASE WHEN "notnull" = 1 THEN 0 ELSE 1 END AS is_nullable
+    FROM pragma_table_info(:table)
+    ORDER BY cid
+    """
+
+    def row_count_sql(self, schema: str, table: str) -> str:
+        # No catalog statistics in SQLite; tables here are local and small enough to count.
+        return f"SELECT COUNT(1) AS row_count FROM {self.table_ref(schema, table)}"
+
+    def change_signal_sql(self, schema: str, table: str) -> str:
+        # Appends move MAX(rowid) even when deletes keep the count level.
+        return f"SELECT COUNT(1) AS row_count, MAX(rowid) AS max_rowid FROM {self.table_ref(schema, table)}"
+
+    def primary_key_sql(self) -> str:
+        return """
+    SELECT name AS column_name
+    FROM pragma_table_info(:table)
+    WHERE pk > 0
+    ORDER BY pk
+    """
+
+    def foreign_keys_sql(self) -> str:
+        return """
+    SELECT
+      "from" AS parent_column,
+      'main' AS ref_schema,
+      "table" AS ref_table,
+      "to" AS ref_column
+    FROM pragma_foreign_key_list(:table)
+    """
+
+    def indexes_sql(self) -> Optional[str]:
+        return """
+    SELECT
+      il.name AS index_name,
+      ii.name AS column_name,
+      ii.seqno + 1 AS key_ordinal,
+      il."unique" AS is_unique,
+      CASE WHEN il.origin = 'pk' THEN 1 ELSE 0 END AS is_primary_key,
+      'BTREE' AS index_type
+    FROM pragma_index_list(:table) il
+    JOIN pragma_index_info(il.name) ii
+    ORDER BY il.name, ii.seqno
+    """
+
+
+_DIALECTS: Dict[str, SQLDialect] = {
+    "mssql": SQLServerDialect(),
+    "duckdb": DuckDBDialect(),
+    "sqlite": SQLiteDialect(),
+}
+
+
+def get_dialect(name: Any) -> SQLDialect:
+    """
+    Resolve a dialect from a SQLAlchemy URL prefix ("mssql+pyodbc", "sqlite", "duckdb"),
+    an Engine (engine.dialect.name) or a Settings object (DB_DIALECT).
+    """
+    if hasattr(name, "DB_DIALECT"):
+        name = name.DB_DIALECT
+    elif hasattr(name, "dialect") and hasattr(name.dialect, "name"):
+        name = name.dialect.name
+    key = str(name or "").lower().split("+", 1)[0].strip()
+    if key not in _DIALECTS:
+        raise ValueError(f"Unsupported SQL dialect: {name!r} (expected one of {sorted(_DIALECTS)})")
+    return _DIALECTS[key]
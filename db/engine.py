@@ -1,7 +1,13 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
+from typing import Any, Dict, List, Tuple
+import atexit
+import threading
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
 from urllib.parse import quote_plus
 
 from config import Settings
@@ -30,14 +36,194 @@ def build_mssql_connection_url(settings: Settings) -> str:
     return f"{settings.DB_DIALECT}:///?odbc_connect={quote_plus(odbc)}"
 
 
+def build_connection_url(settings: Settings) -> str:
+    """
+    SQL Server (default) goes through ODBC. File-based engines (DB_DIALECT=duckdb|sqlite)
+    use DB_NAME as the database file path, e.g. a local DuckDB warehouse.
+    """
+    dialect = (settings.DB_DIALECT or "").lower()
+    if dialect.startswith("duckdb") or dialect.startswith("sqlite"):
+        return f"{settings.DB_DIALECT}:///{settings.DB_NAME}"
+    return build_mssql_connection_url(settings)
+
+
+# Pool counters are bumped from pool events on every worker thread.
+_METRICS_LOCK = threading.Lock()
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that counts checkouts that had to wait because every connection (pool_size +
+    max_overflow) was in use, and how long they waited: the signal that the pool is too small.
+    """
+
+    metrics: Dict[str, Any]
+
+    def _do_get(self):
+        exhausted = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if exhausted:
+                waited = time.perf_counter() - t0
+                with _METRICS_LOCK:
+                    m = self.metrics
+                    m["waits"] += 1
+                    m["wait_seconds_total"] += waited
+                    m["wait_seconds_max"] = max(m["wait_seconds_max"], waited)
+
+
+def _new_metrics(label: str) -> Dict[str, Any]:
+    return {
+        "label": label,
+        "checkouts": 0,
+        "checkins": 0,
+        "checked_out": 0,
+        "connects": 0,
+        "connect_seconds_total": 0.0,
+        "connect_seconds_max": 0.0,
+        "waits": 0,
+        "wait_seconds_total": 0.0,
+        "wait_seconds_max": 0.0,
+        "invalidations": 0,
+    }
+
+
+def _engine_label(settings: Settings) -> str:
+    # Never the URL itself: it can carry credentials.
+    dialect = (settings.DB_DIALECT or "").lower()
+    if dialect.startswith("duckdb") or dialect.startswith("sqlite"):
+        return f"{settings.DB_DIALECT}:{settings.DB_NAME}"
+    return f"{settings.DB_DIALECT}://{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+
+def _instrument(engine: Engine, metrics: Dict[str, Any]) -> None:
+    local = threading.local()
+
+    @event.listens_for(engine, "do_connect")
+    def _before_connect(dialect, conn_rec, cargs, cparams):
+        local.t0 = time.perf_counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _track_cursor(conn, cursor, statement, parameters, context, executemany):
+        # The query watchdog (db._execute) cancels this cursor from another thread.
+        conn.info["inflight_cursor"] = cursor
+
+    @event.listens_for(engine.pool, "connect")
+    def _on_connect(dbapi_conn, conn_rec):
+        elapsed = time.perf_counter() - getattr(local, "t0", time.perf_counter())
+        with _METRICS_LOCK:
+            metrics["connects"] += 1
+            metrics["connect_seconds_total"] += elapsed
+            metrics["connect_seconds_max"] = max(metrics["connect_seconds_max"], elapsed)
+
+    @event.listens_for(engine.pool, "checkout")
+    def _on_checkout(dbapi_conn, conn_rec, conn_proxy):
+        with _METRICS_LOCK:
+            metrics["checkouts"] += 1
+            metrics["checked_out"] += 1
+
+    @event.listens_for(engine.pool, "checkin")
+    def _on_checkin(dbapi_conn, conn_rec):
+        with _METRICS_LOCK:
+            metrics["checkins"] += 1
+            metrics["checked_out"] = max(0, metrics["checked_out"] - 1)
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _on_invalidate(dbapi_conn, conn_rec, exc):
+        with _METRICS_LOCK:
+            metrics["invalidations"] += 1
+
+
 def build_engine(settings: Settings) -> Engine:
-    url = build_mssql_connection_url(settings)
-    # pool_pre_ping for reliability
-    engine = create_engine(
-        url,
-        pool_pre_ping=True,
-        future=True,
-    )
+    """
+    New pooled engine for `settings`. Prefer get_engine(), which shares one engine per
+    connection target across the process.
+    """
+    url = build_connection_url(settings)
+    pool_kwargs: Dict[str, Any] = {
+        "pool_pre_ping": bool(getattr(settings, "DB_POOL_PRE_PING", True)),
+        "pool_recycle": int(getattr(settings, "DB_POOL_RECYCLE_SECONDS", 1800)),
+    }
+    if ":memory:" not in url:
+        # In-memory SQLite/DuckDB keep their default single-connection pools.
+        pool_kwargs.update(
+            poolclass=MeteredQueuePool,
+            pool_size=int(getattr(settings, "DB_POOL_SIZE", 5)),
+            max_overflow=int(getattr(settings, "DB_POOL_MAX_OVERFLOW", 10)),
+            pool_timeout=int(getattr(settings, "DB_POOL_TIMEOUT_SECONDS", 30)),
+        )
+    engine = create_engine(url, future=True, **pool_kwargs)
+    metrics = _new_metrics(_engine_label(settings))
+    engine.pool.metrics = metrics  # type: ignore[attr-defined]
+    _instrument(engine, metrics)
     # never log url directly
     _ = redact_connection_string(url)
     return engine
+
+
+# ---------------------------------------------------------------------------
+# Process-wide engine registry
+# ---------------------------------------------------------------------------
+
+_REGISTRY: Dict[Tuple[str, int, int, int, bool], Engine] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _registry_key(settings: Settings) -> Tuple[str, int, int, int, bool]:
+    return (
+        build_connection_url(settings),
+        int(getattr(settings, "DB_POOL_SIZE", 5)),
+        int(getattr(settings, "DB_POOL_MAX_OVERFLOW", 10)),
+        int(getattr(settings, "DB_POOL_RECYCLE_SECONDS", 1800)),
+        bool(getattr(settings, "DB_POOL_PRE_PING", True)),
+    )
+
+
+def get_engine(settings: Settings) -> Engine:
+    """
+    The one engine for this connection target and pool configuration. Agents, the executor
+    and Streamlit reruns all share it, so connections are set up once per process.
+    """
+    key = _registry_key(settings)
+    engine = _REGISTRY.get(key)
+    if engine is not None:
+        return engine
+    with _REGISTRY_LOCK:
+        engine = _REGISTRY.get(key)
+        if engine is None:
+            engine = build_engine(settings)
+            _REGISTRY[key] = engine
+    return engine
+
+
+def pool_metrics() -> List[Dict[str, Any]]:
+    """Snapshot of per-pool counters (checkouts, waits, connect time) for every registered engine."""
+    out = []
+    for engine in list(_REGISTRY.values()):
+        with _METRICS_LOCK:
+            m = dict(getattr(engine.pool, "metrics", {}) or {})
+        m["status"] = engine.pool.status()
+        for k in ("size", "overflow", "checkedout"):
+            fn = getattr(engine.pool, k, None)
+            if callable(fn):
+                m[f"pool_{k}"] = fn()
+        out.append(m)
+    return out
+
+
+def dispose_engines() -> int:
+    """Close every pooled connection and forget the engines (also run at interpreter exit)."""
+    with _REGISTRY_LOCK:
+        engines = list(_REGISTRY.values())
+        _REGISTRY.clear()
+    for engine in engines:
+        try:
+            engine.dispose()
+        except Exception:
+            pass
+    return len(engines)
+
+
+atexit.register(dispose_engines)
@@ -8,6 +8,7 @@ from sqlparse.sql import TokenList
 from sqlparse.tokens import Keyword, DML, Whitespace, Comment
 
 from config import Settings
+from db.dialects import SQLDialect, get_dialect
 
 
 DISALLOWED_KEYWORDS = [
@@ -36,8 +37,9 @@ class SQLSafetyGuard:
     - enforce TOP / OFFSET-FETCH / LIMIT like behavior for exploratory queries
     """
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, dialect: Optional[SQLDialect] = None):
         self.settings = settings
+        self.dialect = dialect or get_dialect(settings)
 
     def validate(self, sql: str) -> Dict[str, Any]:
         raw = sql or ""
@@ -127,8 +129,9 @@ class SQLSafetyGuard:
 
     def _enforce_row_limit_if_missing(self, sql: str) -> str:
         """
-        For SQL Server, enforce TOP if missing.
-        We avoid changing queries that already have TOP or OFFSET-FETCH.
+        Enforce a row limit if missing, in the dialect's syntax
+        (TOP for SQL Server, trailing LIMIT for DuckDB/SQLite).
+        We avoid changing queries that already have TOP, OFFSET-FETCH or LIMIT.
         """
         max_rows = int(self.settings.MAX_RETURNED_ROWS)
 
@@ -136,19 +139,7 @@ class SQLSafetyGuard:
             # Still required by safety policy, but config might be wrong. Keep enforced anyway.
             max_rows = 200000
 
-        lowered = sql.lower()
-        has_top = re.search(r"\bselect\b\s+top\s*\(", lowered) or re.search(r"\bselect\b\s+top\s+\d+", lowered)
-        has_offset_fetch = "offset" in lowered and "fetch" in lowered
-        has_limit = re.search(r"\blimit\b\s+\d+", lowered)
-
-        if has_top or has_offset_fetch or has_limit:
+        if self.dialect.has_row_limit(sql):
             return sql
 
-        # Insert TOP (max_rows) after SELECT or SELECT DISTINCT
-        def repl(m: re.Match) -> str:
-            sel = m.group(0)
-            return f"{sel} TOP ({max_rows}) "
-
-        # match "SELECT " or "SELECT DISTINCT "
-        out = re.sub(r"\bSELECT\s+(DISTINCT\s+)?", repl, sql, flags=re.IGNORECASE, count=1)
-        return out
+        return self.dialect.apply_row_limit(sql, max_rows)
@@ -28,3 +28,28 @@ class QueryLogStore:
             except Exception:
                 continue
         return out
+
+
+def phase_breakdown(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One flat row per logged execution with its exec_meta["profile"]: the phase seconds as
+    columns next to bytes transferred and memory peaks (for tables and charts).
+    """
+    out = []
+    for r in rows:
+        profile = r.get("profile") or {}
+        if not profile:
+            continue
+        row: Dict[str, Any] = {
+            "ts": r.get("ts"),
+            "cache_key": str(r.get("cache_key") or "")[:12],
+            "mode": r.get("mode"),
+            "seconds": r.get("seconds"),
+            "bytes_transferred": profile.get("bytes_transferred"),
+            "arrow_peak_bytes": profile.get("arrow_peak_bytes"),
+            "rss_peak_bytes": profile.get("rss_peak_bytes"),
+        }
+        for name, sec in (profile.get("phases") or {}).items():
+            row[f"phase:{name}"] = sec
+        out.append(row)
+    return out
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 import time
 import logging
 
+import pyarrow as pa
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
 log = logging.getLogger("timing")
 
 
@@ -15,3 +23,55 @@ def timed_block(name: str):
     finally:
         dt = time.time() - t0
         log.info(f"{name} took {dt:.4f}s")
+
+
+def _rss_peak_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux (bytes on macOS; close enough for a dashboard).
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+
+
+# Phases spent waiting on the source database (db.run_sql_query / stream_sql_query).
+DB_PHASES = ("pool_checkout", "execute", "first_row", "fetch")
+
+
+class PhaseTimer:
+    """
+    Per-execution phase breakdown (perf_counter seconds per named phase, accumulated).
+    Also samples Arrow's allocator at each phase end, so the report carries the peak Arrow
+    memory seen during this execution next to the process RSS high-water mark.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.arrow_peak_bytes = int(pa.total_allocated_bytes())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + max(0.0, float(seconds))
+        self.sample()
+
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def db_seconds(self) -> float:
+        return sum(self.phases.get(p, 0.0) for p in DB_PHASES)
+
+    def sample(self) -> None:
+        self.arrow_peak_bytes = max(self.arrow_peak_bytes, int(pa.total_allocated_bytes()))
+
+    def report(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            "arrow_peak_bytes": self.arrow_peak_bytes,
+            "rss_peak_bytes": _rss_peak_bytes(),
+            **extra,
+        }
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from config import settings
+from agents.insight_agent import InsightAgent
+from agents.sql_agent import SQLAgent
+from knowledge_graph.schema_registry import SchemaRegistry
+from utils.sampling import SAMPLE_ROWS_COLUMN, estimate_sampling_error
+
+
+def _registry(d: str, row_count: int) -> SchemaRegistry:
+    reg = {
+        "tables": {
+            "dbo.Events": {
+                "schema": "dbo",
+                "name": "Events",
+                "row_count": row_count,
+                "columns": [
+                    {"name": "Region", "type": "nvarchar", "nullable": True},
+                    {"name": "UserId", "type": "int", "nullable": False},
+                    {"name": "Amount", "type": "decimal", "nullable": True},
+                ],
+            }
+        }
+    }
+    Path(d, "schema_registry.json").write_text(json.dumps(reg), encoding="utf-8")
+    return SchemaRegistry(d)
+
+
+def test_approximate_mode_samples_and_scales():
+    with tempfile.TemporaryDirectory() as d:
+        agent = SQLAgent(settings, _registry(d, 1_000_000_000))
+        plan = {"tables": ["dbo.Events"], "dimensions": ["Region"], "metrics": [{"name": "Revenue", "agg": "sum", "field": "Amount"}]}
+        bundle = agent.generate_sql(plan, allowed_tables=[], large_mode=False, approximate=True)
+        sampling = bundle["sampling"]
+        assert "TABLESAMPLE SYSTEM (0.1 PERCENT)" in bundle["sql"]
+        assert "SUM(t0.[Amount]) * 1000.0" in bundle["sql"]
+        assert SAMPLE_ROWS_COLUMN in bundle["expected_columns"]
+        assert sampling["metrics"] == {"Revenue": "scaled"}
+
+        # Large mode always reads exact data.
+        exact = agent.generate_sql(dict(plan), allowed_tables=[], large_mode=True, approximate=True)
+        assert "TABLESAMPLE" not in exact["sql"] and exact["sampling"] is None
+
+
+def test_count_distinct_uses_approx_without_sampling():
+    with tempfile.TemporaryDirectory() as d:
+        agent = SQLAgent(settings, _registry(d, 1_000_000_000))
+        plan = {"tables": ["dbo.Events"], "metrics": [{"name": "Users", "agg": "count_distinct", "field": "UserId"}]}
+        bundle = agent.generate_sql(plan, allowed_tables=[], large_mode=False, approximate=True)
+        assert "APPROX_COUNT_DISTINCT(t0.[UserId])" in bundle["sql"]
+        assert "TABLESAMPLE" not in bundle["sql"]
+
+
+def test_error_estimate_and_kpi_labels():
+    sampling = {"approximate": True, "rate_pct": 1.0, "scale": 100.0, "table": "dbo.Events", "metrics": {"Revenue": "scaled"}}
+    df = pd.DataFrame({"Region": ["EU", "US"], "Revenue": [1000.0, 3000.0], SAMPLE_ROWS_COLUMN: [900, 100]})
+    approx = estimate_sampling_error(df, sampling)
+    assert approx["sample_rows"] == 1000
+    assert 0 < approx["relative_error_95"] < approx["worst_group_relative_error_95"]
+
+    plan = {"metrics": [{"name": "Revenue", "agg": "sum", "field": "Amount"}]}
+    insights = InsightAgent().generate(df=df, plan=plan, exec_meta={"approximate": approx})
+    revenue = [k for k in insights["kpis"] if k["title"] == "Revenue"][0]
+    assert revenue["value"].startswith("≈") and revenue["approximate"]
+    assert "approximate_result" in insights["warnings"]
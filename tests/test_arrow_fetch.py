@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pytest
+
+from config import Settings
+from cache.snapshot_cache import SnapshotCache
+from db import run_sql_query, run_sql_query_arrow
+from db.arrow_fetch import fetch_arrow, iter_capped_batches
+
+
+def _sqlite(d: str, **overrides) -> Settings:
+    path = str(Path(d, "w.db"))
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE t (id INTEGER, label TEXT)")
+    # First chunk has only NULL labels; later chunks bring strings.
+    con.executemany("INSERT INTO t VALUES (?, ?)", [(i, None if i < 3 else f"v{i}") for i in range(10)])
+    con.commit()
+    con.close()
+    return Settings(DB_DIALECT="sqlite", DB_NAME=path, FETCH_CHUNK_SIZE=3, **overrides)
+
+
+def test_chunked_fetch_promotes_types_and_caps_rows():
+    with tempfile.TemporaryDirectory() as d:
+        s = _sqlite(d)
+        df = run_sql_query(sql="SELECT id, label FROM t ORDER BY id", params={}, timeout_seconds=5, max_rows=7, settings=s)
+        assert len(df) == 7 and df["label"].iloc[5] == "v5" and pd.isna(df["label"].iloc[0])
+        fetch = df.attrs["fetch"]
+        assert fetch["fetch_path"] == "dbapi_chunks" and fetch["truncated_by"] == "rows" and fetch["chunks"] == 3
+
+        df = run_sql_query(sql="SELECT id FROM t", params={}, timeout_seconds=5, max_rows=10, settings=s)
+        assert len(df) == 10 and df.attrs["fetch"]["truncated_by"] is None
+
+
+def test_byte_cap_stops_fetch():
+    with tempfile.TemporaryDirectory() as d:
+        s = _sqlite(d, MAX_RESULT_BYTES=1)
+        table, fetch = run_sql_query_arrow(sql="SELECT id FROM t", params={}, timeout_seconds=5, max_rows=100, settings=s)
+        assert table.num_rows == 3 and fetch["truncated_by"] == "bytes"
+
+
+def test_duckdb_uses_native_arrow_batches():
+    pytest.importorskip("duckdb_engine")
+    with tempfile.TemporaryDirectory() as d:
+        path = str(Path(d, "w.duckdb"))
+        con = duckdb.connect(path)
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(5)")
+        con.close()
+        s = Settings(DB_DIALECT="duckdb", DB_NAME=path, FETCH_CHUNK_SIZE=2)
+        table, fetch = run_sql_query_arrow(sql="SELECT id FROM t", params={}, timeout_seconds=5, max_rows=4, settings=s)
+        assert fetch["fetch_path"] == "arrow_native"
+        assert table.column("id").to_pylist() == [0, 1, 2, 3] and fetch["truncated_by"] == "rows"
+
+
+class _FakeResult:
+    """A CursorResult over a pyodbc-like cursor that returns Decimal values."""
+
+    def __init__(self, rows, description):
+        self._rows = list(rows)
+        self.cursor = self
+        self.description = description
+
+    def keys(self):
+        return [d[0] for d in self.description]
+
+    def fetchmany(self, n):
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+
+ROWS = [(Decimal("1.25"), 1), (Decimal("2.50"), 2), (Decimal("12345.6"), 3.5), (Decimal("7"), 4)]
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        # pyodbc: (name, type_code, display_size, internal_size, precision, scale, null_ok)
+        [("amount", Decimal, None, 19, 19, 4, True), ("qty", float, None, 53, 53, 0, True)],
+        # No precision/scale reported: types are still widened across chunks.
+        [("amount", Decimal, None, None, None, None, True), ("qty", float, None, None, None, None, True)],
+    ],
+)
+def test_multi_chunk_decimals_are_unified(description):
+    table, fetch = fetch_arrow(_FakeResult(ROWS, description), chunk_size=2, max_rows=100, max_bytes=None)
+    assert fetch["chunks"] == 2
+    assert table.column("amount").to_pylist() == [r[0] for r in ROWS]
+    assert table.column("qty").to_pylist() == [1, 2, 3.5, 4]
+
+
+def test_streamed_snapshot_accepts_wider_decimals_in_later_chunks():
+    description = [("amount", Decimal, None, None, None, None, True), ("qty", float, None, None, None, None, True)]
+    with tempfile.TemporaryDirectory() as d:
+        cache = SnapshotCache(Path(d))
+        rows_in = [(a, i) for i, (a, _q) in enumerate(ROWS)]
+        batches = iter_capped_batches(_FakeResult(rows_in, description), chunk_size=2, max_rows=100, max_bytes=None, meta={})
+        _path, rows = cache.put_batches("k", batches)
+        assert rows == 4
+        assert cache.get("k")["amount"].tolist() == [r[0] for r in ROWS]
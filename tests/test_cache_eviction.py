@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from config import Settings
+from agents.executor import Executor
+from cache.eviction import CacheEvictor, plan_eviction
+
+
+def _settings(d: str, **kw) -> Settings:
+    db = str(Path(d, "w.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE t (k INTEGER, v REAL)")
+    con.executemany("INSERT INTO t VALUES (?, ?)", [(i, float(i)) for i in range(2000)])
+    con.commit()
+    con.close()
+    return Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, CACHE_EVICTION_INTERVAL_SECONDS=0,
+        CACHE_DIR=str(Path(d, "cache")), DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), **kw,
+    )
+
+
+def _entry(key, *, size=100, hits=0, last=0.0, cost=0.0, created=0.0):
+    return {"cache_key": key, "size_bytes": size, "hit_count": hits, "last_access_epoch": last, "fetch_seconds": cost, "created_epoch": created}
+
+
+def test_policies_rank_by_recency_frequency_age_and_cost():
+    entries = [_entry("old", last=100), _entry("new", last=5000), _entry("old_expensive", last=100, cost=30)]
+    victims = lambda policy, **kw: [e["cache_key"] for e in plan_eviction(entries, max_bytes=10**9, policy=policy, ttl_seconds=1000, now=6000, **kw)]
+    assert victims("lru", max_entries=2) == ["old"]
+    # 30s of fetch cost outweighs 4900s of recency.
+    assert victims("lru", max_entries=1) == ["old", "new"]
+
+    entries = [_entry("popular", hits=50), _entry("rare", hits=1), _entry("rare_expensive", hits=1, cost=100)]
+    assert [e["cache_key"] for e in plan_eviction(entries, max_bytes=250, max_entries=99, policy="lfu", ttl_seconds=0, now=0)] == ["rare"]
+
+    entries = [_entry("stale", created=0, last=9999), _entry("fresh", created=5500)]
+    assert [e["cache_key"] for e in plan_eviction(entries, max_bytes=10**9, max_entries=99, policy="ttl", ttl_seconds=1000, now=6000)] == ["stale"]
+
+
+def test_catalog_tracks_access_stats_and_eviction_keeps_the_frequently_hit_entry():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, CACHE_MAX_ENTRIES=2, CACHE_EVICTION_POLICY="lfu")
+        ex = Executor(settings=s)
+        queries = [f"SELECT k, v FROM t WHERE k < {n}" for n in (10, 20, 30)]
+        keys = [ex.run(sql=q, params={})[1]["cache_key"] for q in queries]
+        for _ in range(3):
+            assert ex.run(sql=queries[0], params={})[1]["cache_hit"]
+
+        stats = {e["cache_key"]: e for e in ex.cache.list_entries()}
+        assert stats[keys[0]]["hit_count"] == 3 and stats[keys[1]]["hit_count"] == 0
+        assert stats[keys[0]]["size_bytes"] > 0 and stats[keys[0]]["fetch_seconds"] is not None
+
+        report = CacheEvictor(s).run_once()
+        assert report["evicted"] == 1 and report["remaining_entries"] == 2
+        kept = {e["cache_key"] for e in ex.cache.list_entries()}
+        assert keys[0] in kept and len(kept) == 2
+        assert [ex.cache.path_for_key(k).exists() for k in keys].count(False) == 1
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from cache.eviction import CacheEvictor
+from cache.service import CacheService, cache_key_for
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+
+ORDERS = "SELECT id, amount FROM orders"
+REGIONS = "SELECT code, name FROM regions"
+
+
+def _setup(d: str, **kw) -> Settings:
+    db = str(Path(d, "src.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount REAL)")
+    con.execute("CREATE TABLE regions (code TEXT, name TEXT)")
+    con.executemany("INSERT INTO orders VALUES (?, ?)", [(i, float(i)) for i in range(1, 101)])
+    con.executemany("INSERT INTO regions VALUES (?, ?)", [("EU", "Europe"), ("US", "Americas")])
+    con.commit()
+    con.close()
+    s = Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, FRESHNESS_CHECK_INTERVAL_SECONDS=0, CACHE_EVICTION_INTERVAL_SECONDS=0,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+    s.ensure_dirs()
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+    return s
+
+
+def test_hits_credit_the_db_cost_recorded_with_the_snapshot():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d)
+        ex = Executor(settings=s)
+        ex.run(sql=ORDERS, params={}, question="What are our orders?")
+        entry = {r["cache_key"]: r for r in CacheService(s).catalog.cache_rows()}[cache_key_for(ORDERS, {})]
+        assert entry["db_seconds"] > 0 and entry["db_bytes"] > 0
+
+        for _ in range(2):
+            assert ex.run(sql=ORDERS, params={}, question="  What are   our orders? ")[1]["cache_hit"]
+        ex.run(sql=REGIONS, params={})
+
+        m = CacheService(s).metrics()
+        assert m["totals"]["hits"] == 2 and m["totals"]["misses"] == 2 and m["totals"]["hit_rate"] == 0.5
+        assert m["totals"]["db_seconds_saved"] == round(2 * entry["db_seconds"], 4)
+        assert m["totals"]["db_bytes_saved"] == 2 * entry["db_bytes"]
+        assert m["totals"]["bytes_served"] == 2 * entry["size_bytes"]
+        tables = {r["name"]: r for r in m["by_table"]}
+        assert tables["orders"]["hits"] == 2 and tables["regions"]["misses"] == 1
+        assert m["by_question"] == [{**m["by_question"][0], "name": "What are our orders?", "hits": 2, "misses": 1}]
+
+
+def test_evictions_are_counted_per_table():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d, CACHE_MAX_ENTRIES=1)
+        svc = CacheService(s)
+        svc.put(cache_key_for(ORDERS, {}), pd.DataFrame({"id": [1], "amount": [1.0]}), sql=ORDERS)
+        svc.put(cache_key_for(REGIONS, {}), pd.DataFrame({"code": ["EU"], "name": ["Europe"]}), sql=REGIONS)
+        assert CacheEvictor(s).run_once()["evicted"] == 1
+        m = svc.metrics()
+        assert m["totals"]["evictions"] == 1 and sum(r["evictions"] for r in m["by_table"]) == 1
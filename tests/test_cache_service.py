@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from config import Settings
+from cache.service import CacheService, cache_key_for, sql_fingerprint
+
+
+def _service(d: str) -> CacheService:
+    return CacheService(Settings(CACHE_DIR=str(Path(d, "cache")), DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb"))))
+
+
+def test_one_catalog_tracks_puts_reads_and_clears():
+    with tempfile.TemporaryDirectory() as d:
+        svc = _service(d)
+        sql = "SELECT k, v FROM t"
+        key = cache_key_for(sql, {})
+        svc.put(key, pd.DataFrame({"k": [1, 2], "v": [0.5, 1.5]}), sql=sql, spec={"tables": ["t"]}, fetch_seconds=2.0)
+        other = cache_key_for("SELECT 1", {})
+        svc.put(other, pd.DataFrame({"x": [1]}), sql="SELECT 1")
+
+        for _ in range(2):
+            df, _tier = svc.read(key)
+            assert list(df["k"]) == [1, 2]
+        assert svc.read(cache_key_for("SELECT 2", {})) is None
+
+        entries = {e["cache_key"]: e for e in svc.list_entries()}
+        e = entries[key]
+        assert e["hit_count"] == 2 and e["row_count"] == 2 and e["fetch_seconds"] == 2.0
+        assert e["sql_fingerprint"] == sql_fingerprint("select  k, v\nFROM t") and "t" in str(e["tables"])
+        assert e["size_bytes"] > 0
+        # A second service over the same directories sees the same catalog.
+        assert _service(d).stats()["entries"] == 2
+
+        assert svc.clear(key) == 1 and key not in {e["cache_key"] for e in svc.list_entries()}
+        assert svc.clear() == 1 and svc.list_entries() == [] and svc.stats()["entries"] == 0
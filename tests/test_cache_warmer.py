@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from cache.service import CacheService, cache_key_for
+from cache.warmer import CacheWarmer, current_window, parse_windows
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+from observability.query_log import QueryLogStore
+from traces.trace_store import TraceStore
+
+ORDERS = "SELECT SUM(amount) AS total FROM orders"
+REGIONS = "SELECT code, name FROM regions"
+
+
+def _setup(d: str, **kw) -> Settings:
+    db = str(Path(d, "src.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount REAL)")
+    con.execute("CREATE TABLE regions (code TEXT, name TEXT)")
+    con.executemany("INSERT INTO orders VALUES (?, ?)", [(i, float(i)) for i in range(1, 11)])
+    con.executemany("INSERT INTO regions VALUES (?, ?)", [("EU", "Europe"), ("US", "Americas")])
+    con.commit()
+    con.close()
+    s = Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, FRESHNESS_CHECK_INTERVAL_SECONDS=0, CACHE_EVICTION_INTERVAL_SECONDS=0,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+    s.ensure_dirs()
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+    return s
+
+
+def test_windows_wrap_midnight():
+    windows = parse_windows("02:00-06:00, 23:00-01:00")
+    assert current_window(datetime(2024, 3, 5, 3, 0), windows) == "2024-03-05 02:00-06:00"
+    assert current_window(datetime(2024, 3, 5, 0, 30), windows) == "2024-03-04 23:00-01:00"
+    assert current_window(datetime(2024, 3, 5, 12, 0), windows) is None
+
+
+def test_frequent_queries_are_warmed_and_their_hits_counted():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d, WARM_MIN_EXECUTIONS=3, WARM_MAX_AGE_SECONDS=3600)
+        ex = Executor(settings=s)
+        logs = QueryLogStore(s.LOG_DIR)
+        for _ in range(3):
+            logs.append(ex.run(sql=ORDERS, params={})[1])
+        # Regions only ran through traced pipeline runs; its SQL comes from the trace.
+        traces = TraceStore(s.TRACES_DIR)
+        for _ in range(3):
+            run_id = traces.new_run()
+            traces.add_node(run_id, "E_sql_generation", {"sql": REGIONS, "params": {}})
+            traces.add_node(run_id, "G_execute", {"cache_key": cache_key_for(REGIONS, {}), "mode": "db"})
+            logs.append({"cache_key": cache_key_for(REGIONS, {}), "mode": "db", "seconds": 0.1})
+        logs.append({"cache_key": "rare", "mode": "db"})
+
+        warmer = CacheWarmer(s)
+        assert [c["sql"] for c in warmer.candidates()] == [ORDERS, REGIONS]
+        # The orders snapshot was just written: too fresh to re-run.
+        report = warmer.run_once()
+        assert report["warmed"] == 1 and report["skipped_fresh"] == 1 and report["failed"] == 0
+
+        old = time.time() - 7200
+        os.utime(CacheService(s).path_for_key(cache_key_for(ORDERS, {})), (old, old))
+        con = sqlite3.connect(s.DB_NAME)
+        con.execute("INSERT INTO orders VALUES (11, 100.0)")
+        con.commit()
+        con.close()
+        assert warmer.run_once()["warmed"] == 1
+        stats = CacheService(s).stats()
+        assert stats["warmed"] == 2 and stats["warm_hit_rate"] == 0.0
+
+        df, meta = ex.run(sql=ORDERS, params={})
+        assert meta["cache_hit"] and float(df["total"].iloc[0]) == 155.0
+        stats = CacheService(s).stats()
+        assert stats["warmed_hit"] == 1 and stats["warm_hit_rate"] == 0.5
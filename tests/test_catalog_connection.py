@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pytest
+
+from cache.duckdb_store import DuckDBStore
+
+
+def test_persistent_catalog_serves_hits_from_memory_and_writes_behind(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d, "catalog.duckdb")
+        parquet = Path(d, "k.parquet")
+        pd.DataFrame({"a": [1, 2]}).to_parquet(parquet)
+        store = DuckDBStore(path)
+        store.register_parquet("k", parquet, rows=2, fetch_seconds=1.5, sql_fingerprint="f", tables=["t"])
+
+        opened = []
+        real_connect = duckdb.connect
+        monkeypatch.setattr(duckdb, "connect", lambda *a, **kw: opened.append(a) or real_connect(*a, **kw))
+
+        def hit():
+            for _ in range(25):
+                store.record_hit("k", parquet)
+
+        threads = [threading.Thread(target=hit) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert opened == []
+        (entry,) = store.cache_entries()
+        assert entry["hit_count"] == 100 and entry["row_count"] == 2 and entry["sql_fingerprint"] == "f"
+
+        # Registering again keeps the hit count and unset fields.
+        store.register_parquet("k", parquet)
+        store.flush()
+        assert store.health()["pending_writes"] == 0
+        monkeypatch.setattr(duckdb, "connect", real_connect)
+        (row,) = DuckDBStore(path, persistent=False).cache_entries()
+        assert row["hit_count"] == 100 and row["fetch_seconds"] == 1.5 and row["tables"] == '["t"]'
+
+        store.forget(["k"])
+        store.flush()
+        assert DuckDBStore(path, persistent=False).cache_totals()["entries"] == 0
+
+
+def test_cached_queries_cannot_see_the_catalog():
+    with tempfile.TemporaryDirectory() as d:
+        parquet = Path(d, "k.parquet")
+        pd.DataFrame({"a": [1, 2]}).to_parquet(parquet)
+        for persistent in (True, False):
+            store = DuckDBStore(Path(d, f"catalog_{persistent}.duckdb"), persistent=persistent)
+            store.register_parquet("k", parquet, rows=2)
+            assert store.query_cached("k", "SELECT sum(a) AS s FROM cached")["s"][0] == 3
+            with store._scratch() as con:
+                tables = con.execute("SELECT table_name FROM information_schema.tables").df()["table_name"].tolist()
+            assert "cache_catalog" not in tables
+            with pytest.raises(duckdb.CatalogException):
+                store.query_cached("k", "SELECT * FROM cache_catalog")
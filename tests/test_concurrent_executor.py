@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from config import Settings
+from agents.concurrent_executor import ConcurrentExecutor, QueryDeadlineExceeded, QueryJob, cancel_run
+from agents.executor import Executor
+from db.cancellation import QueryCancelled
+
+# Cross join of a 300-row table: ~27M rows, streamed in small chunks, i.e. a slow query.
+SLOW_SQL = "SELECT a.n FROM nums a, nums b, nums c WHERE a.n >= {i}"
+
+
+class _CountingExecutor(Executor):
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def run(self, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.05)
+            return super().run(**kwargs)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _settings(d: str, **overrides) -> Settings:
+    db = str(Path(d, "w.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE nums (n INTEGER)")
+    con.executemany("INSERT INTO nums VALUES (?)", [(i,) for i in range(300)])
+    con.commit()
+    con.close()
+    base = dict(
+        DB_DIALECT="sqlite", DB_NAME=db, CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), FETCH_CHUNK_SIZE=500,
+        MAX_RETURNED_ROWS=50_000_000, MAX_CONCURRENT_QUERIES_PER_RUN=2,
+    )
+    base.update(overrides)
+    return Settings(**base)
+
+
+def test_per_run_limit_and_results():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        inner = _CountingExecutor(settings=s)
+        ex = ConcurrentExecutor(s, executor=inner)
+        jobs = [QueryJob(sql=f"SELECT n FROM nums WHERE n < {i}", label=f"q{i}") for i in range(1, 7)]
+        results = ex.run_all("run-limit", jobs)
+        assert [len(df) for df, _ in results] == [1, 2, 3, 4, 5, 6]
+        assert results[2][1]["label"] == "q3"
+        assert inner.peak == 2
+
+
+def test_cancel_run_stops_running_and_queued_queries():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, MAX_CONCURRENT_QUERIES_PER_RUN=1)
+        ex = ConcurrentExecutor(s)
+        futures = ex.submit_many("run-cancel", [QueryJob(sql=SLOW_SQL.format(i=i)) for i in range(3)])
+        time.sleep(0.3)
+        assert cancel_run("run-cancel") == 3
+        with pytest.raises(QueryCancelled):
+            futures[0].result(timeout=10)
+        assert futures[1].cancelled() and futures[2].cancelled()
+
+
+def test_deadline_cancels_slow_query():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        ex = ConcurrentExecutor(s)
+        start = time.monotonic()
+        fut = ex.submit("run-deadline", QueryJob(sql=SLOW_SQL.format(i=0), deadline_seconds=0.3))
+        with pytest.raises(QueryDeadlineExceeded):
+            fut.result(timeout=10)
+        assert time.monotonic() - start < 5
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from config import Settings
+from core.run_pipeline import run_agentic_pipeline
+from db.dialects import SQLDialect, get_dialect
+from guards.sql_safety import SQLSafetyGuard
+from traces.trace_store import TraceStore
+
+
+def _local_settings(d: str, dialect: str, db_file: str) -> Settings:
+    return Settings(
+        DB_DIALECT=dialect,
+        DB_NAME=str(Path(d, db_file)),
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")),
+        CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")),
+        TRACES_DIR=str(Path(d, "traces")),
+        LOG_DIR=str(Path(d, "logs")),
+    )
+
+
+def test_dialect_quoting_limits_and_buckets():
+    mssql, duck, lite = get_dialect("mssql+pyodbc"), get_dialect("duckdb"), get_dialect("sqlite")
+    assert mssql.table_ref("dbo", "Sales") == "[dbo].[Sales]"
+    assert duck.table_ref("main", "sales") == '"main"."sales"'
+    assert mssql.limit_prefix(10) == "TOP (10) " and duck.limit_suffix(10) == "LIMIT 10"
+    assert duck.date_bucket("t0.\"d\"", "month") == "date_trunc('month', t0.\"d\")"
+    assert lite.date_bucket("d", "year") == "strftime('%Y-01-01', d)"
+    assert not lite.supports_grouping_sets and not lite.supports_tablesample
+
+
+def test_mssql_week_bucket_starts_on_monday_like_duckdb():
+    import datetime as dt
+
+    expr = get_dialect("mssql+pyodbc").date_bucket("x", "week")
+    assert expr == "DATEADD(week, DATEDIFF(week, 0, DATEADD(day, -1, x)), 0)"
+
+    # T-SQL semantics: DATEDIFF(week) counts Sunday boundaries; day 0 is 1900-01-01 (a Monday).
+    day0 = dt.date(1900, 1, 1)
+
+    def sunday_floor(d: dt.date) -> dt.date:
+        return d - dt.timedelta(days=(d.weekday() + 1) % 7)
+
+    def mssql_week(d: dt.date) -> dt.date:
+        weeks = (sunday_floor(d - dt.timedelta(days=1)) - sunday_floor(day0)).days // 7
+        return day0 + dt.timedelta(weeks=weeks)
+
+    con = duckdb.connect()
+    for d in (dt.date(2024, 3, 10), dt.date(2024, 3, 11), dt.date(2024, 3, 16)):  # Sunday, Monday, Saturday
+        duck = con.execute("SELECT CAST(date_trunc('week', ?::DATE) AS DATE)", [d]).fetchone()[0]
+        assert mssql_week(d) == duck == dt.date(2024, 3, 4) + dt.timedelta(weeks=int(d >= dt.date(2024, 3, 11)))
+    con.close()
+
+
+def test_incomplete_dialect_fails_at_construction():
+    class PartialDialect(SQLDialect):
+        name = "partial"
+
+        def date_bucket(self, expr, granularity):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialDialect()
+
+
+def test_guard_enforces_limit_in_dialect_syntax():
+    with tempfile.TemporaryDirectory() as d:
+        s = _local_settings(d, "duckdb", "w.duckdb")
+        r = SQLSafetyGuard(s).validate("SELECT a FROM t")
+        assert r["ok"] and r["normalized_sql"].rstrip().endswith(f"LIMIT {s.MAX_RETURNED_ROWS}")
+        assert "TOP" not in r["normalized_sql"]
+
+
+@pytest.mark.parametrize("dialect,db_file", [("duckdb", "warehouse.duckdb"), ("sqlite", "warehouse.db")])
+def test_full_pipeline_against_local_engine(dialect, db_file):
+    pytest.importorskip("duckdb_engine") if dialect == "duckdb" else None
+    with tempfile.TemporaryDirectory() as d:
+        s = _local_settings(d, dialect, db_file)
+        s.ensure_dirs()
+        ddl = [
+            "CREATE TABLE sales (region VARCHAR, order_date DATE, amount DOUBLE)",
+            "INSERT INTO sales VALUES ('EU', '2024-01-05', 10), ('EU', '2024-02-07', 20), ('US', '2024-01-09', 5)",
+        ]
+        if dialect == "duckdb":
+            con = duckdb.connect(s.DB_NAME)
+        else:
+            import sqlite3
+
+            con = sqlite3.connect(s.DB_NAME)
+        for stmt in ddl:
+            con.execute(stmt)
+        con.commit()
+        con.close()
+
+        review = {
+            "plan": {
+                "tables": ["main.sales"],
+                "dimensions": ["region"],
+                "time_field": "order_date",
+                "time_granularity": "month",
+                "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}],
+                "visuals": [{"type": "bar", "x": "region", "y": "Revenue"}],
+            }
+        }
+        from agents.schema_agent import SchemaAgent
+        from knowledge_graph.schema_registry import SchemaRegistry
+        from knowledge_graph.store import KnowledgeGraphStore
+
+        SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+
+        ts = TraceStore(s.TRACES_DIR)
+        run_id = ts.new_run()
+        result = run_agentic_pipeline(
+            settings=s,
+            trace_store=ts,
+            run_id=run_id,
+            user_question="revenue by region",
+            allowed_tables=["main.sales"],
+            human_review=review,
+            developer_mode=True,
+            large_mode=False,
+        )
+        assert result["status"] == "success", result
+        revenue = [k for k in result["insights"]["kpis"] if k["title"] == "Revenue"][0]
+        assert revenue["value"] == "35.00"
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+from pathlib import Path
+
+from sqlalchemy import text
+
+from config import Settings
+from db.engine import dispose_engines, get_engine, pool_metrics
+
+
+def test_registry_shares_engine_and_counts_pool_activity():
+    with tempfile.TemporaryDirectory() as d:
+        s = Settings(DB_DIALECT="sqlite", DB_NAME=str(Path(d, "w.db")), DB_POOL_SIZE=2)
+        engine = get_engine(s)
+        assert get_engine(Settings(DB_DIALECT="sqlite", DB_NAME=str(Path(d, "w.db")), DB_POOL_SIZE=2)) is engine
+        assert get_engine(Settings(DB_DIALECT="sqlite", DB_NAME=str(Path(d, "w.db")), DB_POOL_SIZE=3)) is not engine
+
+        for _ in range(3):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        m = next(p for p in pool_metrics() if p["label"] == f"sqlite:{s.DB_NAME}" and p["pool_size"] == 2)
+        assert m["checkouts"] == 3 and m["checkins"] == 3 and m["checked_out"] == 0
+        # One physical connection, reused from the pool; none of the checkouts had to wait.
+        assert m["connects"] == 1 and m["waits"] == 0
+        assert "password" not in m["label"].lower()
+
+        assert dispose_engines() >= 2
+        assert pool_metrics() == []
+
+
+def test_waits_count_only_checkouts_blocked_on_a_full_pool():
+    with tempfile.TemporaryDirectory() as d:
+        s = Settings(DB_DIALECT="sqlite", DB_NAME=str(Path(d, "p.db")), DB_POOL_SIZE=1, DB_POOL_MAX_OVERFLOW=0)
+        engine = get_engine(s)
+        holder = engine.connect()
+        threading.Timer(0.2, holder.close).start()
+        with engine.connect() as conn:  # blocks until the timer returns the only connection
+            conn.execute(text("SELECT 1"))
+
+        m = next(p for p in pool_metrics() if p["label"] == f"sqlite:{s.DB_NAME}")
+        assert m["checkouts"] == 2 and m["waits"] == 1
+        assert m["wait_seconds_max"] >= 0.15
+        dispose_engines()
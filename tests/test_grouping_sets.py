@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from config import settings
+from agents.dashboard_agent import DashboardAgent
+from agents.insight_agent import InsightAgent
+from agents.sql_agent import SQLAgent
+from knowledge_graph.schema_registry import SchemaRegistry
+from utils.result_slicing import GROUPING_ID_COLUMN, detail_slice, slice_grouping_set
+
+
+def _registry(d: str) -> SchemaRegistry:
+    reg = {
+        "tables": {
+            "dbo.Sales": {
+                "schema": "dbo",
+                "name": "Sales",
+                "row_count": 1000,
+                "columns": [
+                    {"name": "Region", "type": "nvarchar", "nullable": True},
+                    {"name": "OrderMonth", "type": "date", "nullable": True},
+                    {"name": "Amount", "type": "decimal", "nullable": True},
+                ],
+            }
+        }
+    }
+    Path(d, "schema_registry.json").write_text(json.dumps(reg), encoding="utf-8")
+    return SchemaRegistry(d)
+
+
+def _plan():
+    return {
+        "tables": ["dbo.Sales"],
+        "dimensions": ["Region"],
+        "time_field": "OrderMonth",
+        "metrics": [{"name": "Revenue", "agg": "sum", "field": "Amount"}],
+        "visuals": [{"type": "bar", "x": "Region", "y": "Revenue"}, {"type": "line", "x": "OrderMonth", "y": "Revenue"}],
+    }
+
+
+def test_multi_grain_plan_emits_grouping_sets():
+    with tempfile.TemporaryDirectory() as d:
+        agent = SQLAgent(settings, _registry(d))
+        plan = _plan()
+        bundle = agent.generate_sql(plan, allowed_tables=[])
+        assert "GROUP BY GROUPING SETS" in bundle["sql"]
+        assert GROUPING_ID_COLUMN in bundle["expected_columns"]
+        grains = {tuple(g["columns"]): g["id"] for g in bundle["grouping_sets"]}
+        assert grains == {("Region", "OrderMonth"): 0, ("Region",): 1, ("OrderMonth",): 2, (): 3}
+
+
+def test_downstream_slices_by_grouping_set():
+    plan = {
+        "metrics": [{"name": "Revenue", "agg": "avg", "field": "Amount"}],
+        "grouping_sets": [{"id": 0, "columns": ["Region"]}, {"id": 1, "columns": []}],
+    }
+    df = pd.DataFrame(
+        {
+            "Region": ["EU", "US", None],
+            "Revenue": [10.0, 30.0, 17.5],
+            GROUPING_ID_COLUMN: [0, 0, 1],
+        }
+    )
+    detail = detail_slice(df, plan)
+    assert list(detail.columns) == ["Region", "Revenue"]
+    assert len(detail) == 2
+    assert len(slice_grouping_set(df, plan, [])) == 1
+
+    kpis = InsightAgent().generate(df=df, plan=plan)["kpis"]
+    revenue = [k for k in kpis if k["title"] == "Revenue"][0]
+    # The database total (AVG over all rows) wins over summing per-region averages.
+    assert revenue["value"] == "17.50"
+
+
+def test_grain_sliced_chart_data_is_capped_like_the_preview():
+    plan = {
+        "metrics": [{"name": "Revenue", "agg": "sum", "field": "Amount"}],
+        "grouping_sets": [{"id": 0, "columns": ["Day"]}, {"id": 1, "columns": []}],
+    }
+    n = DashboardAgent.PREVIEW_ROWS + 50
+    df = pd.DataFrame({"Day": list(range(n)) + [None], "Revenue": [1.0] * n + [float(n)], GROUPING_ID_COLUMN: [0] * n + [1]})
+    charts = [{"type": "line", "x": "Day", "y": "Revenue"}]
+    DashboardAgent(settings)._attach_grain_data(charts, full=df, plan=plan)
+    assert len(charts[0]["data"]) == DashboardAgent.PREVIEW_ROWS
+    assert charts[0]["truncated_rows"] == n
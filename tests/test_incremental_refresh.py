@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from agents.sql_agent import SQLAgent
+from cache.freshness import FreshnessChecker
+from cache.incremental import base_key_for
+from cache.service import CacheService, cache_key_for
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+
+PLAN = {
+    "tables": ["main.orders"],
+    "dimensions": ["region"],
+    "time_field": "ordered_at",
+    "time_granularity": "day",
+    "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}],
+}
+
+
+def _setup(d: str, **kw) -> Settings:
+    db = str(Path(d, "src.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, ordered_at TEXT, amount REAL)")
+    con.executemany(
+        "INSERT INTO orders (region, ordered_at, amount) VALUES (?, ?, ?)",
+        [(r, f"2024-01-{day:02d} 10:00:00", float(day)) for day in range(1, 31) for r in ("EU", "US")],
+    )
+    con.commit()
+    con.close()
+    s = Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, FRESHNESS_CHECK_INTERVAL_SECONDS=0, CACHE_EVICTION_INTERVAL_SECONDS=0,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+    s.ensure_dirs()
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+    return s
+
+
+def _append(s: Settings, rows) -> None:
+    con = sqlite3.connect(s.DB_NAME)
+    con.executemany("INSERT INTO orders (region, ordered_at, amount) VALUES (?, ?, ?)", rows)
+    con.commit()
+    con.close()
+
+
+def _by_day(df):
+    return {(r["region"], r["ordered_at"]): r["Revenue"] for r in df.to_dict("records")}
+
+
+def test_invalidated_trend_fetches_only_the_latest_window():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d)
+        bundle = SQLAgent(s, SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).generate_sql(dict(PLAN), allowed_tables=[])
+        assert "incr_since" in bundle["spec"]["time"]["incremental_sql"]
+        ex = Executor(settings=s)
+        df, meta = ex.run(sql=bundle["sql"], params=bundle["params"], spec=bundle["spec"])
+        assert meta["mode"] == "db" and len(df) == 60
+
+        checker = FreshnessChecker(s)
+        checker.run_once()
+        # A late order on the last cached day and a new day.
+        _append(s, [("EU", "2024-01-30 18:00:00", 100.0), ("US", "2024-01-31 09:00:00", 7.0)])
+        report = checker.run_once()
+        assert report["invalidated"] == 1 and report["kept_for_incremental"] == 1
+
+        df, meta = ex.run(sql=bundle["sql"], params=bundle["params"], spec=bundle["spec"])
+        assert meta["mode"] == "incremental"
+        assert meta["incremental"] == {"since": "2024-01-30", "base_rows_kept": 58, "new_rows": 3}
+        merged = _by_day(df)
+        assert len(merged) == 61
+        assert merged[("EU", "2024-01-30")] == 130.0 and merged[("US", "2024-01-31")] == 7.0
+        assert merged[("EU", "2024-01-01")] == 1.0
+
+        key = cache_key_for(bundle["sql"], bundle["params"])
+        assert not CacheService(s).path_for_key(base_key_for(key)).exists()
+        assert ex.run(sql=bundle["sql"], params=bundle["params"], spec=bundle["spec"])[1]["cache_hit"]
+
+
+def test_without_a_base_or_when_disabled_the_full_query_runs():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d, INCREMENTAL_REFRESH=False)
+        bundle = SQLAgent(s, SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).generate_sql(dict(PLAN), allowed_tables=[])
+        ex = Executor(settings=s)
+        ex.run(sql=bundle["sql"], params=bundle["params"], spec=bundle["spec"])
+        checker = FreshnessChecker(s)
+        checker.run_once()
+        _append(s, [("EU", "2024-01-31 09:00:00", 1.0)])
+        assert checker.run_once()["kept_for_incremental"] == 0
+        df, meta = ex.run(sql=bundle["sql"], params=bundle["params"], spec=bundle["spec"])
+        assert meta["mode"] == "db" and len(df) == 61
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from config import Settings
+from agents.schema_agent import SchemaAgent
+from agents.sql_agent import SQLAgent
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+from utils.access_paths import estimate_cost
+
+
+def _settings(d: str, dialect: str, db_file: str) -> Settings:
+    return Settings(DB_DIALECT=dialect, DB_NAME=str(Path(d, db_file)), KNOWLEDGE_GRAPH_DIR=d, INDEX_WARN_MIN_ROWS=2)
+
+
+def _refresh(s: Settings) -> SchemaRegistry:
+    reg = SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), reg).refresh(sample_rows=5)
+    return reg
+
+
+DDL = [
+    "CREATE TABLE customers (id INTEGER PRIMARY KEY, code VARCHAR, segment VARCHAR)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER REFERENCES customers(id), region VARCHAR, channel VARCHAR, amount DOUBLE)",
+    "CREATE INDEX ix_orders_region ON orders(region, channel)",
+    "INSERT INTO customers VALUES (1, 'A', 'smb'), (2, 'B', 'ent')",
+    "INSERT INTO orders VALUES (1, 1, 'EU', 'web', 10), (2, 2, 'US', 'shop', 20), (3, 1, 'EU', 'shop', 5)",
+]
+
+
+def test_sqlite_index_hints_order_predicates_and_flag_join_keys():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, "sqlite", "w.db")
+        con = sqlite3.connect(s.DB_NAME)
+        for stmt in DDL:
+            con.execute(stmt)
+        con.commit()
+        con.close()
+        reg = _refresh(s)
+
+        hints = reg.load()["tables"]["main.orders"]["index_hints"]
+        assert {"name": "ix_orders_region", "columns": ["region", "channel"]}.items() <= hints["indexes"][0].items()
+
+        plan = {
+            "tables": ["main.orders", "main.customers"],
+            # Planned on an unindexed column; the FK orders.customer_id -> customers.id is indexed (PK),
+            # but the planned join is kept and only flagged.
+            "joins": [{"left_table": "main.orders", "right_table": "main.customers", "left_key": "customer_id", "right_key": "code"}],
+            "dimensions": ["segment"],
+            "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}],
+            "filters": [
+                {"field": "amount", "op": ">", "value": 1},
+                {"field": "channel", "op": "!=", "value": "x"},
+                {"field": "region", "op": "=", "value": "EU"},
+            ],
+        }
+        b = SQLAgent(s, reg).generate_sql(plan, allowed_tables=[])
+        assert 't0."customer_id" = t1."code"' in b["sql"]
+        where = b["sql"].split("WHERE", 1)[1]
+        assert where.index('"region"') < where.index('"amount"') < where.index('"channel"')
+
+        cost = b["cost"]
+        assert cost["tables"][0]["access"] == "index_seek"
+        assert any("main.customers.code has no index" in w and "customers.id is indexed" in w for w in cost["warnings"])
+        assert any("orders.amount is not index-backed" in w for w in cost["warnings"])
+        assert any("orders.channel is not sargable" in w for w in cost["warnings"])
+
+
+def test_duckdb_indexes_and_columnar_storage():
+    pytest.importorskip("duckdb_engine")
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, "duckdb", "w.duckdb")
+        con = duckdb.connect(s.DB_NAME)
+        for stmt in DDL:
+            con.execute(stmt)
+        con.close()
+        hints = _refresh(s).load()["tables"]["main.orders"]["index_hints"]
+        assert hints["columnstore"] is True
+        assert hints["indexes"][0]["columns"] == ["region", "channel"]
+
+
+def test_non_sargable_filter_on_indexed_column_is_flagged():
+    reg = {"dbo.orders": {"row_count": 10_000_000, "index_hints": {"indexes": [{"name": "ix_code", "columns": ["code"]}]}}}
+    filters = [{"table": "dbo.orders", "column": "code", "op": "like", "value": "%abc"}]
+    cost = estimate_cost(reg, "dbo.orders", filters, [], warn_min_rows=1_000_000)
+    assert cost["tables"][0]["access"] == "full_scan"
+    assert any("dbo.orders.code is not sargable" in w for w in cost["warnings"])
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from config import Settings
+from agents.executor import Executor
+from cache.memory_tier import ArrowMemoryTier
+from cache.snapshot_cache import SnapshotCache
+
+
+def test_lru_respects_the_byte_budget():
+    t = pa.table({"a": pa.array(range(1000), type=pa.int64())})  # 8000 bytes
+    tier = ArrowMemoryTier(max_bytes=4 * t.nbytes)
+    for k in ("a", "b", "c", "d"):
+        assert tier.put(k, 1, t)
+    assert tier.get("a", 1) is t  # now most recently used
+    assert tier.put("e", 1, t)
+    assert tier.get("b", 1) is None and tier.get("a", 1) is t
+    assert tier.stats()["bytes"] <= tier.max_bytes and tier.stats()["evictions"] == 1
+    # Stale signature: the file was rewritten since.
+    assert tier.get("a", 2) is None
+    # Bigger than a quarter of the budget: not admitted.
+    assert not ArrowMemoryTier(max_bytes=t.nbytes).put("x", 1, t)
+
+
+def test_snapshot_reads_are_served_from_memory_and_see_rewrites():
+    with tempfile.TemporaryDirectory() as d:
+        tier = ArrowMemoryTier(max_bytes=64 * 1024**2)
+        cache = SnapshotCache(Path(d), memory=tier)
+        cache.put("k", pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}))
+        df, source = cache.read("k")
+        assert source == "disk" and list(df["a"]) == [1, 2, 3]
+
+        # Another "session" reads the same snapshot: no file access.
+        df, source = SnapshotCache(Path(d), memory=tier).read("k", columns=["b"], max_rows=2)
+        assert source == "memory" and list(df.columns) == ["b"] and list(df["b"]) == ["x", "y"]
+
+        cache.put("k", pd.DataFrame({"a": [9], "b": ["q"]}))
+        df, source = cache.read("k")
+        assert source == "disk" and list(df["a"]) == [9]
+
+        cache.delete("k")
+        assert cache.read("k") is None and tier.stats()["entries"] == 0
+
+
+def test_executor_cache_hits_use_the_memory_tier():
+    with tempfile.TemporaryDirectory() as d:
+        db = str(Path(d, "w.db"))
+        con = sqlite3.connect(db)
+        con.execute("CREATE TABLE t (k INTEGER, v REAL)")
+        con.executemany("INSERT INTO t VALUES (?, ?)", [(i, float(i)) for i in range(100)])
+        con.commit()
+        con.close()
+        s = Settings(DB_DIALECT="sqlite", DB_NAME=db, CACHE_DIR=str(Path(d, "cache")), DUCKDB_PATH=str(Path(d, "cache", "c.duckdb")))
+        Executor(settings=s).run(sql="SELECT k, v FROM t", params={})
+        tiers = [Executor(settings=s).run(sql="SELECT k, v FROM t", params={})[1]["cache_tier"] for _ in range(2)]
+        assert tiers == ["disk", "memory"]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cache.layout_benchmark import run_benchmark, shapes
+from cache.memory_tier import ArrowMemoryTier
+from cache.snapshot_cache import ParquetLayout, SnapshotCache
+
+
+def _frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"id": np.arange(n), "region": np.where(np.arange(n) % 2, "EU", "US"), "v": np.arange(n) * 0.5})
+
+
+def test_layout_sets_codec_row_groups_and_dictionary_columns():
+    with tempfile.TemporaryDirectory() as d:
+        cache = SnapshotCache(Path(d), layout=ParquetLayout(compression_level=3, row_group_rows=1000))
+        meta = pq.ParquetFile(cache.put("k", _frame(4500))).metadata
+        assert meta.num_row_groups == 5
+        col = {meta.row_group(0).column(i).path_in_schema: meta.row_group(0).column(i) for i in range(3)}
+        assert col["id"].compression == "ZSTD" and col["id"].statistics.has_min_max
+        assert "RLE_DICTIONARY" in col["region"].encodings and "RLE_DICTIONARY" not in col["v"].encodings
+
+        # Streamed batches are gathered into row groups of the same size.
+        batches = pa.Table.from_pandas(_frame(4500), preserve_index=False).to_batches(max_chunksize=300)
+        path, rows = cache.put_batches("s", batches)
+        assert rows == 4500 and pq.ParquetFile(path).metadata.num_row_groups == 5
+
+
+def test_reads_project_and_push_filters_down_on_disk_and_in_memory():
+    with tempfile.TemporaryDirectory() as d:
+        layout = ParquetLayout(row_group_rows=1000)
+        SnapshotCache(Path(d), layout=layout).put("k", _frame(5000))
+        filters = [("id", ">=", 4200), ("region", "=", "EU")]
+        for memory in (None, ArrowMemoryTier(max_bytes=64 * 1024**2)):
+            cache = SnapshotCache(Path(d), memory=memory, layout=layout)
+            for _ in range(2):  # second pass is served from the memory tier
+                df = cache.get("k", columns=["v"], filters=filters)
+                assert list(df.columns) == ["v"] and len(df) == 400 and df["v"].min() == 2100.5
+            assert len(cache.get("k", filters=filters, max_rows=7)) == 7
+
+
+def test_benchmark_reports_every_shape_and_layout():
+    layouts = {"default": ParquetLayout(), "snappy": ParquetLayout(compression="snappy")}
+    report = run_benchmark(shapes(2000), layouts, repeats=1)
+    assert len(report) == 4 * 2 and (report["bytes"] > 0).all() and report["filtered_read_s"].notna().all()
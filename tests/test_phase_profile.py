@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from config import Settings
+from agents.executor import Executor
+from observability.query_log import QueryLogStore, phase_breakdown
+from observability.timing import PhaseTimer
+
+
+def _settings(d: str) -> Settings:
+    db = str(Path(d, "w.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE sales (region TEXT, amount REAL)")
+    con.executemany("INSERT INTO sales VALUES (?, ?)", [("EU" if i % 3 else "US", float(i)) for i in range(3000)])
+    con.commit()
+    con.close()
+    return Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, FETCH_CHUNK_SIZE=500,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+    )
+
+
+def test_phase_timer_accumulates():
+    t = PhaseTimer()
+    with t.phase("a"):
+        pass
+    with t.phase("a"):
+        pass
+    t.add("b", 0.5)
+    rep = t.report(bytes_transferred=7)
+    assert set(rep["phases"]) == {"a", "b"} and rep["phases"]["b"] == 0.5
+    assert rep["bytes_transferred"] == 7 and rep["arrow_peak_bytes"] >= 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_db_execution_reports_every_phase(stream):
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        _df, meta = Executor(settings=s).run(sql="SELECT region, amount FROM sales", params={}, stream=stream)
+        prof = meta["profile"]
+        expected = {"pool_checkout", "execute", "first_row", "fetch", "parquet_write", "catalog_register"}
+        expected |= {"cache_read"} if stream else {"dataframe"}
+        assert expected <= set(prof["phases"])
+        assert all(v >= 0 for v in prof["phases"].values())
+        # Phases never add up to more than the wall time of the call.
+        assert sum(prof["phases"].values()) <= meta["seconds"] + 0.01
+        assert prof["bytes_transferred"] == meta["fetch"]["bytes"] > 0
+
+        _df, hit = Executor(settings=s).run(sql="SELECT region, amount FROM sales", params={}, stream=stream)
+        assert hit["cache_hit"] and "cache_read" in hit["profile"]["phases"] and hit["profile"]["bytes_transferred"] == 0
+
+        logs = QueryLogStore(s.LOG_DIR)
+        logs.append(meta)
+        rows = phase_breakdown(logs.read_recent())
+        assert rows[0]["phase:execute"] == prof["phases"]["execute"] and rows[0]["mode"] == "db"
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from core.run_pipeline import run_agentic_pipeline
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+from traces.trace_store import TraceStore
+
+
+def _settings(d: str, **kw) -> Settings:
+    db = str(Path(d, "w.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE sales (region TEXT, amount REAL)")
+    con.executemany("INSERT INTO sales VALUES (?, ?)", [("EU" if i % 3 else "US", float(i)) for i in range(5000)])
+    con.commit()
+    con.close()
+    kw.setdefault("FETCH_CHUNK_SIZE", 500)
+    return Settings(
+        DB_DIALECT="sqlite", DB_NAME=db,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_first_chunk_is_published_before_the_fetch_completes(stream):
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        seen = []
+        df, meta = Executor(settings=s).run(
+            sql="SELECT region, amount FROM sales", params={}, stream=stream, on_first_chunk=seen.append
+        )
+        assert len(seen) == 1 and len(seen[0]) == 500 and list(seen[0].columns) == ["region", "amount"]
+        assert len(df) == 5000
+        assert meta["first_chunk_rows"] == 500 and meta["first_chunk_seconds"] <= meta["seconds"]
+
+        # Cache hits are immediate: no preview.
+        seen.clear()
+        _df, meta = Executor(settings=s).run(sql="SELECT region, amount FROM sales", params={}, on_first_chunk=seen.append)
+        assert meta["cache_hit"] and not seen
+
+
+def test_pipeline_publishes_provisional_preview_on_calling_thread():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, FETCH_CHUNK_SIZE=1)
+        s.ensure_dirs()
+        SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+        ts = TraceStore(s.TRACES_DIR)
+        run_id = ts.new_run()
+        previews = []
+        caller = threading.get_ident()
+
+        result = run_agentic_pipeline(
+            settings=s,
+            trace_store=ts,
+            run_id=run_id,
+            user_question="revenue by region",
+            allowed_tables=["main.sales"],
+            human_review={"plan": {"tables": ["main.sales"], "dimensions": ["region"], "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}]}},
+            developer_mode=True,
+            large_mode=False,
+            on_preview=lambda p: previews.append((threading.get_ident(), p)),
+        )
+        assert result["status"] == "success", result
+        [(thread, preview)] = previews
+        assert thread == caller
+        assert preview["rows"] == 1
+        assert all(k.get("provisional") for k in preview["insights"]["kpis"])
+        assert "first_chunk_seconds" in result["exec_meta"]
+        assert ts.get_node(run_id, "G_execute__first_chunk")["payload"]["rows"] == 1
+        # The final insights come from the full result, not the preview chunk.
+        revenue = [k for k in result["insights"]["kpis"] if k["title"] == "Revenue"][0]
+        assert not revenue.get("provisional")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import pytest
+from sqlalchemy import text
+
+from config import Settings
+from agents.executor import Executor
+from db import run_sql_query
+from db.cancellation import QueryTimeoutError
+from db.engine import get_engine, pool_metrics
+
+
+def _settings(d: str, dialect: str) -> Settings:
+    db = str(Path(d, "w.db" if dialect == "sqlite" else "w.duckdb"))
+    rows = [(i,) for i in range(3000)]
+    if dialect == "sqlite":
+        con = sqlite3.connect(db)
+        con.execute("CREATE TABLE nums (n INTEGER)")
+        con.executemany("INSERT INTO nums VALUES (?)", rows)
+        con.commit()
+    else:
+        con = duckdb.connect(db)
+        con.execute("CREATE TABLE nums AS SELECT range AS n FROM range(3000)")
+    con.close()
+    return Settings(
+        DB_DIALECT=dialect, DB_NAME=db, CACHE_DIR=str(Path(d, "cache")), LOG_DIR=str(Path(d, "logs")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), QUERY_TIMEOUT_SECONDS=1,
+    )
+
+
+# One aggregate row after ~2.7e10 joined rows: blocks inside execute(), so only a driver-level cancel stops it.
+SLOW = "SELECT SUM((a.n * b.n + c.n) % 7) AS s FROM nums a, nums b, nums c"
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "duckdb"])
+def test_watchdog_cancels_cursor_and_pool_stays_usable(dialect):
+    if dialect == "duckdb":
+        pytest.importorskip("duckdb_engine")
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, dialect)
+        start = time.monotonic()
+        with pytest.raises(QueryTimeoutError) as err:
+            run_sql_query(sql=SLOW, params={}, timeout_seconds=1, max_rows=10, settings=s)
+        assert time.monotonic() - start < 10
+        assert err.value.meta == {"timed_out": True, "timeout_seconds": 1}
+
+        # The interrupted connection was invalidated; the next checkout gets a clean one.
+        with get_engine(s).connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM nums")).scalar() == 3000
+        m = next(p for p in pool_metrics() if p["label"].endswith(s.DB_NAME))
+        assert m["invalidations"] >= 1
+
+
+def test_executor_reports_timeout_meta():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, "sqlite")
+        with pytest.raises(QueryTimeoutError) as err:
+            Executor(settings=s).run(sql=SLOW, params={})
+        meta = err.value.meta
+        assert meta["timed_out"] and meta["mode"] == "db" and meta["cache_key"] and meta["seconds"] >= 1
+        json.dumps(meta)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import datetime as dt
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from agents.data_quality_agent import DataQualityAgent
+from agents.insight_agent import InsightAgent
+from utils.result_typing import compact_dtypes, result_column_types
+
+
+def _frame(n: int = 20000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "region": pd.Series(rng.choice(["EU", "US", "APAC"], n), dtype=object),
+            "customer": pd.Series([f"c{i}" for i in range(n)], dtype=object),
+            "order_day": [dt.date(2024, 1, 1) + dt.timedelta(days=int(i % 365)) for i in range(n)],
+            "qty": rng.integers(0, 100, n).astype("int64"),
+            "amount": [Decimal(f"{v:.2f}") for v in rng.uniform(0, 1000, n)],
+            "__grouping_id": np.zeros(n, dtype="int64"),
+        }
+    )
+
+
+def test_compaction_shrinks_frame_and_keeps_values():
+    df = _frame()
+    types = {"order_day": "date", "amount": "decimal(12,2)", "region": "nvarchar"}
+    out, report = compact_dtypes(df, types)
+
+    assert isinstance(out["region"].dtype, pd.CategoricalDtype)
+    assert not isinstance(out["customer"].dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(out["customer"].dtype)
+    assert pd.api.types.is_datetime64_any_dtype(out["order_day"])
+    assert out["qty"].dtype == np.int8
+    assert pd.api.types.is_float_dtype(out["amount"])
+    assert out["__grouping_id"].dtype == np.int64  # internal columns untouched
+
+    assert report["bytes_after"] < report["bytes_before"] / 3
+    assert set(report["columns"]) == {"region", "customer", "order_day", "qty", "amount"}
+    assert out["qty"].astype("int64").sum() == df["qty"].sum()
+    assert abs(out["amount"].sum() - float(sum(df["amount"]))) < 1e-6 * float(sum(df["amount"]))
+
+
+def test_downstream_stages_on_compacted_frame():
+    df = _frame()
+    out, _report = compact_dtypes(df, {"order_day": "date"})
+    plan = {"metrics": [{"name": "Qty", "agg": "sum", "field": "qty"}]}
+
+    assert DataQualityAgent().run(out)["ok"]
+    insights = InsightAgent().generate(df=out, plan=plan)
+    # Categorical region is still found as a breakdown column, and dates give a trend.
+    assert insights["distributions"] and insights["distributions"][0]["column"] == "region"
+    assert insights["trends"]
+    assert [k["value"] for k in insights["kpis"] if k["title"] == "Qty"] == [InsightAgent()._fmt(df["qty"].sum())]
+
+
+def test_result_column_types_from_spec():
+    spec = {
+        "dimensions": [
+            {"alias": "Region", "source": "dbo.Sales.Region", "bucket": None},
+            {"alias": "Month", "source": "dbo.Sales.OrderDate", "bucket": "month"},
+        ],
+        "metrics": [{"alias": "Orders", "agg": "count", "source": None}],
+    }
+    reg = {"dbo.Sales": {"columns": [{"name": "Region", "type": "nvarchar"}, {"name": "OrderDate", "type": "datetime2"}]}}
+    assert result_column_types(spec, reg) == {"Region": "nvarchar", "Month": "date", "Orders": "bigint"}
+
+
+def test_fallback_kpis_accumulate_float32_in_float64(monkeypatch):
+    monkeypatch.setattr(InsightAgent, "_fmt", lambda self, x: float(x))
+    monkeypatch.setattr(InsightAgent, "_kpis_from_plan", lambda self, **kw: [])
+    df = pd.DataFrame({"amount": np.array([16777216.0, 1.0], dtype="float32")})
+    kpis = {k["title"]: k["value"] for k in InsightAgent().generate(df=df, plan={})["kpis"]}
+    assert kpis["Sum(amount)"] == 16777217.0
+    assert kpis["Avg(amount)"] == 8388608.5
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import agents.executor as executor_mod
+from config import Settings
+from agents.executor import Executor
+from cache.single_flight import FileSingleFlight
+from db.cancellation import CancelToken, QueryCancelled
+
+
+QUERY = "SELECT a.n % 10 AS k, COUNT(*) AS c FROM nums a, nums b GROUP BY a.n % 10 ORDER BY k"
+
+
+def _settings(d: str, **kw) -> Settings:
+    db = str(Path(d, "w.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE nums (n INTEGER)")
+    con.executemany("INSERT INTO nums VALUES (?)", [(i,) for i in range(300)])
+    con.commit()
+    con.close()
+    return Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, CACHE_DIR=str(Path(d, "cache")), LOG_DIR=str(Path(d, "logs")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), **kw,
+    )
+
+
+def _count_db_calls(monkeypatch) -> list:
+    calls = []
+    real = executor_mod.run_sql_query
+
+    def counting(**kwargs):
+        calls.append(kwargs["sql"])
+        time.sleep(0.3)  # keep the leader in flight while the others arrive
+        return real(**kwargs)
+
+    real_stream = executor_mod.stream_sql_query
+
+    def counting_stream(**kwargs):
+        calls.append(kwargs["sql"])
+        time.sleep(0.3)
+        yield from real_stream(**kwargs)
+
+    monkeypatch.setattr(executor_mod, "run_sql_query", counting)
+    monkeypatch.setattr(executor_mod, "stream_sql_query", counting_stream)
+    return calls
+
+
+def _run_concurrently(s: Settings, n: int, run_kwargs=None) -> list:
+    executors = [Executor(settings=s) for _ in range(n)]  # one Executor per Streamlit session
+    barrier = threading.Barrier(n, timeout=10)
+    results, errors = [], []
+
+    def session(ex: Executor, kwargs: dict):
+        try:
+            barrier.wait()
+            results.append(ex.run(sql=QUERY, params={}, **kwargs))
+        except Exception as e:
+            errors.append(e)
+
+    kwargs = run_kwargs or [{}] * n
+    threads = [threading.Thread(target=session, args=(ex, kw)) for ex, kw in zip(executors, kwargs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+    assert not errors
+    assert not any(t.is_alive() for t in threads)
+    return results
+
+
+@pytest.mark.parametrize("n", [1, 4, 16])
+def test_db_executions_stay_flat_as_identical_requests_grow(monkeypatch, n):
+    with tempfile.TemporaryDirectory() as d:
+        calls = _count_db_calls(monkeypatch)
+        results = _run_concurrently(_settings(d), n)
+
+        assert len(calls) == 1
+        assert len(results) == n
+        # Followers report the leader's exec_meta, marked as coalesced.
+        assert sum(not meta.get("coalesced") for _df, meta in results) == 1
+        assert all(meta["mode"] == "db" for _df, meta in results)
+        frames = [df for df, _meta in results]
+        assert all(df["c"].sum() == 300 * 300 for df in frames)
+        assert len({id(df) for df in frames}) == n
+
+
+def test_mode_off_runs_every_request(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        calls = _count_db_calls(monkeypatch)
+        _run_concurrently(_settings(d, SINGLE_FLIGHT_MODE="off"), 4)
+        assert len(calls) == 4
+
+
+def test_follower_reads_its_own_projection(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        calls = _count_db_calls(monkeypatch)
+        kwargs = [{}, {"stream": True, "columns": ["k"]}, {"stream": True, "columns": ["k"]}]
+        results = _run_concurrently(_settings(d), 3, kwargs)
+        assert len(calls) == 1
+        assert sum(not m.get("coalesced") for _df, m in results) == 1
+        assert sorted(tuple(df.columns) for df, _m in results) == [("k",), ("k",), ("k", "c")]
+
+
+def test_cancelled_follower_stops_waiting(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        real = executor_mod.run_sql_query
+
+        def slow(**kwargs):
+            time.sleep(2)
+            return real(**kwargs)
+
+        monkeypatch.setattr(executor_mod, "run_sql_query", slow)
+        leader = threading.Thread(target=lambda: Executor(settings=s).run(sql=QUERY, params={}))
+        leader.start()
+        time.sleep(0.2)
+
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel, args=("deadline",)).start()
+        start = time.monotonic()
+        with pytest.raises(QueryCancelled):
+            Executor(settings=s).run(sql=QUERY, params={}, cancel=token)
+        assert time.monotonic() - start < 1.5
+        leader.join(timeout=30)
+
+
+def test_file_single_flight_coalesces_across_lock_holders():
+    # Separate FileSingleFlight instances share nothing but the lock directory, like worker processes.
+    with tempfile.TemporaryDirectory() as d:
+        store, calls = {}, []
+        barrier = threading.Barrier(6)
+        shared = []
+
+        def fill():
+            calls.append(1)
+            time.sleep(0.3)
+            store["k"] = "result"
+            return "result"
+
+        def worker():
+            flight = FileSingleFlight(Path(d), stale_seconds=30, poll_seconds=0.01)
+            barrier.wait()
+            result, was_shared = flight.do("k", fill, lambda: store.get("k"))
+            assert result == "result"
+            shared.append(was_shared)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=30)
+
+        assert len(calls) == 1
+        assert sorted(shared) == [False] + [True] * 5
+        assert not list(Path(d).glob("*.lock"))
+
+
+def test_file_single_flight_breaks_stale_lock():
+    with tempfile.TemporaryDirectory() as d:
+        Path(d, "k.lock").write_text("12345 0")  # left behind by a crashed leader
+        flight = FileSingleFlight(Path(d), stale_seconds=0.1, poll_seconds=0.01)
+        time.sleep(0.2)
+        assert flight.do("k", lambda: "fresh", lambda: None) == ("fresh", False)
+
+
+def _process_worker(settings_kwargs: dict, barrier, out) -> None:
+    ex = Executor(settings=Settings(**settings_kwargs))
+    barrier.wait(timeout=30)
+    _df, meta = ex.run(sql=QUERY, params={})
+    out.put(meta["mode"])
+
+
+def test_file_mode_coalesces_across_worker_processes():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d, SINGLE_FLIGHT_MODE="file")
+        kwargs = {k: getattr(s, k) for k in ("DB_DIALECT", "DB_NAME", "CACHE_DIR", "LOG_DIR", "DUCKDB_PATH", "SINGLE_FLIGHT_MODE")}
+        ctx = multiprocessing.get_context("spawn")
+        barrier, out = ctx.Barrier(4), ctx.Queue()
+        procs = [ctx.Process(target=_process_worker, args=(kwargs, barrier, out)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=120)
+        assert all(p.exitcode == 0 for p in procs)
+        modes = sorted(out.get(timeout=5) for _ in procs)
+        # One process queried the DB; the others found its snapshot once the lock was released.
+        assert modes == ["cache", "cache", "cache", "db"]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from config import Settings
+from agents.executor import Executor
+from agents.sql_agent import SQLAgent
+from cache.duckdb_store import DuckDBStore
+from db.dialects import SQLServerDialect
+from knowledge_graph.schema_registry import SchemaRegistry
+from utils.result_slicing import detail_slice, total_row
+
+pytest.importorskip("duckdb_engine")
+
+
+def _setup(d: str):
+    s = Settings(
+        DB_DIALECT="duckdb",
+        DB_NAME=str(Path(d, "warehouse.duckdb")),
+        KNOWLEDGE_GRAPH_DIR=d,
+        CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")),
+    )
+    con = duckdb.connect(s.DB_NAME)
+    con.execute("CREATE TABLE sales (region VARCHAR, channel VARCHAR, order_date DATE, amount DOUBLE)")
+    con.execute(
+        "INSERT INTO sales VALUES ('EU','web','2024-01-05',10), ('EU','shop','2024-02-07',20),"
+        " ('US','web','2024-01-09',5), ('US','web','2024-03-01',7)"
+    )
+    con.close()
+    cols = [("region", "VARCHAR"), ("channel", "VARCHAR"), ("order_date", "DATE"), ("amount", "DOUBLE")]
+    reg = {"tables": {"main.sales": {"schema": "main", "name": "sales", "row_count": 4, "columns": [{"name": c, "type": t, "nullable": True} for c, t in cols]}}}
+    Path(d, "schema_registry.json").write_text(json.dumps(reg), encoding="utf-8")
+    return s, SQLAgent(s, SchemaRegistry(d)), Executor(settings=s)
+
+
+def _run(agent: SQLAgent, ex: Executor, plan):
+    b = agent.generate_sql(plan, allowed_tables=[])
+    return ex.run(sql=b["sql"], params=b["params"], spec=b["spec"])
+
+
+def test_rollup_and_filter_derived_from_finer_snapshot():
+    with tempfile.TemporaryDirectory() as d:
+        _s, agent, ex = _setup(d)
+        metrics = [{"name": "Revenue", "agg": "sum", "field": "amount"}, {"name": "Orders", "agg": "count", "field": "amount"}]
+        _, meta = _run(agent, ex, {"tables": ["main.sales"], "dimensions": ["region", "channel"], "metrics": metrics})
+        assert meta["mode"] == "db"
+
+        plan = {
+            "tables": ["main.sales"],
+            "dimensions": ["region"],
+            "metrics": metrics,
+            "filters": [{"field": "channel", "op": "=", "value": "web"}],
+        }
+        df, meta = _run(agent, ex, plan)
+        assert meta["mode"] == "derived"
+        assert meta["lineage"]["derivation"] == "rollup" and "filter" in meta["lineage"]["operations"]
+        detail = detail_slice(df, plan)
+        assert dict(zip(detail["region"], detail["Revenue"])) == {"EU": 10.0, "US": 12.0}
+        assert dict(zip(detail["region"], detail["Orders"])) == {"EU": 1, "US": 2}
+        assert total_row(df, plan)["Revenue"] == 22.0
+
+
+def test_non_reaggregatable_metric_goes_to_db():
+    with tempfile.TemporaryDirectory() as d:
+        _s, agent, ex = _setup(d)
+        _run(agent, ex, {"tables": ["main.sales"], "dimensions": ["region", "channel"], "metrics": [{"name": "Avg", "agg": "avg", "field": "amount"}]})
+        _, meta = _run(agent, ex, {"tables": ["main.sales"], "dimensions": ["region"], "metrics": [{"name": "Avg", "agg": "avg", "field": "amount"}]})
+        assert meta["mode"] == "db"
+
+
+def test_aggregate_from_raw_snapshot_with_time_bucket():
+    with tempfile.TemporaryDirectory() as d:
+        _s, agent, ex = _setup(d)
+        _run(agent, ex, {"tables": ["main.sales"], "dimensions": ["region", "order_date", "amount"]})
+        plan = {
+            "tables": ["main.sales"],
+            "time_field": "order_date",
+            "time_granularity": "month",
+            "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}],
+        }
+        df, meta = _run(agent, ex, plan)
+        assert meta["mode"] == "derived" and meta["lineage"]["derivation"] == "aggregate_raw"
+        detail = detail_slice(df, plan)
+        assert sorted(detail["Revenue"].tolist()) == [7.0, 15.0, 20.0]
+        assert total_row(df, plan)["Revenue"] == 42.0
+
+
+def test_string_filters_follow_source_collation():
+    with tempfile.TemporaryDirectory() as d:
+        s, agent, ex = _setup(d)
+        metrics = [{"name": "Revenue", "agg": "sum", "field": "amount"}]
+        _run(agent, ex, {"tables": ["main.sales"], "dimensions": ["region", "channel"], "metrics": metrics})
+        plan = {"tables": ["main.sales"], "dimensions": ["channel"], "metrics": metrics, "filters": [{"field": "region", "op": "=", "value": "eu"}]}
+
+        # DuckDB source: '=' is case-sensitive, so 'eu' matches nothing, as the DB would answer.
+        df, _lineage = ex.cache.derive_from_snapshots(agent.generate_sql(plan, allowed_tables=[])["spec"])
+        assert detail_slice(df, plan).empty
+
+        # SQL Server source (CI collation): 'eu' must match 'EU'.
+        mssql = SQLAgent(s, SchemaRegistry(d), dialect=SQLServerDialect())
+        df, _lineage = ex.cache.derive_from_snapshots(mssql.generate_sql(plan, allowed_tables=[])["spec"])
+        assert dict(zip(detail_slice(df, plan)["channel"], detail_slice(df, plan)["Revenue"])) == {"web": 10.0, "shop": 20.0}
+
+        # String ranges depend on the collation's sort order: left to the DB.
+        plan["filters"] = [{"field": "region", "op": ">=", "value": "eu"}]
+        assert ex.cache.derive_from_snapshots(mssql.generate_sql(plan, allowed_tables=[])["spec"]) is None
+
+
+def test_catalog_initialises_once_under_concurrent_sessions():
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d, "catalog.duckdb")
+        errors = []
+
+        def build():
+            try:
+                DuckDBStore(path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+        assert {"query_spec", "row_count", "lineage"} <= set(DuckDBStore(path).list_catalog().columns)
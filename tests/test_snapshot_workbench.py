@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from config import Settings
+from cache.service import CacheService, cache_key_for
+from cache.workbench import SnapshotWorkbench, view_name
+
+
+def _settings(d: str) -> Settings:
+    return Settings(CACHE_DIR=str(Path(d, "cache")), DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")))
+
+
+SALES = "SELECT region, amount FROM sales"
+REGIONS = "SELECT code, name FROM regions"
+
+
+def test_joins_across_snapshots_and_memoizes_until_a_snapshot_changes():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        svc = CacheService(s)
+        sales, regions = cache_key_for(SALES, {}), cache_key_for(REGIONS, {})
+        svc.put(sales, pd.DataFrame({"region": ["EU", "EU", "US"], "amount": [1.0, 2.0, 4.0]}), sql=SALES)
+        svc.put(regions, pd.DataFrame({"code": ["EU", "US"], "name": ["Europe", "Americas"]}), sql=REGIONS)
+
+        bench = SnapshotWorkbench(s)
+        assert set(bench.views()["view_name"]) == {view_name(sales), view_name(regions)}
+        sql = (
+            f"SELECT r.name, SUM(s.amount) AS total FROM {view_name(sales)} s "
+            f"JOIN {view_name(regions)} r ON r.code = s.region GROUP BY r.name ORDER BY r.name"
+        )
+        df, meta = bench.query(sql)
+        assert df.to_dict("records") == [{"name": "Americas", "total": 4.0}, {"name": "Europe", "total": 3.0}]
+        assert not meta["memoized"] and sorted(meta["views"]) == sorted([view_name(sales), view_name(regions)])
+        assert bench.query(sql)[1]["memoized"]
+
+        # Rewriting a snapshot the query reads drops the memoized result; others keep theirs.
+        only_regions = f"SELECT COUNT(1) AS n FROM {view_name(regions)}"
+        bench.query(only_regions)
+        svc.put(sales, pd.DataFrame({"region": ["US"], "amount": [10.0]}), sql=SALES)
+        df, meta = bench.query(sql)
+        assert not meta["memoized"] and df.to_dict("records") == [{"name": "Americas", "total": 10.0}]
+        assert bench.query(only_regions)[1]["memoized"]
+
+        svc.delete(regions)
+        assert list(bench.views()["view_name"]) == [view_name(sales)]
+
+
+def test_session_is_read_only():
+    with tempfile.TemporaryDirectory() as d:
+        s = _settings(d)
+        key = cache_key_for(SALES, {})
+        CacheService(s).put(key, pd.DataFrame({"region": ["EU"], "amount": [1.0]}), sql=SALES)
+        outside = Path(d, "outside.parquet")
+        pd.DataFrame({"x": [1]}).to_parquet(outside)
+
+        bench = SnapshotWorkbench(s)
+        for sql in (f"DROP VIEW {view_name(key)}", f"COPY {view_name(key)} TO '{d}/out.csv'", "SELECT 1; SELECT 2"):
+            with pytest.raises(ValueError):
+                bench.query(sql)
+        # Past the statement guard, the engine only reads files under CACHE_DIR.
+        with pytest.raises(Exception, match="Permission"):
+            bench.query(f"SELECT x FROM read_parquet('{outside.as_posix()}')")
+        assert bench.query(f"SELECT amount FROM {view_name(key)}")[0]["amount"].tolist() == [1.0]
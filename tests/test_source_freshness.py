@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from cache.freshness import FreshnessChecker
+from cache.service import cache_key_for, referenced_tables
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+
+
+def _setup(d: str, **kw) -> Settings:
+    db = str(Path(d, "src.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount REAL, updated_at TEXT)")
+    con.execute("CREATE TABLE regions (code TEXT, name TEXT)")
+    con.executemany("INSERT INTO orders VALUES (?, ?, ?)", [(i, float(i), "2024-01-01") for i in range(1, 11)])
+    con.executemany("INSERT INTO regions VALUES (?, ?)", [("EU", "Europe"), ("US", "Americas")])
+    con.commit()
+    con.close()
+    s = Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, FRESHNESS_CHECK_INTERVAL_SECONDS=0, CACHE_EVICTION_INTERVAL_SECONDS=0,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+    s.ensure_dirs()
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+    return s
+
+
+def _source(s: Settings, sql: str) -> None:
+    con = sqlite3.connect(s.DB_NAME)
+    con.execute(sql)
+    con.commit()
+    con.close()
+
+
+ORDERS = "SELECT SUM(amount) AS total FROM orders"
+REGIONS = "SELECT code, name FROM regions"
+
+
+def test_referenced_tables_from_raw_sql():
+    sql = 'SELECT * FROM [dbo].[Sales] s JOIN dbo.Customers c ON s.id = c.id LEFT JOIN "main"."x" ON 1 = 1'
+    assert referenced_tables(sql) == ["dbo.Sales", "dbo.Customers", "main.x"]
+
+
+def test_only_snapshots_of_a_changed_table_are_invalidated():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d)
+        ex = Executor(settings=s)
+        ex.run(sql=ORDERS, params={})
+        ex.run(sql=REGIONS, params={})
+        checker = FreshnessChecker(s)
+        first = checker.run_once()
+        assert first["tables_checked"] == 2 and first["changed_tables"] == []
+
+        # A new row moves the signal; the regions snapshot stays.
+        _source(s, "INSERT INTO orders VALUES (11, 100.0, '2024-02-01')")
+        report = checker.run_once()
+        assert report["changed_tables"] == ["main.orders"] and report["invalidated"] == 1
+        assert ex.run(sql=REGIONS, params={})[1]["cache_hit"]
+        df, meta = ex.run(sql=ORDERS, params={})
+        assert not meta["cache_hit"] and float(df["total"].iloc[0]) == 155.0
+        assert checker.run_once()["changed_tables"] == []
+
+
+def test_watermark_signal_catches_updates_and_refresh_reruns():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d, FRESHNESS_WATERMARKS="main.orders:updated_at", FRESHNESS_ACTION="refresh")
+        ex = Executor(settings=s)
+        ex.run(sql=ORDERS, params={})
+        checker = FreshnessChecker(s)
+        checker.run_once()
+
+        # In-place update: row count and rowid unchanged, watermark moves.
+        _source(s, "UPDATE orders SET amount = 1000, updated_at = '2024-03-01' WHERE id = 1")
+        report = checker.run_once()
+        assert report["invalidated"] == 1 and report["refreshed"] == 1
+        df, meta = ex.run(sql=ORDERS, params={})
+        assert meta["cache_hit"] and float(df["total"].iloc[0]) == 1054.0
+        assert ex.cache.list_entries()[0]["cache_key"] == cache_key_for(ORDERS, {})
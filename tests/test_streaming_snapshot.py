@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import Settings
+from agents.executor import Executor
+from cache.snapshot_cache import ParquetLayout, SnapshotCache
+
+
+def test_put_batches_writes_row_groups_and_promotes_null_columns():
+    with tempfile.TemporaryDirectory() as d:
+        cache = SnapshotCache(Path(d), layout=ParquetLayout(row_group_rows=2))
+        batches = [
+            pa.record_batch({"id": [1, 2], "label": pa.array([None, None], type=pa.null())}),
+            pa.record_batch({"id": [3, 4], "label": ["c", "d"]}),
+        ]
+        path, rows = cache.put_batches("k", iter(batches))
+        assert rows == 4 and path == cache.path_for_key("k")
+        assert pq.ParquetFile(path).metadata.num_row_groups == 2
+        assert not list(Path(d).glob("*.tmp"))
+
+        df = cache.get("k", columns=["label", "nope"], max_rows=3)
+        assert list(df.columns) == ["label"] and df["label"].tolist()[2] == "c" and len(df) == 3
+
+
+def test_put_batches_leaves_no_partial_file_on_error():
+    def broken():
+        yield pa.record_batch({"id": [1]})
+        raise RuntimeError("connection lost")
+
+    with tempfile.TemporaryDirectory() as d:
+        cache = SnapshotCache(Path(d))
+        try:
+            cache.put_batches("k", broken())
+        except RuntimeError:
+            pass
+        assert list(Path(d).iterdir()) == []
+
+
+def test_streaming_execution_reads_back_projection_and_row_cap():
+    with tempfile.TemporaryDirectory() as d:
+        db = str(Path(d, "w.db"))
+        con = sqlite3.connect(db)
+        con.execute("CREATE TABLE t (id INTEGER, region TEXT, amount REAL)")
+        con.executemany("INSERT INTO t VALUES (?, ?, ?)", [(i, "EU" if i % 2 else "US", float(i)) for i in range(25)])
+        con.commit()
+        con.close()
+        s = Settings(
+            DB_DIALECT="sqlite", DB_NAME=db, CACHE_DIR=str(Path(d, "cache")),
+            DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), FETCH_CHUNK_SIZE=4, MAX_RETURNED_ROWS=10,
+        )
+        ex = Executor(settings=s)
+        sql = "SELECT id, region, amount FROM t ORDER BY id"
+        df, meta = ex.run(sql=sql, params={}, stream=True, columns=["id", "amount"])
+        assert meta["streamed"] and meta["snapshot_rows"] == 25 and meta["fetch"]["chunks"] == 7
+        assert list(df.columns) == ["id", "amount"] and len(df) == 10
+
+        df, meta = ex.run(sql=sql, params={}, stream=True, columns=["region"])
+        assert meta["cache_hit"] and list(df.columns) == ["region"] and len(df) == 10
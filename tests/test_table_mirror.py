@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import Settings
+from agents.executor import Executor
+from agents.schema_agent import SchemaAgent
+from agents.sql_agent import SQLAgent
+from cache.mirror import TableMirror, choose_watermark, decode_watermark, encode_watermark
+from knowledge_graph.schema_registry import SchemaRegistry
+from knowledge_graph.store import KnowledgeGraphStore
+
+
+def _setup(d: str, **kw) -> Settings:
+    db = str(Path(d, "src.db"))
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, amount REAL, updated_at TEXT)")
+    con.executemany(
+        "INSERT INTO orders VALUES (?, ?, ?, ?)",
+        [(i, "EU" if i % 2 else "US", float(i), f"2024-01-{1 + i % 9:02d}") for i in range(1, 41)],
+    )
+    con.commit()
+    con.close()
+    s = Settings(
+        DB_DIALECT="sqlite", DB_NAME=db, MIRROR_PART_ROWS=10, FETCH_CHUNK_SIZE=5,
+        KNOWLEDGE_GRAPH_DIR=str(Path(d, "kg")), CACHE_DIR=str(Path(d, "cache")), MIRROR_DIR=str(Path(d, "mirror")),
+        DUCKDB_PATH=str(Path(d, "cache", "catalog.duckdb")), TRACES_DIR=str(Path(d, "traces")), LOG_DIR=str(Path(d, "logs")),
+        **kw,
+    )
+    s.ensure_dirs()
+    SchemaAgent(s, KnowledgeGraphStore(s.KNOWLEDGE_GRAPH_DIR), SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR)).refresh(sample_rows=5)
+    return s
+
+
+def _mirror_frame(m: TableMirror) -> pd.DataFrame:
+    parts = sorted(m.table_dir("main.orders").glob("*.parquet"))
+    return pd.concat([pd.read_parquet(p) for p in parts]).sort_values("id").reset_index(drop=True)
+
+
+def _source(s: Settings, sql: str, rows=()) -> None:
+    con = sqlite3.connect(s.DB_NAME)
+    con.executemany(sql, rows) if rows else con.execute(sql)
+    con.commit()
+    con.close()
+
+
+def test_watermark_choice_and_encoding():
+    table = {
+        "columns": [{"name": "id", "type": "int"}, {"name": "ModifiedDate", "type": "datetime"}, {"name": "rv", "type": "timestamp"}],
+        "pk_fk_hints": {"primary_key": ["id"]},
+    }
+    assert choose_watermark(table, None, "mssql") == ("rv", "rowversion")
+    assert choose_watermark(table, None, "duckdb") == ("ModifiedDate", "modified")
+    assert choose_watermark({**table, "columns": table["columns"][:1]}, None, "mssql") == ("id", "identity")
+    for v in (b"\x00\x01", pd.Timestamp("2024-01-02 03:04:05").to_pydatetime(), 42, "2024-01-01"):
+        assert decode_watermark(encode_watermark(v)) == v
+
+
+def test_incremental_refresh_appends_and_replaces_updated_rows():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d)
+        m = TableMirror(s)
+        first = m.refresh("main.orders", watermark_column="updated_at")
+        assert first["mode"] == "full" and first["rows"] == 40 and first["parts"] == 4
+
+        _source(s, "UPDATE orders SET amount = -1, updated_at = '2024-02-01' WHERE id = 3")
+        _source(s, "INSERT INTO orders VALUES (?, ?, ?, ?)", [(41, "EU", 41.0, "2024-02-02"), (42, "US", 42.0, "2024-02-02")])
+        second = m.refresh("main.orders", watermark_column="updated_at")
+        assert second["mode"] == "incremental" and second["rows_extracted"] == 3
+        assert second["new_parts"] == 1 and second["rewritten_parts"] == 1
+        assert decode_watermark(second["watermark"]) == "2024-02-02"
+
+        got = _mirror_frame(m)
+        con = sqlite3.connect(s.DB_NAME)
+        want = pd.read_sql("SELECT id, region, amount, updated_at FROM orders ORDER BY id", con)
+        con.close()
+        pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+        # Nothing new: the watermark stays, only the refresh time moves.
+        third = m.refresh("main.orders", watermark_column="updated_at")
+        assert third["rows_extracted"] == 0 and third["watermark"] == second["watermark"] and third["rows"] == 42
+
+
+def test_fresh_mirror_answers_eligible_queries_and_stale_one_does_not():
+    with tempfile.TemporaryDirectory() as d:
+        s = _setup(d, MIRROR_FRESHNESS_SLA_SECONDS=600)
+        m = TableMirror(s)
+        m.refresh("main.orders")
+        agent = SQLAgent(s, SchemaRegistry(s.KNOWLEDGE_GRAPH_DIR))
+        plan = {
+            "tables": ["main.orders"],
+            "dimensions": ["region"],
+            "metrics": [{"name": "Revenue", "agg": "sum", "field": "amount"}],
+            "filters": [{"field": "amount", "op": ">", "value": 10}],
+        }
+        b = agent.generate_sql(plan, allowed_tables=[])
+        df, meta = Executor(settings=s).run(sql=b["sql"], params=b["params"], spec=b["spec"])
+        assert meta["mode"] == "mirror" and meta["lineage"]["source_mirror"] == "main.orders"
+        assert dict(zip(df["region"], df["Revenue"])) == {"EU": 375.0, "US": 390.0}
+
+        # Last refreshed an hour ago: outside the 10 minute SLA, so the source answers.
+        entry = m.store.get_mirror("main.orders")
+        m.store.register_mirror(
+            "main.orders", Path(entry["parquet_dir"]), watermark_column=entry["watermark_column"], watermark_kind=entry["watermark_kind"],
+            watermark=entry["watermark"], primary_key=entry["primary_key"], rows=entry["row_count"], parts=entry["parts"],
+            refreshed_epoch=time.time() - 3600,
+        )
+        b = agent.generate_sql({**plan, "filters": []}, allowed_tables=[])
+        _df, meta = Executor(settings=s).run(sql=b["sql"], params=b["params"], spec=b["spec"])
+        assert meta["mode"] == "db"
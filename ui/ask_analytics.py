@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import json
+from typing import Any, Dict
+
 import streamlit as st
 import streamlit.components.v1 as components
 
 from config import Settings
 from traces.trace_store import TraceStore
 from core.run_pipeline import run_agentic_pipeline
+from agents.concurrent_executor import cancel_run
 from knowledge_graph.schema_registry import SchemaRegistry
 from knowledge_graph.store import KnowledgeGraphStore
 from agents.planner_agent import PlannerAgent
@@ -36,6 +39,9 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
     if "large_mode" not in st.session_state:
         st.session_state["large_mode"] = True
 
+    if "approximate" not in st.session_state:
+        st.session_state["approximate"] = False
+
     if "last_result" not in st.session_state:
         st.session_state["last_result"] = None
 
@@ -122,6 +128,12 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
         value=bool(st.session_state["large_mode"]),
         help="ON: SQLAgent uses TOP(MAX_RETURNED_ROWS). OFF: uses TOP(DEFAULT_EXPLORATORY_TOP).",
     )
+    st.session_state["approximate"] = st.toggle(
+        "Approximate exploratory mode (TABLESAMPLE + APPROX_COUNT_DISTINCT)",
+        value=bool(st.session_state["approximate"]),
+        disabled=bool(st.session_state["large_mode"]),
+        help="Only when Large Query Mode is OFF. Samples big tables, scales SUM/COUNT and labels KPIs as approximate.",
+    )
 
     # ------------------------------------------------------------
     # 3) Run
@@ -132,7 +144,11 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
     run_btn = st.button("Run", type="primary", disabled=not bool(question.strip()))
 
     if run_btn:
+        # A new question supersedes the previous run; stop its queries if still running.
+        cancel_run(st.session_state.get("active_run_id"), reason="superseded")
         run_id = trace_store.new_run()
+        st.session_state["active_run_id"] = run_id
+        preview_slot = st.empty()
         result = run_agentic_pipeline(
             settings=settings,
             trace_store=trace_store,
@@ -142,7 +158,11 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
             human_review=None,
             developer_mode=developer_mode,
             large_mode=bool(st.session_state["large_mode"]),  # ✅ pass down
+            approximate=bool(st.session_state["approximate"]),
+            on_preview=lambda p: _render_preview(preview_slot, p),
         )
+        # The full insights and dashboard below replace the provisional preview.
+        preview_slot.empty()
         st.session_state["last_result"] = result
 
     # ------------------------------------------------------------
@@ -182,6 +202,7 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
                 human_review=human_review,
                 developer_mode=developer_mode,
                 large_mode=bool(st.session_state["large_mode"]),  # ✅ pass down
+                approximate=bool(st.session_state["approximate"]),
             )
             st.session_state["last_result"] = result2
             result = result2
@@ -208,6 +229,19 @@ def render_ask_analytics(settings: Settings, trace_store: TraceStore, developer_
             st.json({
                 "sql": result.get("sql"),
                 "exec_meta": result.get("exec_meta"),
+                "stage_profile": result.get("stage_profile"),
                 "large_mode": bool(st.session_state["large_mode"]),
                 "allowed_tables_count": len(allowed_tables),
-            })
\ No newline at end of file
+            })
+
+
+def _render_preview(slot, preview: Dict[str, Any]) -> None:
+    """First chunk of a running query: provisional KPIs and rows while the rest streams in."""
+    with slot.container():
+        st.info(f"Preview: first {preview.get('rows', 0):,} rows — still fetching, results will refresh when complete.")
+        kpis = (preview.get("insights") or {}).get("kpis") or []
+        if kpis:
+            cols = st.columns(min(4, len(kpis)))
+            for col, k in zip(cols, kpis[:4]):
+                col.metric(str(k.get("title")), str(k.get("value")), help=k.get("context"))
+        st.dataframe(preview.get("df_preview") or [], use_container_width=True)
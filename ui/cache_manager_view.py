@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import json
+
 import streamlit as st
 from config import Settings
-from cache.cache_manager import QueryCache
+from cache.eviction import CacheEvictor
+from cache.freshness import FreshnessChecker
+from cache.mirror import TableMirror
+from cache.service import CacheService
+from cache.warmer import CacheWarmer
 
 
 def render_cache_manager(settings: Settings) -> None:
     st.header("Cache Manager")
-    cache = QueryCache(settings)
+    cache = CacheService(settings)
 
-    entries = cache.list_entries()
-    st.dataframe(entries, use_container_width=True)
+    stats = cache.stats()
+    st.caption(f"{stats['entries']} snapshots, {stats['bytes'] / 1024**2:.1f} MiB on disk, {stats['hits']} hits")
+    st.dataframe(cache.list_entries(), use_container_width=True)
 
     col1, col2 = st.columns([1, 1])
     with col1:
-        key = st.text_input("Clear by key (sql_hash)", value="")
+        key = st.text_input("Clear by key (cache_key)", value="")
         if st.button("Clear Key"):
             removed = cache.clear(key=key.strip() or None)
             st.success(f"Removed {removed} entries.")
@@ -22,3 +29,70 @@ def render_cache_manager(settings: Settings) -> None:
         if st.button("Clear ALL cache", type="primary"):
             removed = cache.clear()
             st.success(f"Removed {removed} entries.")
+
+    st.caption(
+        f"Budget: {settings.CACHE_MAX_BYTES / 1024**3:.1f} GiB, {settings.CACHE_MAX_ENTRIES} entries, "
+        f"policy {settings.CACHE_EVICTION_POLICY} (background every {settings.CACHE_EVICTION_INTERVAL_SECONDS}s)"
+    )
+    if st.button("Evict now"):
+        st.json(CacheEvictor(settings).run_once())
+    st.caption(
+        f"Source freshness: every {settings.FRESHNESS_CHECK_INTERVAL_SECONDS}s, "
+        f"{settings.FRESHNESS_ACTION} snapshots of changed tables"
+    )
+    if st.button("Check source tables now"):
+        st.json(FreshnessChecker(settings).run_once())
+    warm_rate = stats["warm_hit_rate"]
+    st.caption(
+        f"Warm-up windows: {settings.WARM_WINDOWS or 'off'}. {stats['warmed']} warmed snapshots, "
+        f"{stats['warmed_hit']} hit since warming ({stats['warm_hits']} hits)"
+        + (f", warm hit rate {warm_rate:.0%}" if warm_rate is not None else "")
+    )
+    if st.button("Warm now"):
+        st.json(CacheWarmer(settings).run_once())
+    with st.expander("Memory tier", expanded=False):
+        st.json(stats["memory"])
+
+    st.subheader("Cache effectiveness")
+    metrics = cache.metrics()
+    totals = metrics["totals"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Hit rate", f"{totals['hit_rate']:.0%}" if totals["hit_rate"] is not None else "-")
+    m2.metric("Hits / misses", f"{totals['hits']} / {totals['misses']}")
+    m3.metric("DB time saved", f"{totals['db_seconds_saved']:.1f}s", help=f"DB time spent on misses: {totals['db_seconds_spent']:.1f}s")
+    m4.metric("Served from cache", f"{totals['bytes_served'] / 1024**2:.1f} MiB")
+    st.caption(
+        f"{totals['local_fills']} answered from other snapshots or mirrors, {totals['warm_fills']} warm-up runs, "
+        f"{totals['evictions']} evictions, {totals['invalidations']} invalidations"
+    )
+    t1, t2 = st.tabs(["By table", "By question"])
+    with t1:
+        st.dataframe(metrics["by_table"], use_container_width=True)
+    with t2:
+        st.dataframe(metrics["by_question"], use_container_width=True)
+    e1, e2 = st.columns([1, 1])
+    with e1:
+        st.download_button(
+            "Export metrics (JSON)",
+            data=json.dumps(metrics, indent=2),
+            file_name="cache_metrics.json",
+            mime="application/json",
+        )
+    with e2:
+        if st.button("Reset metrics"):
+            cache.catalog.reset_metrics()
+
+    st.subheader("Table mirror")
+    mirror = TableMirror(settings)
+    configured = mirror.configured_tables()
+    if not configured:
+        st.caption("No tables configured (MIRROR_TABLES).")
+        return
+    st.dataframe(mirror.store.list_mirrors(), use_container_width=True)
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        if st.button("Refresh mirrors (incremental)"):
+            st.dataframe(mirror.refresh_all(), use_container_width=True)
+    with c2:
+        if st.button("Full re-extract"):
+            st.dataframe(mirror.refresh_all(full=True), use_container_width=True)
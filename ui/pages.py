@@ -13,6 +13,7 @@ from ui.ask_analytics import render_ask_analytics
 from ui.trace_viewer import render_trace_viewer
 from ui.query_logs_view import render_query_logs
 from ui.cache_manager_view import render_cache_manager
+from ui.workbench_view import render_workbench
 from ui.export_view import render_export
 
 
@@ -41,7 +42,7 @@ def render_app(settings: Settings) -> None:
 
     page = st.sidebar.radio(
         "Views",
-        ["Schema Explorer", "Ask Analytics", "Run Traces", "Query Logs", "Cache Manager", "Export"],
+        ["Schema Explorer", "Ask Analytics", "Run Traces", "Query Logs", "Cache Manager", "Snapshot Workbench", "Export"],
         index=1,
     )
 
@@ -62,5 +63,7 @@ def render_app(settings: Settings) -> None:
         render_query_logs(settings)
     elif page == "Cache Manager":
         render_cache_manager(settings)
+    elif page == "Snapshot Workbench":
+        render_workbench(settings)
     elif page == "Export":
         render_export(settings, trace_store=trace_store)
@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+import pandas as pd
 import streamlit as st
 from config import Settings
-from observability.query_log import QueryLogStore
+from db.engine import pool_metrics
+from observability.query_log import QueryLogStore, phase_breakdown
 
 
 def render_query_logs(settings: Settings) -> None:
     st.header("Query Logs (Audit)")
     store = QueryLogStore(settings.LOG_DIR)
+    pools = pool_metrics()
+    if pools:
+        with st.expander("Connection pools", expanded=False):
+            st.dataframe(pools, use_container_width=True)
+
     rows = store.read_recent(200)
     if not rows:
         st.info("No query logs yet.")
         return
     st.dataframe(rows, use_container_width=True)
+
+    phases = phase_breakdown(rows)
+    if phases:
+        with st.expander("Phase breakdown", expanded=False):
+            pdf = pd.DataFrame(phases)
+            st.dataframe(pdf, use_container_width=True)
+            labels = [f"{i}: {r['mode']} {r['cache_key']} ({r['seconds']}s)" for i, r in enumerate(phases)]
+            pick = st.selectbox("Execution", list(range(len(phases))), index=len(phases) - 1, format_func=lambda i: labels[i])
+            cols = [c for c in pdf.columns if c.startswith("phase:")]
+            one = pdf.loc[pick, cols].dropna().rename(lambda c: c.split(":", 1)[1])
+            st.bar_chart(one.astype(float))
@@ -17,10 +17,13 @@ TIMELINE = [
     "D_human_review__applied",
     "D_human_review__critique",
     "E_sql_generation",
+    "E_sql_generation__cost",
     "E_sql_generation__critique",
     "F_sql_safety",
     "F_sql_safety__critique",
+    "G_execute__first_chunk",
     "G_execute",
+    "G_execute__typing",
     "G_execute__critique",
     "H_data_validation",
     "H_data_validation__critique",
@@ -28,6 +31,7 @@ TIMELINE = [
     "I_insights__critique",
     "J_dashboard",
     "J_dashboard__html",
+    "J_dashboard__stages",
     "J_dashboard__critique",
     "K_render",
     "K_render__critique",
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import streamlit as st
+from config import Settings
+from cache.workbench import shared_workbench
+
+
+def render_workbench(settings: Settings) -> None:
+    st.header("Snapshot Workbench")
+    st.caption("Read-only DuckDB SQL across cached snapshots; nothing here reaches the source database.")
+    bench = shared_workbench(settings)
+
+    views = bench.views()
+    if views.empty:
+        st.info("No snapshots cached yet.")
+        return
+    with st.expander(f"Snapshot views ({len(views)})", expanded=False):
+        st.dataframe(views, use_container_width=True)
+
+    first = views["view_name"].iloc[0]
+    sql = st.text_area("DuckDB SQL", value=st.session_state.get("workbench_sql", f"SELECT COUNT(1) AS row_count FROM {first}"), height=160)
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        run = st.button("Run", type="primary")
+    with c2:
+        if st.button("Clear memoized results"):
+            bench.clear_memo()
+    if run:
+        st.session_state["workbench_sql"] = sql
+        try:
+            df, meta = bench.query(sql)
+        except Exception as e:
+            st.error(str(e))
+            return
+        st.caption(
+            f"{meta['rows']} rows in {meta['seconds']}s"
+            + (" (memoized)" if meta["memoized"] else "")
+            + (f" from {', '.join(meta['views'])}" if meta["views"] else "")
+        )
+        st.dataframe(df, use_container_width=True)
+        with st.expander("Executed SQL", expanded=False):
+            st.code(meta["normalized_sql"], language="sql")
+    st.caption(f"Memo: {bench.memo_stats()}")
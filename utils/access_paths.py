@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Rough fraction of rows a predicate keeps; only used to rank plans and annotate cost.
+SELECTIVITY = {"=": 0.01, "in": 0.05, "range": 0.3, "like": 0.25}
+
+# Access ranks (lower = cheaper). A predicate's rank decides its position in the WHERE clause.
+RANK_PARTITION = 0
+RANK_INDEX = 1
+RANK_INDEX_SUFFIX = 2
+RANK_COLUMNSTORE = 3
+RANK_SCAN = 4
+RANK_NON_SARGABLE = 5
+
+RANGE_OPS = {">", ">=", "<", "<="}
+NON_SARGABLE_OPS = {"!=", "<>"}
+
+
+def _hints(table_meta: Dict[str, Any]) -> Dict[str, Any]:
+    return (table_meta or {}).get("index_hints") or {}
+
+
+def _btree_indexes(table_meta: Dict[str, Any]) -> List[List[str]]:
+    idx = [ix.get("columns") or [] for ix in _hints(table_meta).get("indexes") or [] if "COLUMNSTORE" not in str(ix.get("type", ""))]
+    pk = ((table_meta or {}).get("pk_fk_hints") or {}).get("primary_key") or []
+    if pk:
+        idx.append(list(pk))
+    return [cols for cols in idx if cols]
+
+
+def column_access(table_meta: Dict[str, Any], column: str) -> Tuple[int, str]:
+    """How well the physical design serves a predicate on `column`: (rank, label)."""
+    part = _hints(table_meta).get("partition") or {}
+    if part.get("column") == column:
+        return RANK_PARTITION, "partition"
+    indexes = _btree_indexes(table_meta)
+    if any(cols[0] == column for cols in indexes):
+        return RANK_INDEX, "index"
+    if any(column in cols for cols in indexes):
+        return RANK_INDEX_SUFFIX, "index_suffix"
+    if _hints(table_meta).get("columnstore"):
+        return RANK_COLUMNSTORE, "columnstore"
+    return RANK_SCAN, "scan"
+
+
+def is_sargable(op: str, value: Any) -> bool:
+    op = (op or "").lower()
+    if op in NON_SARGABLE_OPS:
+        return False
+    if op == "like":
+        # A leading wildcard cannot seek.
+        return isinstance(value, str) and not value.startswith(("%", "_"))
+    return True
+
+
+def predicate_rank(table_meta: Dict[str, Any], column: str, op: str, value: Any) -> Tuple[int, int]:
+    """Sort key for WHERE predicates: partition/index-backed equality first, scans last."""
+    op = (op or "").lower()
+    rank = column_access(table_meta, column)[0] if is_sargable(op, value) else RANK_NON_SARGABLE
+    op_rank = {"=": 0, "in": 1}.get(op, 2 if op in RANGE_OPS else 3)
+    return rank, op_rank
+
+
+def _selectivity(op: str) -> float:
+    op = (op or "").lower()
+    return SELECTIVITY.get("range" if op in RANGE_OPS else op, 1.0)
+
+
+def choose_join_keys(
+    reg_tables: Dict[str, Any], left: str, right: str, left_key: Optional[str], right_key: Optional[str]
+) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """
+    Fill join keys the plan left out from a declared FK pair between the two tables. Planned
+    keys are never replaced (that would change what the join means); when the lookup side
+    (right) has no index on its key but an FK pair is indexed, a warning names the alternative.
+    Returns (left_key, right_key, note-or-None, warning-or-None).
+    """
+    pairs: List[Tuple[str, str]] = []
+    for fk in ((reg_tables.get(left) or {}).get("pk_fk_hints") or {}).get("foreign_keys") or []:
+        if f"{fk.get('ref_schema')}.{fk.get('ref_table')}" == right:
+            pairs.append((fk.get("parent_column"), fk.get("ref_column")))
+    for fk in ((reg_tables.get(right) or {}).get("pk_fk_hints") or {}).get("foreign_keys") or []:
+        if f"{fk.get('ref_schema')}.{fk.get('ref_table')}" == left:
+            pairs.append((fk.get("ref_column"), fk.get("parent_column")))
+    pairs = [(lk, rk) for lk, rk in pairs if isinstance(lk, str) and isinstance(rk, str)]
+
+    if not (isinstance(left_key, str) and isinstance(right_key, str)):
+        if pairs:
+            return pairs[0][0], pairs[0][1], "join keys taken from foreign key", None
+        return left_key, right_key, None, None
+    if (left_key, right_key) in pairs or not pairs:
+        return left_key, right_key, None, None
+    if column_access(reg_tables.get(right) or {}, right_key)[0] <= RANK_INDEX:
+        return left_key, right_key, None, None
+    indexed = [p for p in pairs if column_access(reg_tables.get(right) or {}, p[1])[0] <= RANK_INDEX]
+    if indexed:
+        lk, rk = indexed[0]
+        return left_key, right_key, None, (
+            f"Join key {right}.{right_key} has no index; the foreign key {left}.{lk} = {right}.{rk} is indexed. "
+            "Check that the planned join is the intended one."
+        )
+    return left_key, right_key, None, None
+
+
+def estimate_cost(
+    reg_tables: Dict[str, Any],
+    primary: str,
+    filters: List[Dict[str, Any]],
+    joins: List[Dict[str, Any]],
+    *,
+    warn_min_rows: int,
+) -> Dict[str, Any]:
+    """
+    Expected-cost annotation for the generated query.
+    filters: [{"table", "column", "op", "value"}]; joins: [{"left_table", "right_table", "right_key", "left_key"}].
+    Rows read per table follow the best access path (partition elimination, index seek, scan);
+    warnings flag unindexed filters/joins and missing partition filters on tables >= warn_min_rows.
+    """
+    tables: List[Dict[str, Any]] = []
+    warnings: List[str] = []
+    involved = [primary] + [j["right_table"] for j in joins if j.get("right_table") != primary]
+
+    for t in involved:
+        meta = reg_tables.get(t) or {}
+        n = int(meta.get("row_count") or 0)
+        large = n >= int(warn_min_rows)
+        hints = _hints(meta)
+        mine = [f for f in filters if f.get("table") == t]
+
+        fraction, access = 1.0, "columnstore_scan" if hints.get("columnstore") else "full_scan"
+        for f in mine:
+            sargable = is_sargable(f.get("op"), f.get("value"))
+            rank = column_access(meta, f["column"])[0]
+            if sargable and rank == RANK_PARTITION:
+                fraction *= max(_selectivity(f.get("op")), 1.0 / max(int((hints.get("partition") or {}).get("partitions") or 1), 1))
+                access = "partition_elimination"
+            elif sargable and rank == RANK_INDEX:
+                fraction *= _selectivity(f.get("op"))
+                if access != "partition_elimination":
+                    access = "index_seek"
+            elif large and (not sargable or (rank >= RANK_INDEX_SUFFIX and rank != RANK_COLUMNSTORE)):
+                why = "is not sargable" if not sargable else "is not index-backed"
+                warnings.append(f"Filter on {t}.{f['column']} {why}; {t} ({n:,} rows) will be scanned.")
+
+        part = hints.get("partition") or {}
+        if large and part.get("column") and not any(f["column"] == part["column"] for f in mine):
+            warnings.append(
+                f"{t} is partitioned on {part['column']} but the query does not filter on it; "
+                f"all {int(part.get('partitions') or 0)} partitions are read."
+            )
+        tables.append({"table": t, "row_count": n, "access": access, "est_rows_read": int(n * fraction)})
+
+    rows_by_table = {x["table"]: x for x in tables}
+    join_notes: List[Dict[str, Any]] = []
+    for j in joins:
+        rt = j.get("right_table")
+        meta = reg_tables.get(rt) or {}
+        rank, label = column_access(meta, j.get("right_key"))
+        indexed = rank <= RANK_INDEX
+        outer_rows = rows_by_table.get(j.get("left_table"), {}).get("est_rows_read", 0)
+        n = int(meta.get("row_count") or 0)
+        if indexed and rt in rows_by_table and not any(f.get("table") == rt for f in filters):
+            # Nested-loop lookups into the index instead of scanning the whole table.
+            rows_by_table[rt]["est_rows_read"] = min(n, int(outer_rows))
+            rows_by_table[rt]["access"] = "index_lookup"
+        if not indexed and n >= int(warn_min_rows) and rank != RANK_COLUMNSTORE:
+            warnings.append(f"Join key {rt}.{j.get('right_key')} has no index; {rt} ({n:,} rows) will be scanned for the join.")
+        join_notes.append({"table": rt, "key": j.get("right_key"), "indexed": indexed, "access": label})
+
+    total = sum(int(x["est_rows_read"]) for x in tables)
+    if total >= 10**8:
+        cost_class = "high"
+    elif total >= 10**6:
+        cost_class = "medium"
+    else:
+        cost_class = "low"
+    return {"est_rows_read": total, "cost_class": cost_class, "tables": tables, "joins": join_notes, "warnings": warnings}
@@ -22,8 +22,8 @@ def json_sanitize(obj: Any) -> Any:
     if isinstance(obj, (dt.datetime, dt.date)):
         return obj.isoformat()
 
-    # pandas NA / NaT
-    if obj is pd.NaT:
+    # pandas NA / NaT (pd.NA: nullable and Arrow-backed string columns)
+    if obj is pd.NaT or obj is pd.NA:
         return None
 
     # numpy scalar fallback (works without importing numpy explicitly)
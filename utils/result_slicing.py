@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+
+# Internal helper columns emitted by SQLAgent start with "__" and never reach the UI.
+INTERNAL_PREFIX = "__"
+GROUPING_ID_COLUMN = "__grouping_id"
+
+
+def strip_internal_columns(df: pd.DataFrame) -> pd.DataFrame:
+    internal = [c for c in df.columns if str(c).startswith(INTERNAL_PREFIX)]
+    return df.drop(columns=internal) if internal else df
+
+
+def plan_grouping_sets(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    sets = plan.get("grouping_sets") if isinstance(plan, dict) else None
+    if not isinstance(sets, list):
+        return []
+    return [g for g in sets if isinstance(g, dict) and isinstance(g.get("columns"), list)]
+
+
+def slice_grouping_set(df: pd.DataFrame, plan: Dict[str, Any], columns: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Rows of a GROUPING SETS result that belong to the set grouped by exactly `columns`.
+    Rolled-up columns (NULL for that set) are dropped. Returns None if the plan has no such set.
+    """
+    if df is None or GROUPING_ID_COLUMN not in df.columns:
+        return None
+    wanted = set(columns)
+    for g in plan_grouping_sets(plan):
+        if set(g["columns"]) == wanted:
+            part = df[df[GROUPING_ID_COLUMN] == int(g["id"])]
+            rolled_up = [c for s in plan_grouping_sets(plan) for c in s["columns"] if c not in wanted]
+            part = part.drop(columns=[c for c in set(rolled_up) if c in part.columns])
+            return strip_internal_columns(part).reset_index(drop=True)
+    return None
+
+
+def detail_slice(df: pd.DataFrame, plan: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Finest grain of the result (what a flat GROUP BY would have returned).
+    Frames without grouping sets are returned with internal columns stripped.
+    """
+    if df is None:
+        return df
+    sets = plan_grouping_sets(plan)
+    if not sets or GROUPING_ID_COLUMN not in df.columns:
+        return strip_internal_columns(df)
+    finest = max(sets, key=lambda g: len(g["columns"]))
+    part = slice_grouping_set(df, plan, finest["columns"])
+    return part if part is not None else strip_internal_columns(df)
+
+
+def total_row(df: pd.DataFrame, plan: Dict[str, Any]) -> Optional[pd.Series]:
+    """Grand-total row (the `()` grouping set), if the query produced one."""
+    part = slice_grouping_set(df, plan, [])
+    if part is None or part.empty:
+        return None
+    return part.iloc[0]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+import datetime as dt
+import decimal
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.result_slicing import INTERNAL_PREFIX
+
+
+# Registry type names (SQL Server / DuckDB / SQLite spellings), matched by prefix.
+DATE_TYPES = ("date", "datetime", "smalldatetime", "timestamp")
+DECIMAL_TYPES = ("decimal", "numeric", "money", "smallmoney")
+TEXT_TYPES = ("char", "varchar", "nchar", "nvarchar", "text", "ntext", "string")
+
+# A text column becomes categorical when it repeats enough: at most this share of distinct values...
+CATEGORY_MAX_RATIO = 0.5
+# ...and at most this many categories.
+CATEGORY_MAX_UNIQUE = 10000
+
+try:
+    STRING_DTYPE: Optional[pd.StringDtype] = pd.StringDtype("pyarrow")
+except ImportError:  # pyarrow-backed strings need pyarrow
+    STRING_DTYPE = None
+
+
+def _kind(sql_type: Optional[str]) -> Optional[str]:
+    t = (sql_type or "").lower().strip()
+    if t.startswith(DATE_TYPES) and "offset" not in t:
+        return "date"
+    if t.startswith(DECIMAL_TYPES):
+        return "decimal"
+    if t.startswith(TEXT_TYPES):
+        return "text"
+    return None
+
+
+def result_column_types(spec: Optional[Dict[str, Any]], reg_tables: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Registry type per result column, from SQLAgent's spec: output alias -> source column type.
+    Date-bucketed dimensions are "date"; COUNT metrics are "bigint".
+    """
+    out: Dict[str, str] = {}
+    if not spec:
+        return out
+    for col in (spec.get("dimensions") or []) + (spec.get("columns") or []):
+        source, alias = col.get("source"), col.get("alias")
+        if not alias or not isinstance(source, str):
+            continue
+        if col.get("bucket"):
+            out[alias] = "date"
+            continue
+        table, _, name = source.rpartition(".")
+        for c in (reg_tables.get(table) or {}).get("columns") or []:
+            if c.get("name") == name:
+                out[alias] = str(c.get("type") or "")
+                break
+    for m in spec.get("metrics") or []:
+        if m.get("alias") and m.get("agg") in ("count", "count_distinct"):
+            out[m["alias"]] = "bigint"
+    return out
+
+
+def is_category_like(s: pd.Series) -> bool:
+    """Text or categorical column (what the insight/dashboard agents break numbers down by)."""
+    return (
+        isinstance(s.dtype, pd.CategoricalDtype)
+        or pd.api.types.is_string_dtype(s.dtype)
+        or s.dtype == "object"
+    )
+
+
+def _first_valid(s: pd.Series) -> Any:
+    idx = s.first_valid_index()
+    return None if idx is None else s.loc[idx]
+
+
+def _downcast_float(s: pd.Series) -> pd.Series:
+    # float32 only when every value survives the round trip (no silent precision loss).
+    f32 = s.astype(np.float32)
+    if np.array_equal(f32.astype(np.float64).to_numpy(), s.to_numpy(), equal_nan=True):
+        return f32
+    return s
+
+
+def _compact_column(s: pd.Series, kind: Optional[str], *, max_ratio: float, max_unique: int) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return pd.to_numeric(s, downcast="integer") if s.dtype.kind in "iu" else s
+    if pd.api.types.is_float_dtype(s.dtype):
+        return _downcast_float(s)
+
+    sample = _first_valid(s)
+    if sample is None:
+        return s
+    if kind == "decimal" or isinstance(sample, decimal.Decimal):
+        if all(isinstance(v, decimal.Decimal) for v in s.dropna().head(1000)):
+            return _downcast_float(pd.to_numeric(s.astype("float64"), errors="coerce"))
+        return s
+    if kind == "date" or (isinstance(sample, (dt.date, dt.datetime)) and not isinstance(sample, dt.time)):
+        parsed = pd.to_datetime(s, errors="coerce")
+        # Only when nothing turns into NaT that was not missing before.
+        return parsed if int(parsed.isna().sum()) == int(s.isna().sum()) else s
+    if isinstance(sample, str):
+        n = int(s.notna().sum())
+        uniq = int(s.nunique(dropna=True))
+        if n and uniq <= max_unique and uniq <= max_ratio * n:
+            return s.astype("category")
+        if s.dtype == "object" and STRING_DTYPE is not None:
+            return s.astype(STRING_DTYPE)
+        return s
+    return s
+
+
+def compact_dtypes(
+    df: pd.DataFrame,
+    column_types: Optional[Dict[str, str]] = None,
+    *,
+    category_max_ratio: float = CATEGORY_MAX_RATIO,
+    category_max_unique: int = CATEGORY_MAX_UNIQUE,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Smallest faithful dtypes for a result frame, using registry types (column_types, see
+    result_column_types) and the observed values:
+      - integers downcast to the narrowest width that holds them; floats to float32 when lossless
+      - DECIMAL/NUMERIC/MONEY (Python Decimal objects) to floats
+      - DATE/DATETIME columns to datetime64
+      - low-cardinality text to category, other text to Arrow-backed strings
+    Internal "__" columns are left alone. Returns (df, report) with memory before/after.
+    """
+    t0 = time.perf_counter()
+    before = frame_bytes(df)
+    column_types = column_types or {}
+    changed: Dict[str, Dict[str, str]] = {}
+    out = df.copy(deep=False)
+    for c in df.columns:
+        if str(c).startswith(INTERNAL_PREFIX):
+            continue
+        try:
+            s = _compact_column(df[c], _kind(column_types.get(c)), max_ratio=category_max_ratio, max_unique=category_max_unique)
+        except Exception:
+            continue
+        if s is not df[c] and str(s.dtype) != str(df[c].dtype):
+            out[c] = s
+            changed[str(c)] = {"from": str(df[c].dtype), "to": str(s.dtype)}
+    out.attrs = dict(df.attrs)
+    after = frame_bytes(out)
+    report = {
+        "bytes_before": before,
+        "bytes_after": after,
+        "saved_pct": round(100.0 * (before - after) / before, 1) if before else 0.0,
+        "seconds": round(time.perf_counter() - t0, 4),
+        "columns": changed,
+    }
+    return out, report
+
+
+def frame_bytes(df: Optional[pd.DataFrame]) -> int:
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
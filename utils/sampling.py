@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import math
+
+import pandas as pd
+
+from utils.result_slicing import GROUPING_ID_COLUMN
+
+
+SAMPLE_ROWS_COLUMN = "__sample_rows"
+
+# SQL Server documents APPROX_COUNT_DISTINCT as within 2% of the true value with 97% probability.
+APPROX_DISTINCT_RELATIVE_ERROR = 0.02
+
+Z_95 = 1.96
+
+
+def estimate_sampling_error(df: Optional[pd.DataFrame], sampling: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Error bounds for an approximate (TABLESAMPLE) result, for exec_meta["approximate"].
+
+    Scaled COUNT/SUM from a sample at rate q with k sampled rows has relative standard error
+    ~ sqrt((1 - q) / k) under row-independent sampling. We report the 95% bound for the whole
+    sample and for the worst (smallest) group. Page-level TABLESAMPLE SYSTEM clusters rows, so the
+    real error can be wider; SUM over skewed values is also wider than the count-based bound.
+    """
+    if not sampling or not sampling.get("approximate"):
+        return None
+
+    out: Dict[str, Any] = {
+        "approximate": True,
+        "method": sampling.get("method"),
+        "table": sampling.get("table"),
+        "sampling_rate_pct": sampling.get("rate_pct"),
+        "scale": sampling.get("scale"),
+        "reason": sampling.get("reason"),
+        "metrics": dict(sampling.get("metrics") or {}),
+        "relative_error_95": None,
+        "worst_group_relative_error_95": None,
+        "sample_rows": None,
+        "assumes": "row-independent sampling; page-level sampling and skewed SUMs can widen bounds",
+    }
+    if any(kind == "approx_distinct" for kind in out["metrics"].values()):
+        out["approx_distinct_relative_error"] = APPROX_DISTINCT_RELATIVE_ERROR
+
+    rate = sampling.get("rate_pct")
+    if not rate or df is None or SAMPLE_ROWS_COLUMN not in df.columns:
+        return out
+
+    q = min(float(rate) / 100.0, 1.0)
+    k = pd.to_numeric(df[SAMPLE_ROWS_COLUMN], errors="coerce").dropna()
+    k = k[k > 0]
+    if k.empty:
+        return out
+
+    # With grouping sets every grain covers the same rows, so the largest group is the full sample.
+    total = float(k.max()) if GROUPING_ID_COLUMN in df.columns else float(k.sum())
+    out["sample_rows"] = int(total)
+    out["relative_error_95"] = round(Z_95 * math.sqrt((1.0 - q) / total), 6)
+    out["worst_group_relative_error_95"] = round(Z_95 * math.sqrt((1.0 - q) / float(k.min())), 6)
+    return out